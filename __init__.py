@@ -6,17 +6,108 @@ __version__ = "1.0.0"
 __author__ = "SamSite101"
 __description__ = "Crypto Analyzer Telegram Bot"
 
-# Package imports
-from .user_database import UserDatabase
-from .payment_handler import PaymentHandler
-from .crypto_scalping_bot import CryptoScalpingBot
-from .claude_api import ClaudeAPI
-from .binance_api_client import BinanceAPIClient
+import importlib
+from typing import TYPE_CHECKING
+
+# Öffentliche Namen -> Modul. Die Module (und damit telegram, anthropic, aiosqlite, numpy)
+# werden erst beim ersten Zugriff geladen (PEP 562), nicht schon beim Import des Pakets.
+_LAZY_ATTRIBUTES = {
+    "UserDatabase": "user_database",
+    "PaymentHandler": "payment_handler",
+    "CryptoScalpingBot": "crypto_scalping_bot",
+    "ClaudeAPI": "claude_api",
+    "BinanceAPIClient": "binance_api_client",
+    "KlineStore": "kline_store",
+    "KlineBuffer": "kline_store",
+    "MarketDataStream": "market_stream",
+    "Resampler": "resampler",
+    "BinanceHTTPTransport": "binance_http",
+    "RequestWeightScheduler": "binance_http",
+    "MarketDataCache": "market_cache",
+    "CandleArchive": "candle_archive",
+    "run_backtest": "backtester",
+    "parameter_sweep": "backtester",
+    "EntitlementCache": "entitlement_cache",
+    "Tier": "entitlement_cache",
+    "SnapshotBuilder": "market_snapshot",
+    "WebhookServer": "webhook_server",
+    "WorkerPool": "worker_pool",
+    "PriceAlertEngine": "price_alerts",
+    "AlertNotifier": "price_alerts",
+    "MessageDispatcher": "message_dispatcher",
+    "PaymentProvider": "payment_providers",
+    "TelegramPaymentsProvider": "payment_providers",
+    "CryptoInvoiceProvider": "payment_providers",
+    "RateLimiter": "rate_limiter",
+    "Metrics": "metrics",
+    "METRICS": "metrics",
+}
+
+if TYPE_CHECKING:
+    from .user_database import UserDatabase
+    from .payment_handler import PaymentHandler
+    from .crypto_scalping_bot import CryptoScalpingBot
+    from .claude_api import ClaudeAPI
+    from .binance_api_client import BinanceAPIClient
+    from .kline_store import KlineStore, KlineBuffer
+    from .market_stream import MarketDataStream
+    from .resampler import Resampler
+    from .binance_http import BinanceHTTPTransport, RequestWeightScheduler
+    from .market_cache import MarketDataCache
+    from .candle_archive import CandleArchive
+    from .backtester import run_backtest, parameter_sweep
+    from .entitlement_cache import EntitlementCache, Tier
+    from .market_snapshot import SnapshotBuilder
+    from .webhook_server import WebhookServer
+    from .worker_pool import WorkerPool
+    from .price_alerts import PriceAlertEngine, AlertNotifier
+    from .message_dispatcher import MessageDispatcher
+    from .payment_providers import PaymentProvider, TelegramPaymentsProvider, CryptoInvoiceProvider
+    from .rate_limiter import RateLimiter
+    from .metrics import Metrics, METRICS
 
 __all__ = [
     "UserDatabase",
     "PaymentHandler", 
     "CryptoScalpingBot",
     "ClaudeAPI",
-    "BinanceAPIClient"
-]
\ No newline at end of file
+    "BinanceAPIClient",
+    "KlineStore",
+    "KlineBuffer",
+    "MarketDataStream",
+    "Resampler",
+    "BinanceHTTPTransport",
+    "RequestWeightScheduler",
+    "MarketDataCache",
+    "CandleArchive",
+    "run_backtest",
+    "parameter_sweep",
+    "EntitlementCache",
+    "Tier",
+    "SnapshotBuilder",
+    "WebhookServer",
+    "WorkerPool",
+    "PriceAlertEngine",
+    "AlertNotifier",
+    "MessageDispatcher",
+    "PaymentProvider",
+    "TelegramPaymentsProvider",
+    "CryptoInvoiceProvider",
+    "RateLimiter",
+    "Metrics",
+    "METRICS"
+]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    # Weitere Zugriffe gehen direkt an das Modul-Dictionary, ohne __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+CA3003BOT - Backtest CLI
+Spielt die RSI-Scalping-Strategie über archivierte Candlesticks ab.
+
+Beispiele:
+    python backtest.py BTCUSDT --interval 1m --sync --start 2024-01-01
+    python backtest.py BTCUSDT --rsi-periods 7,14,21 --lower 15:35:5 --upper 60:85:5 --top 5
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import time
+
+from dotenv import load_dotenv
+
+from backtester import DEFAULT_FEE_RATE, format_result, parameter_sweep
+from candle_archive import CandleArchive
+
+load_dotenv()
+
+
+def _parse_values(text: str) -> list[float]:
+    """Liest '10,20,30' oder 'start:stop:step' (stop inklusive)."""
+    if ":" in text:
+        start, stop, step = (float(part) for part in text.split(":"))
+        values = []
+        value = start
+        while value <= stop + 1e-9:
+            values.append(value)
+            value += step
+        return values
+    return [float(part) for part in text.split(",") if part]
+
+
+def _parse_date(text: str | None) -> int | None:
+    """Wandelt 'YYYY-MM-DD' (UTC) in Millisekunden um."""
+    if not text:
+        return None
+    date = datetime.datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+    return int(date.timestamp() * 1000)
+
+
+async def _sync_archive(archive: CandleArchive, symbol: str, interval: str, start_time: int | None) -> None:
+    from binance_api_client import BinanceAPIClient
+
+    api_key = (os.getenv("BINANCE_API_KEY") or "").strip()
+    api_secret = (os.getenv("BINANCE_API_SECRET") or "").strip()
+    client = BinanceAPIClient(api_key, api_secret)
+    try:
+        added = await archive.sync(client, symbol, interval, start_time=start_time)
+        print(f"Archiv synchronisiert: {added} neue Candlesticks für {symbol} ({interval}).")
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest der RSI-Scalping-Strategie über archivierte Klines.")
+    parser.add_argument("symbol", help="Handelspaar, z.B. BTCUSDT")
+    parser.add_argument("--interval", default="1m", help="Zeitintervall der Candlesticks (Standard: 1m)")
+    parser.add_argument("--archive-dir", default="candle_archive", help="Verzeichnis des Candle-Archivs")
+    parser.add_argument("--sync", action="store_true", help="Archiv vorher über die Binance API aktualisieren")
+    parser.add_argument("--start", help="Beginn des Zeitraums (YYYY-MM-DD, UTC)")
+    parser.add_argument("--end", help="Ende des Zeitraums (YYYY-MM-DD, UTC)")
+    parser.add_argument("--rsi-periods", default="14", help="RSI-Perioden, z.B. 7,14,21")
+    parser.add_argument("--lower", default="30", help="Einstiegsschwellen, z.B. 20,25,30 oder 15:35:5")
+    parser.add_argument("--upper", default="70", help="Ausstiegsschwellen, z.B. 65,70 oder 60:85:5")
+    parser.add_argument("--fee", type=float, default=DEFAULT_FEE_RATE, help="Gebühr pro Seite (Standard: 0.001)")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl der Prozesse (Standard: alle CPUs)")
+    parser.add_argument("--top", type=int, default=10, help="Anzahl der ausgegebenen Kombinationen")
+    args = parser.parse_args()
+
+    symbol = args.symbol.upper()
+    start_time, end_time = _parse_date(args.start), _parse_date(args.end)
+    archive = CandleArchive(args.archive_dir)
+
+    if args.sync:
+        asyncio.run(_sync_archive(archive, symbol, args.interval, start_time))
+
+    candles = archive.query(symbol, args.interval, start_time, end_time)
+    if len(candles) < 2:
+        print(f"Keine archivierten Candlesticks für {symbol} ({args.interval}). Mit --sync herunterladen.")
+        return
+
+    rsi_periods = [int(p) for p in _parse_values(args.rsi_periods)]
+    lowers, uppers = _parse_values(args.lower), _parse_values(args.upper)
+    print(f"Backtest über {len(candles)} Candlesticks, "
+          f"{len(rsi_periods) * len(lowers) * len(uppers)} Parameterkombinationen...")
+
+    started = time.perf_counter()
+    results = parameter_sweep(candles["close"], args.interval, rsi_periods, lowers, uppers,
+                              fee_rate=args.fee, max_workers=args.workers)
+    print(f"Fertig in {time.perf_counter() - started:.2f}s.\n")
+    for rank, result in enumerate(results[:args.top], start=1):
+        print(f"{rank:>3}. {format_result(result)}")
+
+
+if __name__ == "__main__":
+    main()
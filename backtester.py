@@ -0,0 +1,211 @@
+"""
+Backtester - Vektorisierte Backtests einer RSI-Scalping-Strategie
+
+Signale, Positionsverlauf und Equity-Kurve werden für viele Parameterkombinationen gleichzeitig
+als 2-D-Arrays der Form (Kombinationen, Candlesticks) berechnet. Parameter-Sweeps werden auf
+einen ProcessPoolExecutor verteilt, die Schlusskurse liegen dabei einmalig in Shared Memory.
+
+Strategie: Long-Einstieg, wenn der RSI unter 'lower' fällt, Ausstieg, wenn er über 'upper' steigt.
+Eine Position wird zum Schlusskurs des Signal-Candlesticks eröffnet bzw. geschlossen.
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import indicators
+from kline_store import interval_to_ms
+
+DEFAULT_FEE_RATE = 0.001  # Binance Spot Taker-Gebühr pro Seite
+
+# Obergrenze der Elemente eines (Kombinationen, Candlesticks)-Arrays pro Block
+_MAX_BLOCK_ELEMENTS = 4_000_000
+
+_YEAR_MS = 365 * 86_400_000
+
+
+def _positions(rsi: np.ndarray, lowers: np.ndarray, uppers: np.ndarray) -> np.ndarray:
+    """Leitet den Positionsverlauf (0 oder 1) für jede Kombination aus dem RSI ab."""
+    n = rsi.shape[-1]
+    signal = np.full((len(lowers), n), -1, dtype=np.int8)  # -1: kein Signal, Position beibehalten
+    signal[rsi[None, :] < lowers[:, None]] = 1
+    signal[rsi[None, :] > uppers[:, None]] = 0
+    signal[:, 0] = np.where(signal[:, 0] < 0, 0, signal[:, 0])
+    # Letztes Signal vorwärts füllen
+    last_index = np.where(signal >= 0, np.arange(n), 0)
+    np.maximum.accumulate(last_index, axis=1, out=last_index)
+    return np.take_along_axis(signal, last_index, axis=1)
+
+
+def backtest_batch(close: np.ndarray, interval: str, rsi_period: int, lowers, uppers,
+                   fee_rate: float = DEFAULT_FEE_RATE) -> dict[str, np.ndarray]:
+    """
+    Führt den Backtest für mehrere Schwellenwert-Paare mit gleicher RSI-Periode durch.
+
+    Args:
+        close (np.ndarray): Die Schlusskurse (1-D).
+        interval (str): Das Zeitintervall der Candlesticks (für die Annualisierung).
+        rsi_period (int): Die RSI-Periode.
+        lowers (array_like): Einstiegsschwellen, eine pro Kombination.
+        uppers (array_like): Ausstiegsschwellen, eine pro Kombination.
+        fee_rate (float): Gebühr pro Seite als Anteil des Handelsvolumens.
+
+    Returns:
+        dict[str, np.ndarray]: Pro Kennzahl ein Array mit einem Wert pro Kombination.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    lowers = np.asarray(lowers, dtype=np.float64)
+    uppers = np.asarray(uppers, dtype=np.float64)
+    rsi = indicators.rsi(close, rsi_period)
+    position = _positions(rsi, lowers, uppers)
+
+    returns = close[1:] / close[:-1] - 1.0
+    held = position[:, :-1]
+    trades = np.abs(np.diff(position, axis=1, prepend=0))[:, :-1]
+    gross = held * returns
+    net = gross - trades * fee_rate
+
+    log_equity = np.cumsum(np.log1p(net), axis=1)
+    equity = np.exp(log_equity)
+    drawdown = 1.0 - equity / np.maximum.accumulate(np.maximum(equity, 1.0), axis=1)
+
+    # Handelsergebnisse aus der logarithmischen Equity zwischen Ein- und Ausstieg
+    changes = np.diff(position, axis=1, prepend=0, append=0)
+    combo_in, bar_in = np.nonzero(changes == 1)
+    _, bar_out = np.nonzero(changes == -1)
+    padded = np.concatenate([np.zeros((len(lowers), 1)), log_equity, log_equity[:, -1:]], axis=1)
+    # Die Ausstiegsgebühr wird auf dem Ausstiegs-Candlestick verbucht
+    trade_returns = np.expm1(padded[combo_in, np.minimum(bar_out + 1, padded.shape[1] - 1)] - padded[combo_in, bar_in])
+    num_trades = np.bincount(combo_in, minlength=len(lowers))
+    wins = np.bincount(combo_in, weights=trade_returns > 0, minlength=len(lowers))
+
+    periods_per_year = _YEAR_MS / interval_to_ms(interval)
+    mean, std = net.mean(axis=1), net.std(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), 0.0)
+        win_rate = np.where(num_trades > 0, wins / num_trades, 0.0)
+
+    return {
+        "lower": lowers,
+        "upper": uppers,
+        "total_return": equity[:, -1] - 1.0,
+        "gross_return": np.expm1(np.log1p(gross).sum(axis=1)),
+        "fees_paid": trades.sum(axis=1) * fee_rate,
+        "max_drawdown": drawdown.max(axis=1),
+        "sharpe": sharpe,
+        "win_rate": win_rate,
+        "trades": num_trades,
+    }
+
+
+def run_backtest(close, interval: str, rsi_period: int = 14, lower: float = 30.0, upper: float = 70.0,
+                 fee_rate: float = DEFAULT_FEE_RATE) -> dict:
+    """
+    Führt einen einzelnen Backtest durch.
+
+    Args:
+        close (array_like): Die Schlusskurse.
+        interval (str): Das Zeitintervall der Candlesticks.
+        rsi_period (int): Die RSI-Periode.
+        lower (float): Die Einstiegsschwelle.
+        upper (float): Die Ausstiegsschwelle.
+        fee_rate (float): Gebühr pro Seite.
+
+    Returns:
+        dict: PnL ('total_return', 'gross_return'), 'win_rate', 'max_drawdown', 'sharpe', 'trades'
+              und 'fees_paid'.
+    """
+    batch = backtest_batch(np.asarray(close, dtype=np.float64), interval, rsi_period, [lower], [upper], fee_rate)
+    result = {name: values[0].item() for name, values in batch.items()}
+    result["rsi_period"] = rsi_period
+    return result
+
+
+def _sweep_task(close, interval: str, rsi_period: int, pairs: list, fee_rate: float) -> list[dict]:
+    results = []
+    # Blockweise rechnen, damit die 2-D-Arrays bei langen Historien im Speicher bleiben
+    block = max(1, _MAX_BLOCK_ELEMENTS // max(1, len(close)))
+    for start in range(0, len(pairs), block):
+        lowers, uppers = zip(*pairs[start:start + block])
+        batch = backtest_batch(close, interval, rsi_period, lowers, uppers, fee_rate)
+        for i in range(len(lowers)):
+            result = {name: values[i].item() for name, values in batch.items()}
+            result["rsi_period"] = rsi_period
+            results.append(result)
+    return results
+
+
+def _sweep_shared_task(shm_name: str, length: int, interval: str, rsi_period: int, pairs: list,
+                       fee_rate: float) -> list[dict]:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        close = np.ndarray((length,), dtype=np.float64, buffer=shm.buf)
+        results = _sweep_task(close, interval, rsi_period, pairs, fee_rate)
+        del close
+        return results
+    finally:
+        shm.close()
+
+
+def parameter_sweep(close, interval: str, rsi_periods, lowers, uppers, fee_rate: float = DEFAULT_FEE_RATE,
+                    max_workers: int | None = None, sort_by: str = "sharpe") -> list[dict]:
+    """
+    Testet alle Kombinationen aus RSI-Perioden und Schwellenwerten.
+
+    Args:
+        close (array_like): Die Schlusskurse, z.B. CandleArchive.load(...)['close'].
+        interval (str): Das Zeitintervall der Candlesticks.
+        rsi_periods (Iterable[int]): Die RSI-Perioden.
+        lowers (Iterable[float]): Die Einstiegsschwellen.
+        uppers (Iterable[float]): Die Ausstiegsschwellen. Paare mit lower >= upper werden übersprungen.
+        fee_rate (float): Gebühr pro Seite.
+        max_workers (int | None): Anzahl der Prozesse (Standard: Anzahl der CPUs). 1 rechnet im
+                                  aufrufenden Prozess.
+        sort_by (str): Kennzahl, nach der absteigend sortiert wird.
+
+    Returns:
+        list[dict]: Ein Ergebnis pro Kombination im Format von run_backtest.
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    pairs = [(lo, up) for lo, up in itertools.product(lowers, uppers) if lo < up]
+    rsi_periods = list(rsi_periods)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    results = []
+    if max_workers == 1:
+        for period in rsi_periods:
+            results.extend(_sweep_task(close, interval, period, pairs, fee_rate))
+    else:
+        # Jede Aufgabe erhält eine RSI-Periode und einen Teil der Schwellenwert-Paare
+        chunk = max(1, -(-len(pairs) * len(rsi_periods) // (max_workers * 4)))
+        shm = shared_memory.SharedMemory(create=True, size=max(1, close.nbytes))
+        try:
+            np.ndarray(close.shape, dtype=np.float64, buffer=shm.buf)[:] = close
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(_sweep_shared_task, shm.name, len(close), interval, period,
+                                    pairs[start:start + chunk], fee_rate)
+                    for period in rsi_periods
+                    for start in range(0, len(pairs), chunk)
+                ]
+                for future in futures:
+                    results.extend(future.result())
+        finally:
+            shm.close()
+            shm.unlink()
+
+    results.sort(key=lambda r: r[sort_by], reverse=True)
+    return results
+
+
+def format_result(result: dict) -> str:
+    """Formatiert ein Backtest-Ergebnis als einzeiligen Text."""
+    return (
+        f"RSI({result['rsi_period']}) {result['lower']:.0f}/{result['upper']:.0f}: "
+        f"PnL {result['total_return'] * 100:+.2f}% (brutto {result['gross_return'] * 100:+.2f}%), "
+        f"Trefferquote {result['win_rate'] * 100:.0f}%, Drawdown {result['max_drawdown'] * 100:.1f}%, "
+        f"Sharpe {result['sharpe']:.2f}, Trades {result['trades']}"
+    )
@@ -1,19 +1,40 @@
-from binance.client import Client
 import os
 import asyncio
+import time
+
+from binance_http import BinanceHTTPTransport, klines_weight
+from kline_store import KlineStore
+from market_cache import MarketDataCache
+
+# Gültigkeit der Liste handelbarer Symbole im Cache in Sekunden
+SYMBOLS_TTL = 3600
 
 
 class BinanceAPIClient:
-    def __init__(self, api_key: str, api_secret: str):
+    def __init__(self, api_key: str, api_secret: str, kline_store: KlineStore | None = None,
+                 market_stream=None, base_url: str = "https://api.binance.com", pool_size: int = 20,
+                 cache: MarketDataCache | None = None):
         """
         Initialisiert den BinanceAPIClient mit den API-Schlüsseln.
         Args:
             api_key (str): Ihr Binance API-Schlüssel.
             api_secret (str): Ihr Binance API-Geheimnis.
+            kline_store (KlineStore | None): Optionaler Speicher, in den abgerufene Klines
+                                             einmalig geparst übernommen werden.
+            market_stream (MarketDataStream | None): Optionaler WebSocket-Stream, aus dessen Zustand
+                                                     Preise und Klines ohne REST-Aufruf beantwortet werden.
+            base_url (str): Basis-URL der Binance REST API.
+            pool_size (int): Maximale Anzahl gleichzeitig offener HTTP-Verbindungen.
+            cache (MarketDataCache | None): Optionaler Cache für Ticker und Klines.
         """
         if not api_key or not api_secret:
             raise ValueError("Binance API Key oder Secret ist nicht gesetzt. Bitte prüfen Sie Ihre .env-Datei.")
-        self.client = Client(api_key, api_secret)
+        self.api_secret = api_secret
+        # Nativer asyncio-Transport: Keep-Alive-Pool, Gewichts-Scheduler und Request-Coalescing
+        self.transport = BinanceHTTPTransport(base_url=base_url, api_key=api_key, pool_size=pool_size)
+        self.kline_store = kline_store
+        self.market_stream = market_stream
+        self.cache = cache
 
     async def get_klines(self, symbol: str, interval: str, limit: int = 500) -> list:
         """
@@ -30,19 +51,57 @@ class BinanceAPIClient:
                            Quote asset volume, Number of trades, Taker buy base asset volume,
                            Taker buy quote asset volume, Ignore]
         """
+        # Abonnierte Symbole werden direkt aus dem Zustand des WebSocket-Streams beantwortet
+        if self.market_stream is not None:
+            klines = self.market_stream.get_klines(symbol, interval, limit)
+            if klines is not None:
+                return klines
+        try:
+            if self.cache is not None:
+                # Klines bleiben gültig, bis der laufende Candlestick schließt
+                return await self.cache.get_or_load(
+                    ("klines", symbol, interval, limit),
+                    lambda: self.cache.klines_expiry(interval),
+                    lambda: self._request_klines(symbol, interval, limit),
+                )
+            return await self._request_klines(symbol, interval, limit)
+        except Exception as e:
+            print(f"Fehler beim Abrufen der Klines für {symbol} ({interval}): {e}")
+            return []
+
+    async def fetch_klines(self, symbol: str, interval: str, limit: int = 500,
+                           start_time: int | None = None, end_time: int | None = None) -> list:
+        """
+        Ruft Candlestick-Daten (Klines) immer per REST von Binance ab, ohne Stream oder Cache zu befragen.
+
+        Args:
+            symbol (str): Das Handelspaar (z.B. 'BTCUSDT', 'ETHUSDT').
+            interval (str): Das Zeitintervall (z.B. '1m', '5m', '1h', '1d').
+            limit (int): Die maximale Anzahl der zurückzugebenden Candlesticks (max. 1000).
+            start_time (int | None): Öffnungszeit des ersten Candlesticks in Millisekunden.
+            end_time (int | None): Späteste Öffnungszeit in Millisekunden.
+
+        Returns:
+            list: Candlesticks im Format von get_klines oder eine leere Liste bei Fehler.
+        """
         try:
-            # Die Binance-Client-Methoden sind synchron.
-            # Wir müssen sie in einem Thread-Pool ausführen, um sie nicht zu blockieren,
-            # wenn wir sie in einer asynchronen Umgebung (wie dem Telegram Bot) nutzen.
-            # asyncio.to_thread ist hierfür ideal.
-            klines = await asyncio.to_thread(
-                self.client.get_klines, symbol=symbol, interval=interval, limit=limit
-            )
-            return klines
+            return await self._request_klines(symbol, interval, limit, start_time, end_time)
         except Exception as e:
             print(f"Fehler beim Abrufen der Klines für {symbol} ({interval}): {e}")
             return []
 
+    async def _request_klines(self, symbol: str, interval: str, limit: int,
+                              start_time: int | None = None, end_time: int | None = None) -> list:
+        klines = await self.transport.get(
+            "/api/v3/klines",
+            {"symbol": symbol, "interval": interval, "limit": limit, "startTime": start_time, "endTime": end_time},
+            weight=klines_weight(limit),
+        )
+        # Historische Ausschnitte gehören nicht in den Speicher der aktuellen Candlesticks
+        if self.kline_store is not None and start_time is None and end_time is None:
+            self.kline_store.ingest(symbol, interval, klines)
+        return klines
+
     async def get_current_price(self, symbol: str) -> float | None:
         """
         Ruft den aktuellen Preis eines Handelspaares ab.
@@ -53,15 +112,91 @@ class BinanceAPIClient:
         Returns:
             float | None: Der aktuelle Preis als Float oder None bei Fehler.
         """
+        if self.market_stream is not None:
+            price = self.market_stream.get_price(symbol)
+            if price is not None:
+                return price
         try:
-            ticker = await asyncio.to_thread(
-                self.client.get_symbol_ticker, symbol=symbol
-            )
-            return float(ticker['price'])
+            if self.cache is not None:
+                return await self.cache.get_or_load(
+                    ("ticker", symbol), self.cache.ticker_expiry, lambda: self._request_price(symbol)
+                )
+            return await self._request_price(symbol)
         except Exception as e:
             print(f"Fehler beim Abrufen des aktuellen Preises für {symbol}: {e}")
             return None
 
+    async def _request_price(self, symbol: str) -> float:
+        ticker = await self.transport.get("/api/v3/ticker/price", {"symbol": symbol}, weight=2)
+        return float(ticker['price'])
+
+    async def get_prices(self, symbols: list[str]) -> dict[str, float]:
+        """
+        Ruft die aktuellen Preise mehrerer Handelspaare mit höchstens einem REST-Aufruf ab.
+
+        Symbole des WebSocket-Streams werden aus dessen Zustand beantwortet, alle übrigen aus
+        einem einzigen Aufruf von /api/v3/ticker/price für alle Handelspaare (Gewicht 4 statt 2 pro Symbol).
+
+        Args:
+            symbols (list[str]): Die Handelspaare (z.B. ['BTCUSDT', 'ETHUSDT']).
+
+        Returns:
+            dict[str, float]: Preis pro Symbol. Unbekannte Symbole fehlen, bei Fehler auch die
+                              nicht gestreamten.
+        """
+        prices = {}
+        missing = set()
+        for symbol in symbols:
+            price = self.market_stream.get_price(symbol) if self.market_stream is not None else None
+            if price is None:
+                missing.add(symbol)
+            else:
+                prices[symbol] = price
+        if not missing:
+            return prices
+        try:
+            tickers = await self.transport.get("/api/v3/ticker/price", weight=4)
+        except Exception as e:
+            print(f"Fehler beim Abrufen der aktuellen Preise: {e}")
+            return prices
+        for ticker in tickers:
+            if ticker['symbol'] in missing:
+                price = float(ticker['price'])
+                prices[ticker['symbol']] = price
+                if self.cache is not None:
+                    self.cache.put(("ticker", ticker['symbol']), price, self.cache.ticker_expiry())
+        return prices
+
+    async def get_usdt_symbols(self) -> list[str]:
+        """
+        Ruft alle aktuell handelbaren Handelspaare mit USDT als Quote-Asset ab.
+
+        Mit Cache wird die Liste bis zu SYMBOLS_TTL Sekunden wiederverwendet.
+
+        Returns:
+            list[str]: Die Symbole (z.B. ['BTCUSDT', 'ETHUSDT', ...]) oder eine leere Liste bei Fehler.
+        """
+        try:
+            if self.cache is not None:
+                return await self.cache.get_or_load(
+                    ("symbols", "USDT"), lambda: time.time() + SYMBOLS_TTL, self._request_usdt_symbols
+                )
+            return await self._request_usdt_symbols()
+        except Exception as e:
+            print(f"Fehler beim Abrufen der USDT-Handelspaare: {e}")
+            return []
+
+    async def _request_usdt_symbols(self) -> list[str]:
+        exchange_info = await self.transport.get("/api/v3/exchangeInfo", weight=20)
+        return [
+            s['symbol'] for s in exchange_info['symbols']
+            if s.get('quoteAsset') == 'USDT' and s.get('status') == 'TRADING'
+        ]
+
+    async def close(self) -> None:
+        """Schließt die HTTP-Verbindungen zu Binance."""
+        await self.transport.close()
+
 
 # Beispiel für die Verwendung (nur zum Testen)
 async def main():
@@ -95,6 +230,8 @@ async def main():
     else:
         print("Aktueller ETHUSDT Preis konnte nicht abgerufen werden.")
 
+    await binance_client.close()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,211 @@
+"""
+Binance HTTP - Nativer asyncio-Transport für die Binance REST API
+"""
+
+import asyncio
+import time
+
+import aiohttp
+
+
+class BinanceHTTPError(Exception):
+    """Fehlerhafte Antwort der Binance REST API."""
+
+    def __init__(self, status: int, message: str, code: int | None = None):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class _LeaderCancelled(Exception):
+    """Der Aufrufer, der einen gemeinsamen Upstream-Aufruf ausgelöst hat, wurde abgebrochen."""
+
+
+def klines_weight(limit: int) -> int:
+    """Gibt das Request-Gewicht von /api/v3/klines für das angegebene Limit zurück."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class RequestWeightScheduler:
+    """
+    Verfolgt das verbrauchte Request-Gewicht und verzögert Aufrufe, bevor Binance mit 429/418 antwortet.
+
+    Binance zählt das Gewicht pro IP in Minutenfenstern und meldet den aktuellen Stand im Header
+    'X-MBX-USED-WEIGHT-1M'. Der Scheduler schätzt den Verbrauch lokal vor, gleicht ihn mit dem
+    Header ab und lässt Aufrufe, die das Limit überschreiten würden, bis zum nächsten Fenster warten.
+    """
+
+    def __init__(self, weight_limit: int = 6000, safety_margin: float = 0.9):
+        """
+        Initialisiert den RequestWeightScheduler.
+
+        Args:
+            weight_limit (int): Das erlaubte Gewicht pro Minute.
+            safety_margin (float): Anteil des Limits, der höchstens ausgeschöpft wird.
+        """
+        self.weight_limit = weight_limit
+        self.budget = int(weight_limit * safety_margin)
+        self.used_weight = 0
+        self.delayed_requests = 0
+        self._window_end = 0.0
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _roll_window(self, now: float) -> None:
+        if now >= self._window_end:
+            self.used_weight = 0
+            self._window_end = (int(now // 60) + 1) * 60.0
+
+    async def acquire(self, weight: int) -> None:
+        """
+        Wartet, bis ein Aufruf mit dem angegebenen Gewicht ins Budget passt, und reserviert es.
+
+        Wartende Aufrufe werden in Ankunftsreihenfolge bedient.
+
+        Args:
+            weight (int): Das Request-Gewicht des Endpunkts.
+        """
+        async with self._lock:
+            delayed = False
+            while True:
+                now = time.time()
+                self._roll_window(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self.used_weight + weight > self.budget:
+                    wait = self._window_end - now
+                else:
+                    self.used_weight += weight
+                    return
+                if not delayed:
+                    delayed = True
+                    self.delayed_requests += 1
+                await asyncio.sleep(wait)
+
+    def update(self, status: int, headers) -> None:
+        """
+        Gleicht den Zustand mit einer Antwort von Binance ab.
+
+        Args:
+            status (int): Der HTTP-Statuscode.
+            headers (Mapping): Die Antwort-Header.
+        """
+        now = time.time()
+        self._roll_window(now)
+        used = headers.get("X-MBX-USED-WEIGHT-1M")
+        if used is not None:
+            self.used_weight = max(self.used_weight, int(used))
+        if status in (418, 429):
+            retry_after = headers.get("Retry-After")
+            wait = float(retry_after) if retry_after else self._window_end - now
+            self._blocked_until = max(self._blocked_until, now + wait)
+
+
+class BinanceHTTPTransport:
+    """Asynchroner HTTP-Transport mit Keep-Alive-Verbindungspool und Request-Coalescing."""
+
+    def __init__(self, base_url: str = "https://api.binance.com", api_key: str | None = None,
+                 pool_size: int = 20, timeout: float = 10.0,
+                 scheduler: RequestWeightScheduler | None = None):
+        """
+        Initialisiert den BinanceHTTPTransport.
+
+        Args:
+            base_url (str): Basis-URL der REST API.
+            api_key (str | None): Optionaler API-Schlüssel, wird als 'X-MBX-APIKEY' gesendet.
+            pool_size (int): Maximale Anzahl gleichzeitig offener Verbindungen.
+            timeout (float): Gesamt-Timeout pro Aufruf in Sekunden.
+            scheduler (RequestWeightScheduler | None): Scheduler für das Request-Gewicht.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.scheduler = scheduler if scheduler is not None else RequestWeightScheduler()
+        self.coalesced_requests = 0
+        self._session: aiohttp.ClientSession | None = None
+        self._inflight: dict[tuple, asyncio.Future] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Die Session wird erst im laufenden Event-Loop angelegt
+        if self._session is None or self._session.closed:
+            headers = {"X-MBX-APIKEY": self.api_key} if self.api_key else None
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=headers,
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Schließt alle Verbindungen des Pools."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get(self, path: str, params: dict | None = None, weight: int = 1):
+        """
+        Führt einen GET-Aufruf aus.
+
+        Gleichzeitige Aufrufe mit identischem Pfad und identischen Parametern teilen sich einen
+        einzigen Upstream-Aufruf. Wird dessen Auslöser abgebrochen, übernimmt ein Wartender den Aufruf.
+
+        Args:
+            path (str): Der Pfad des Endpunkts (z.B. '/api/v3/klines').
+            params (dict | None): Die Query-Parameter.
+            weight (int): Das Request-Gewicht des Endpunkts.
+
+        Returns:
+            Die dekodierte JSON-Antwort.
+
+        Raises:
+            BinanceHTTPError: Wenn Binance mit einem Fehlerstatus antwortet.
+        """
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        key = (path, tuple(sorted(params.items())))
+        while (future := self._inflight.get(key)) is not None:
+            self.coalesced_requests += 1
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._request(path, params, weight)
+        except asyncio.CancelledError:
+            # Nicht future.cancel(): die Wartenden selbst wurden nicht abgebrochen und wiederholen den Aufruf
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Die Ausnahme als abgerufen markieren, falls niemand auf den Future gewartet hat
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    async def _request(self, path: str, params: dict, weight: int):
+        await self.scheduler.acquire(weight)
+        session = self._get_session()
+        async with session.get(self.base_url + path, params={k: str(v) for k, v in params.items()}) as response:
+            self.scheduler.update(response.status, response.headers)
+            if response.status >= 400:
+                try:
+                    payload = await response.json(content_type=None)
+                    raise BinanceHTTPError(response.status, payload.get("msg", ""), payload.get("code"))
+                except (ValueError, AttributeError, aiohttp.ContentTypeError):
+                    raise BinanceHTTPError(response.status, await response.text()) from None
+            return await response.json(content_type=None)
@@ -0,0 +1,193 @@
+"""
+Candle Archive - Persistentes Archiv historischer Candlesticks mit Memory-Mapped-Zugriff
+
+Pro (Symbol, Intervall) gibt es eine Append-only-Binärdatei. Auf einen Header fester Größe
+folgen Datensätze fester Breite im Layout von kline_store.KLINE_COLUMNS (Little Endian).
+Gelesen wird über mmap, sodass ein Jahr 1m-Candlesticks ohne Kopie als NumPy-Array vorliegt.
+"""
+
+import os
+import struct
+import time
+
+import numpy as np
+
+from kline_store import KLINE_COLUMNS, interval_to_ms
+
+ARCHIVE_MAGIC = b"CA3KLINE"
+ARCHIVE_VERSION = 1
+
+# Header: Magic, Version, Datensatzgröße, Anzahl der Datensätze, erste und letzte Öffnungszeit,
+# Symbol und Intervall. Auf 64 Bytes aufgefüllt.
+_HEADER = struct.Struct("<8sHHQqq16s8s")
+HEADER_SIZE = 64
+
+RECORD_DTYPE = np.dtype([(name, np.dtype(dtype).newbyteorder("<")) for name, dtype in KLINE_COLUMNS])
+
+
+class CandleArchive:
+    """Verwaltet die Archivdateien in einem Verzeichnis."""
+
+    def __init__(self, root_dir: str = "candle_archive"):
+        """
+        Initialisiert das CandleArchive.
+
+        Args:
+            root_dir (str): Das Verzeichnis der Archivdateien. Wird bei Bedarf angelegt.
+        """
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def path(self, symbol: str, interval: str) -> str:
+        """Gibt den Pfad der Archivdatei eines Symbols und Intervalls zurück."""
+        return os.path.join(self.root_dir, f"{symbol.upper()}_{interval}.klines")
+
+    def _read_header(self, symbol: str, interval: str) -> dict | None:
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            raw = f.read(_HEADER.size)
+        magic, version, record_size, count, first, last, _, _ = _HEADER.unpack(raw)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"Ungültige oder inkompatible Archivdatei: {path}")
+        return {"count": count, "first_open_time": first, "last_open_time": last}
+
+    @staticmethod
+    def _pack_header(symbol: str, interval: str, count: int, first: int, last: int) -> bytes:
+        header = _HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, RECORD_DTYPE.itemsize, count, first, last,
+                              symbol.upper().encode(), interval.encode())
+        return header.ljust(HEADER_SIZE, b"\0")
+
+    def count(self, symbol: str, interval: str) -> int:
+        """Gibt die Anzahl der archivierten Candlesticks zurück."""
+        header = self._read_header(symbol, interval)
+        return header["count"] if header else 0
+
+    def last_open_time(self, symbol: str, interval: str) -> int | None:
+        """Gibt die Öffnungszeit des jüngsten archivierten Candlesticks zurück oder None."""
+        header = self._read_header(symbol, interval)
+        if not header or header["count"] == 0:
+            return None
+        return header["last_open_time"]
+
+    def append(self, symbol: str, interval: str, klines: list) -> int:
+        """
+        Hängt Candlesticks im Binance-Format an das Archiv an.
+
+        Candlesticks, die nicht neuer als der jüngste archivierte sind, werden übersprungen.
+        Der Header wird erst nach den Daten geschrieben, ein abgebrochener Schreibvorgang
+        hinterlässt daher höchstens ungenutzte Bytes am Dateiende.
+
+        Args:
+            symbol (str): Das Handelspaar.
+            interval (str): Das Zeitintervall.
+            klines (list): Candlesticks in chronologischer Reihenfolge.
+
+        Returns:
+            int: Die Anzahl der neu archivierten Candlesticks.
+        """
+        header = self._read_header(symbol, interval)
+        last = header["last_open_time"] if header and header["count"] else None
+        rows = [tuple(k[:len(KLINE_COLUMNS)]) for k in klines if last is None or int(k[0]) > last]
+        if not rows:
+            return 0
+
+        data = np.empty(len(rows), dtype=RECORD_DTYPE)
+        for i, (name, dtype) in enumerate(KLINE_COLUMNS):
+            if np.dtype(dtype).kind == "i":
+                data[name] = [int(row[i]) for row in rows]
+            else:
+                data[name] = np.array([row[i] for row in rows], dtype=np.float64)
+
+        path = self.path(symbol, interval)
+        count = header["count"] if header else 0
+        first = header["first_open_time"] if header and count else int(data["open_time"][0])
+        mode = "r+b" if header else "w+b"
+        with open(path, mode) as f:
+            if not header:
+                f.write(self._pack_header(symbol, interval, 0, first, first))
+            f.seek(HEADER_SIZE + count * RECORD_DTYPE.itemsize)
+            f.write(data.tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(0)
+            f.write(self._pack_header(symbol, interval, count + len(rows), first, int(data["open_time"][-1])))
+        return len(rows)
+
+    def load(self, symbol: str, interval: str) -> np.ndarray:
+        """
+        Öffnet das Archiv eines Symbols als schreibgeschütztes Memory-Mapped-Array.
+
+        Args:
+            symbol (str): Das Handelspaar.
+            interval (str): Das Zeitintervall.
+
+        Returns:
+            np.ndarray: Ein strukturiertes Array (RECORD_DTYPE). Spalten wie data['close'] sind
+                        Views ohne Kopie. Leer, wenn noch nichts archiviert wurde.
+        """
+        count = self.count(symbol, interval)
+        if count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.path(symbol, interval), dtype=RECORD_DTYPE, mode="r",
+                         offset=HEADER_SIZE, shape=(count,))
+
+    def query(self, symbol: str, interval: str, start_time: int | None = None,
+              end_time: int | None = None) -> np.ndarray:
+        """
+        Gibt alle Candlesticks mit start_time <= Öffnungszeit <= end_time zurück.
+
+        Args:
+            symbol (str): Das Handelspaar.
+            interval (str): Das Zeitintervall.
+            start_time (int | None): Untere Grenze in Millisekunden (inklusive).
+            end_time (int | None): Obere Grenze in Millisekunden (inklusive).
+
+        Returns:
+            np.ndarray: Ein Ausschnitt des Memory-Mapped-Arrays ohne Kopie.
+        """
+        data = self.load(symbol, interval)
+        open_times = data["open_time"]
+        lo = 0 if start_time is None else int(np.searchsorted(open_times, start_time, side="left"))
+        hi = len(data) if end_time is None else int(np.searchsorted(open_times, end_time, side="right"))
+        return data[lo:hi]
+
+    async def sync(self, binance_client, symbol: str, interval: str, start_time: int | None = None,
+                   batch_size: int = 1000) -> int:
+        """
+        Lädt alle abgeschlossenen Candlesticks nach, die neuer als der jüngste archivierte sind.
+
+        Args:
+            binance_client (BinanceAPIClient): Die Quelle der Candlesticks.
+            symbol (str): Das Handelspaar.
+            interval (str): Das Zeitintervall.
+            start_time (int | None): Beginn der Historie in Millisekunden, falls das Archiv leer ist
+                                     (Standard: ein Jahr zurück).
+            batch_size (int): Candlesticks pro REST-Aufruf (max. 1000).
+
+        Returns:
+            int: Die Anzahl der neu archivierten Candlesticks.
+        """
+        step = interval_to_ms(interval)
+        last = self.last_open_time(symbol, interval)
+        if last is not None:
+            next_time = last + step
+        elif start_time is not None:
+            next_time = start_time
+        else:
+            next_time = int(time.time() * 1000) - 365 * 86_400_000
+
+        added = 0
+        while True:
+            now_ms = int(time.time() * 1000)
+            klines = await binance_client.fetch_klines(symbol, interval, batch_size, start_time=next_time)
+            # Nur abgeschlossene Candlesticks archivieren, das Archiv ist append-only
+            closed = [k for k in klines if int(k[6]) < now_ms]
+            if closed:
+                added += self.append(symbol, interval, closed)
+                next_time = int(closed[-1][0]) + step
+            if len(closed) < batch_size:
+                break
+        return added
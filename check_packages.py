@@ -1,18 +1,25 @@
-import pkg_resources
 import os
+import re
+from importlib.metadata import PackageNotFoundError, version
+
+# 'paket[extra]==1.0 # Kommentar' -> Name, Operator, Version
+REQUIREMENT_PATTERN = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*(?:(==|>=|<=|~=|!=|>|<)\s*([^\s;#,]+))?")
+
 
 def check_required_packages(requirements_file='requirements.txt'):
     """
     Überprüft, ob alle in der requirements.txt-Datei gelisteten Pakete installiert sind.
+
+    Pro Anforderung wird nur die Metadaten-Datei des Pakets gelesen (importlib.metadata) statt
+    alle installierten Distributionen zu durchsuchen; exakt gepinnte Versionen (==) werden verglichen.
     """
     if not os.path.exists(requirements_file):
         print(f"Fehler: Die Datei '{requirements_file}' wurde nicht gefunden.")
         return
 
     print(f"Überprüfe Pakete aus '{requirements_file}'...")
-    
+
     missing_packages = []
-    installed_packages = {pkg.key for pkg in pkg_resources.working_set}
 
     with open(requirements_file, 'r') as f:
         for line in f:
@@ -20,12 +27,20 @@ def check_required_packages(requirements_file='requirements.txt'):
             if not line or line.startswith('#'):
                 continue
 
-            # Versuche, Paketnamen und Version zu trennen
             # Berücksichtigt Fälle wie 'package==version', 'package>=version', 'package'
-            package_name = line.split('==')[0].split('>=')[0].split('<=')[0].strip().lower()
+            match = REQUIREMENT_PATTERN.match(line)
+            if match is None:
+                continue
+            package_name, operator, required_version = match.groups()
+            requirement = line.split('#')[0].strip()
 
-            if package_name and package_name not in installed_packages:
-                missing_packages.append(line)
+            try:
+                installed_version = version(package_name)
+            except PackageNotFoundError:
+                missing_packages.append(requirement)
+                continue
+            if operator == '==' and installed_version != required_version:
+                missing_packages.append(f"{requirement} (installiert: {installed_version})")
 
     if missing_packages:
         print("\nDie folgenden Pakete aus requirements.txt sind NICHT installiert oder haben die falsche Version:")
@@ -1,21 +1,89 @@
-from anthropic import Anthropic
-from anthropic.types import MessageParam  # Importiert MessageParam für korrekte Typisierung
+import asyncio
+import hashlib
 import os
+import time
+from typing import TYPE_CHECKING
+
+from market_cache import MarketDataCache
+
+if TYPE_CHECKING:
+    # Das Anthropic-SDK wird erst beim ersten Aufruf geladen (siehe ClaudeAPI.client)
+    from anthropic import AsyncAnthropic
+    from anthropic.types import MessageParam  # Importiert MessageParam für korrekte Typisierung
+
+DEFAULT_MODEL = "claude-3-5-sonnet-20241022"
 
 
 class ClaudeAPI:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: str | None = None, max_concurrency: int = 4,
+                 response_cache: MarketDataCache | None = None):
         """
         Initialisiert die ClaudeAPI mit dem Anthropic API-Schlüssel.
         Args:
             api_key (str): Ihr Anthropic API-Schlüssel.
+            base_url (str | None): Optionale Basis-URL der Messages API (z.B. für einen lokalen Testserver).
+            max_concurrency (int): Maximale Anzahl gleichzeitiger Anfragen an die Anthropic API.
+            response_cache (MarketDataCache | None): Cache für Analyse-Antworten. Wird bei Bedarf angelegt.
         """
         if not api_key:
             raise ValueError(
                 "Anthropic API Key ist nicht gesetzt. Bitte setzen Sie die Umgebungsvariable 'ANTHROPIC_API_KEY'.")
-        self.client = Anthropic(api_key=api_key)
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client: "AsyncAnthropic | None" = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.response_cache = response_cache if response_cache is not None else MarketDataCache(max_entries=1000)
+
+        # Zähler pro Aufruf und kumuliert, um Kontextgröße und Latenz zu messen
+        self.last_call: dict = {}
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_latency = 0.0
+        self.total_first_token_latency = 0.0
+
+    @property
+    def client(self) -> "AsyncAnthropic":
+        """Der Anthropic-Client. SDK-Import und Aufbau erfolgen erst beim ersten Zugriff."""
+        if self._client is None:
+            from anthropic import AsyncAnthropic
+            # Der asynchrone Client blockiert den Event-Loop des Bots nicht
+            self._client = AsyncAnthropic(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    def _record_call(self, usage, started: float, first_token_at: float | None) -> None:
+        """Übernimmt Token-Verbrauch und Latenzen eines abgeschlossenen Aufrufs in die Zähler."""
+        finished = time.perf_counter()
+        self.last_call = {
+            "input_tokens": usage.input_tokens if usage else 0,
+            "output_tokens": usage.output_tokens if usage else 0,
+            "latency": finished - started,
+            "first_token_latency": (first_token_at or finished) - started,
+        }
+        self.calls += 1
+        self.input_tokens += self.last_call["input_tokens"]
+        self.output_tokens += self.last_call["output_tokens"]
+        self.total_latency += self.last_call["latency"]
+        self.total_first_token_latency += self.last_call["first_token_latency"]
 
-    async def generate_response(self, user_message: str, model: str = "claude-3-5-sonnet-20241022",
+    def usage_stats(self) -> dict:
+        """
+        Gibt die kumulierten Zähler aller Aufrufe zurück.
+
+        Returns:
+            dict: Anzahl der Aufrufe, Tokens (gesamt und im Mittel) und mittlere Latenzen in Sekunden.
+        """
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "avg_input_tokens": self.input_tokens / calls,
+            "avg_latency": self.total_latency / calls,
+            "avg_first_token_latency": self.total_first_token_latency / calls,
+        }
+
+    async def generate_response(self, user_message: str, model: str = DEFAULT_MODEL,
                                 max_tokens: int = 1024) -> str:
         """
         Generiert eine Antwort mithilfe des Anthropic Claude Modells.
@@ -33,11 +101,14 @@ class ClaudeAPI:
         ]
 
         try:
-            response = await self.client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                messages=messages
-            )
+            async with self._semaphore:
+                started = time.perf_counter()
+                response = await self.client.messages.create(
+                    model=model,
+                    max_tokens=max_tokens,
+                    messages=messages
+                )
+                self._record_call(response.usage, started, None)
             # Überprüfen, ob die Antwort Textinhalt hat
             if response.content and response.content[0].text:
                 return response.content[0].text
@@ -47,6 +118,87 @@ class ClaudeAPI:
             print(f"Fehler bei der Kommunikation mit der Anthropic API: {e}")
             return "Entschuldigung, bei der Kommunikation mit der KI ist ein Fehler aufgetreten."
 
+    async def stream_response(self, user_message: str, model: str = DEFAULT_MODEL, max_tokens: int = 1024):
+        """
+        Streamt die Antwort des Modells in Textstücken, sobald sie eintreffen.
+
+        Args:
+            user_message (str): Die Nachricht des Benutzers.
+            model (str): Das zu verwendende Claude-Modell.
+            max_tokens (int): Die maximale Anzahl der Tokens in der Antwort.
+
+        Yields:
+            str: Die nächsten Zeichen der Antwort.
+        """
+        messages: list[MessageParam] = [
+            {"role": "user", "content": user_message}
+        ]
+        async with self._semaphore:
+            started = time.perf_counter()
+            first_token_at = None
+            async with self.client.messages.stream(model=model, max_tokens=max_tokens, messages=messages) as stream:
+                async for text in stream.text_stream:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    yield text
+                final_message = await stream.get_final_message()
+            self._record_call(final_message.usage, started, first_token_at)
+
+    @staticmethod
+    def cache_key(model: str, prompt_template: str, snapshot: str, max_tokens: int) -> str:
+        """Inhaltsadresse einer Analyse: SHA-256 über Modell, Prompt-Vorlage und Markt-Snapshot."""
+        digest = hashlib.sha256()
+        for part in (model, str(max_tokens), prompt_template, snapshot):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def analyze(self, prompt_template: str, snapshot: str, expires_at: float, on_text=None,
+                      model: str = DEFAULT_MODEL, max_tokens: int = 1024) -> str:
+        """
+        Erstellt eine Marktanalyse und verwendet identische Analysen bis expires_at wieder.
+
+        Gleichzeitige identische Anfragen teilen sich eine einzige Completion. Nur der Aufrufer,
+        der die Completion auslöst, erhält die Zwischenstände über on_text.
+
+        Args:
+            prompt_template (str): Die Prompt-Vorlage mit dem Platzhalter '{snapshot}'.
+            snapshot (str): Der reproduzierbare Markt-Snapshot.
+            expires_at (float): Gültigkeit der Antwort als Unix-Zeit (z.B. Schluss des Candlesticks).
+            on_text (Callable[[str], Awaitable] | None): Wird mit dem bisher empfangenen Text aufgerufen.
+            model (str): Das zu verwendende Claude-Modell.
+            max_tokens (int): Die maximale Anzahl der Tokens in der Antwort.
+
+        Returns:
+            str: Die vollständige Analyse.
+        """
+        key = self.cache_key(model, prompt_template, snapshot, max_tokens)
+
+        async def complete() -> str:
+            parts = []
+            async for text in self.stream_response(prompt_template.format(snapshot=snapshot), model, max_tokens):
+                parts.append(text)
+                if on_text is not None:
+                    # Die Completion teilen sich alle wartenden Aufrufer: ein fehlgeschlagener
+                    # Zwischenstand (z.B. RetryAfter beim Bearbeiten) darf sie nicht abbrechen
+                    try:
+                        await on_text("".join(parts))
+                    except Exception as e:
+                        print(f"Fehler beim Anzeigen des Zwischenstands: {e}")
+            return "".join(parts)
+
+        try:
+            return await self.response_cache.get_or_load(key, expires_at, complete)
+        except Exception as e:
+            print(f"Fehler bei der Kommunikation mit der Anthropic API: {e}")
+            return "Entschuldigung, bei der Kommunikation mit der KI ist ein Fehler aufgetreten."
+
+    async def close(self) -> None:
+        """Schließt die HTTP-Verbindungen des Anthropic-Clients, sofern er angelegt wurde."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
 
 # Beispiel für die Verwendung (nur zum Testen, kann in main.py oder crypto_scalping_bot.py integriert werden)
 async def main():
@@ -65,9 +217,13 @@ async def main():
     response_text = await claude_api.generate_response("Was ist die Hauptstadt von Frankreich?")
     print(f"Claude antwortet: {response_text}")
 
+    # Beispiel für eine gestreamte Antwort
+    async for text in claude_api.stream_response("Nenne drei bekannte Kryptowährungen."):
+        print(text, end="", flush=True)
+    print()
 
-if __name__ == "__main__":
-    import asyncio
+    await claude_api.close()
 
-    asyncio.run(main())
 
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,26 +2,71 @@
 Crypto Scalping Bot - Telegram Bot Implementation
 """
 
+import contextlib
 import datetime
+import functools
+import math
 import asyncio
 import os
+import re
+import signal
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
-
-from user_database import UserDatabase
-from payment_handler import PaymentHandler
+from telegram.error import BadRequest
+from telegram.ext import (Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler,
+                          PreCheckoutQueryHandler, filters)
+
+from entitlement_cache import Tier
+from message_dispatcher import PRIORITY_NOTIFICATION, MessageDispatcher
+from rate_limiter import RateLimiter, quotas_from_prices
+from update_processor import UserOrderedUpdateProcessor
+from startup import STARTUP
+
+if TYPE_CHECKING:
+    # Die Subsysteme (NumPy, Prozess-Pool, aiohttp-Server, Anthropic) werden erst bei der ersten
+    # Verwendung geladen, damit der Import des Bots billig bleibt
+    from binance_api_client import BinanceAPIClient
+    from claude_api import ClaudeAPI
+    from market_snapshot import SnapshotBuilder
+    from payment_handler import PaymentHandler
+    from payment_providers import Invoice
+    from price_alerts import PriceAlertEngine
+    from signal_scanner import SignalScanner
+    from user_database import UserDatabase
+    from webhook_server import WebhookServer
 
 # Lade Umgebungsvariablen
 load_dotenv()
 
+# Prompt-Vorlage für /analyze. Zusammen mit Modell und Snapshot bildet sie den Cache-Schlüssel.
+ANALYSIS_PROMPT = (
+    "Du bist ein Krypto-Scalping-Analyst. Analysiere den folgenden Markt-Snapshot kurz und "
+    "nenne Trend, wichtige Niveaus und ein mögliches Scalping-Setup mit Risiko-Hinweis.\n\n{snapshot}"
+)
+
+# Mindestabstand zwischen zwei Bearbeitungen der gestreamten Antwort (Telegram-Limits)
+STREAM_EDIT_INTERVAL = 1.0
+
+# '/alert BTCUSDT > 70000': Vergleichsoperator und Schwelle, auch ohne Leerzeichen
+ALERT_PATTERN = re.compile(r"^(>=|<=|>|<)\s*([0-9]*\.?[0-9]+)$")
+
+# Anzeigenamen der Zahlungsanbieter für die Auswahl beim Abonnieren
+PROVIDER_LABELS = {"telegram": "Telegram Payments", "crypto": "Krypto"}
+
 
 class CryptoScalpingBot:
     """Hauptklasse des Telegram-Bots für Krypto-Scalping-Funktionalität."""
 
-    def __init__(self, token: str, anthropic_api_key: str, user_db: UserDatabase,
-                 payment_handler_param: PaymentHandler):
+    def __init__(self, token: str, anthropic_api_key: str, user_db: "UserDatabase",
+                 payment_handler_param: "PaymentHandler", binance_client: "BinanceAPIClient | None" = None,
+                 concurrent_updates: int = 8, base_url: str | None = None,
+                 shard: tuple[int, int] | None = None, outbound_rate: float = 25.0,
+                 admin_ids: set[int] | None = None, payment_port: int | None = None,
+                 metrics_port: int | None = None, profile: bool = False, anthropic_base_url: str | None = None):
         """
         Initialisiert den CryptoScalpingBot.
 
@@ -30,11 +75,64 @@ class CryptoScalpingBot:
             anthropic_api_key (str): Anthropic API Key
             user_db (UserDatabase): Instanz der UserDatabase
             payment_handler_param (PaymentHandler): Instanz des PaymentHandler
+            binance_client (BinanceAPIClient | None): Optionale Instanz des BinanceAPIClient für Marktdaten
+            concurrent_updates (int): Anzahl der Updates, die gleichzeitig verarbeitet werden.
+                                      Updates desselben Benutzers laufen immer nacheinander.
+            base_url (str | None): Optionale Basis-URL der Bot API (z.B. für einen lokalen Testserver).
+            shard (tuple[int, int] | None): (index, workers) im Multi-Worker-Modus, siehe WorkerPool.
+            outbound_rate (float): Maximale Anzahl ausgehender Nachrichten pro Sekunde dieses Prozesses.
+            admin_ids (set[int] | None): Benutzer, die /broadcast verwenden dürfen.
+            payment_port (int | None): Port für die Bestätigungs-Webhooks der Zahlungsanbieter im
+                                       Polling-Modus (im Webhook-Modus dient der Webhook-Server).
+            metrics_port (int | None): Lokaler Port für /metrics und den Profiler (127.0.0.1). None deaktiviert ihn.
+            profile (bool): Startet den Sampling-Profiler direkt beim Start.
+            anthropic_base_url (str | None): Optionale Basis-URL der Anthropic API (z.B. für einen lokalen Testserver).
         """
-        self.application = Application.builder().token(token).build()
+        from metrics import METRICS, InstrumentedRequest
+        from payment_handler import PRICES
+        from payment_providers import TelegramPaymentsProvider
+
+        self.metrics = METRICS
+        builder = Application.builder().token(token).concurrent_updates(
+            UserOrderedUpdateProcessor(concurrent_updates)).request(
+            InstrumentedRequest(self.metrics, connection_pool_size=256))
+        if base_url:
+            builder = builder.base_url(base_url)
+        self.application = builder.build()
         self.anthropic_api_key = anthropic_api_key
+        self.anthropic_base_url = anthropic_base_url
+        # Claude, Snapshot und Scanner entstehen erst beim ersten /analyze bzw. /scan
+        self._claude_api: "ClaudeAPI | None" = None
+        self._snapshot_builder: "SnapshotBuilder | None" = None
+        self._scanner: "SignalScanner | None" = None
         self.db = user_db
         self.payment_handler = payment_handler_param
+        self.binance_client = binance_client
+        self.admin_ids = admin_ids or set()
+        self.webhook_server: "WebhookServer | None" = None
+        self.payment_port = payment_port
+        self.payment_server: "WebhookServer | None" = None
+        self.metrics_port = metrics_port
+        self.metrics_server: "WebhookServer | None" = None
+        self.profile = profile
+        # Kontingente der teuren Befehle pro Benutzer, abhängig von der Abonnementstufe
+        self.rate_limiter = RateLimiter(quotas_from_prices(PRICES))
+        # Alle ausgehenden Nachrichten laufen über den Dispatcher (Flood-Limits, Prioritäten)
+        self.dispatcher = MessageDispatcher(self.application.bot, global_rate=outbound_rate)
+        self.alert_engine: "PriceAlertEngine | None" = None
+        if binance_client is not None:
+            from price_alerts import AlertNotifier, PriceAlertEngine
+
+            self.alert_engine = PriceAlertEngine(user_db, binance_client, AlertNotifier(self.dispatcher),
+                                                 shard=shard)
+            if binance_client.market_stream is not None:
+                binance_client.market_stream.price_listeners.append(self.alert_engine.on_price)
+
+        # Telegram Payments sendet Rechnungen über den Bot dieser Application
+        for provider in self.payment_handler.providers.values():
+            if isinstance(provider, TelegramPaymentsProvider) and provider.bot is None:
+                provider.bot = self.application.bot
+        self.payment_handler.on_activated = self._on_payment_activated
 
         # WICHTIG: Korrekte Zuweisung von post_init und post_shutdown als Attribute
         # Dies behebt den TypeError: 'NoneType' object is not callable
@@ -43,15 +141,82 @@ class CryptoScalpingBot:
 
         # Handler registrieren
         self._register_handlers()
+        self._instrument()
+
+    @property
+    def claude_api(self) -> "ClaudeAPI":
+        """Der Claude-Client für /analyze. Import und Aufbau erfolgen erst beim ersten Zugriff."""
+        if self._claude_api is None:
+            from claude_api import ClaudeAPI
+
+            self._claude_api = ClaudeAPI(self.anthropic_api_key, base_url=self.anthropic_base_url)
+            self.metrics.instrument_object(self._claude_api, "claude")
+        return self._claude_api
+
+    @property
+    def snapshot_builder(self) -> "SnapshotBuilder":
+        """Verdichtet Candlesticks für /analyze. Import (NumPy) erst beim ersten Zugriff."""
+        if self._snapshot_builder is None:
+            from market_snapshot import SnapshotBuilder
+
+            self._snapshot_builder = SnapshotBuilder()
+        return self._snapshot_builder
+
+    @property
+    def scanner(self) -> "SignalScanner | None":
+        """Der Markt-Scanner für /scan oder None ohne Binance-Client. Aufbau erst beim ersten Zugriff."""
+        if self._scanner is None and self.binance_client is not None:
+            from signal_scanner import SignalScanner
+
+            self._scanner = SignalScanner(self.binance_client)
+        return self._scanner
 
     async def _post_init(self, application: Application) -> None:
         """
         Callback-Funktion, die ausgeführt wird, nachdem der Bot initialisiert wurde.
         Ideal für asynchrone Setup-Aufgaben wie Datenbankverbindungen.
         """
+        from webhook_server import WebhookServer
+
         print("Bot: Post-Initialisierungsaufgaben werden ausgeführt (Verbindung zur DB)...")
-        await self.db.connect()
-        print("Bot: Datenbank verbunden.")
+        self.dispatcher.start()
+        with STARTUP.phase("init Datenbank (connect, Migrationen)"):
+            await self.db.connect()
+        before, after = self.db.schema_version
+        if before != after:
+            print(f"Bot: Datenbank von Schema-Version {before} auf {after} migriert.")
+        print(f"Bot: Datenbank verbunden (Schema-Version {after}).")
+        with STARTUP.phase("init Berechtigungs-Cache"):
+            active_users = await self.payment_handler.entitlements.load(self.db)
+        print(f"Bot: {active_users} aktive Abonnements in den Berechtigungs-Cache geladen.")
+        if self.binance_client is not None and self.binance_client.market_stream is not None:
+            await self.binance_client.market_stream.start()
+            print(f"Bot: Marktdaten-Stream für {len(self.binance_client.market_stream.symbols)} Symbole gestartet.")
+        if self.alert_engine is not None:
+            with STARTUP.phase("init Preisalarme"):
+                alerts = await self.alert_engine.load()
+            self.alert_engine.start()
+            print(f"Bot: {alerts} Preisalarme geladen.")
+        self.payment_handler.start()
+        if self.metrics_port:
+            # Nur lokal erreichbar; Prometheus läuft auf demselben Host bzw. im selben Pod
+            self.metrics_server = WebhookServer(None, path=None, listen="127.0.0.1", port=self.metrics_port,
+                                                routes=self.metrics.routes())
+            await self.metrics_server.start()
+            print(f"Bot: Metriken unter http://127.0.0.1:{self.metrics_server.port}/metrics")
+        if self.profile:
+            self.metrics.profiler.start()
+        # Beim Polling gibt es keinen Webhook-Server, der die Bestätigungen der Anbieter annimmt
+        routes = self.payment_handler.routes()
+        if routes and self.webhook_server is None and self.payment_port:
+            self.payment_server = WebhookServer(None, path=None, port=self.payment_port, routes=routes)
+            await self.payment_server.start()
+            print(f"Bot: Zahlungs-Webhooks auf Port {self.payment_server.port}.")
+        ready = STARTUP.mark_ready()
+        self.metrics.register_gauge("startup_seconds", lambda: {
+            (("phase", name),): seconds for name, seconds in STARTUP.phases
+        }, "Dauer der Start-Phasen (Importe und Initialisierung)")
+        print(f"Bot: Bereit nach {ready * 1000:.0f} ms.\n{STARTUP.format()}")
 
     async def _post_shutdown(self, application: Application) -> None:
         """
@@ -59,8 +224,27 @@ class CryptoScalpingBot:
         Ideal für asynchrone Bereinigungsaufgaben wie das Schließen von Datenbankverbindungen.
         """
         print("Bot: Post-Shutdown-Aufgaben werden ausgeführt (Schließen der DB-Verbindung)...")
+        self.metrics.profiler.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+            self.metrics_server = None
+        if self.payment_server is not None:
+            await self.payment_server.stop()
+            self.payment_server = None
+        await self.payment_handler.stop()
+        if self.alert_engine is not None:
+            await self.alert_engine.stop()
+        await self.dispatcher.stop()
         await self.db.close()
         print("Bot: Datenbankverbindung geschlossen.")
+        if self._scanner is not None:
+            self._scanner.close()
+        if self.binance_client is not None:
+            if self.binance_client.market_stream is not None:
+                await self.binance_client.market_stream.stop()
+            await self.binance_client.close()
+        if self._claude_api is not None:
+            await self._claude_api.close()
 
 
     def _register_handlers(self):
@@ -69,7 +253,75 @@ class CryptoScalpingBot:
         self.application.add_handler(CommandHandler("start", self.start))
         self.application.add_handler(CommandHandler(["subscribe", "sub"], self.subscribe)) # Alias 'sub' hinzugefügt
         self.application.add_handler(CallbackQueryHandler(self.button_callback))
+        self.application.add_handler(PreCheckoutQueryHandler(self.pre_checkout))
+        self.application.add_handler(MessageHandler(filters.SUCCESSFUL_PAYMENT, self.successful_payment))
         self.application.add_handler(CommandHandler(["check_subscription", "check_sub"], self.check_subscription)) # Alias 'check_sub' hinzugefügt
+        self.application.add_handler(CommandHandler("scan", self._rate_limited("scan", self.scan), block=False))
+        self.application.add_handler(CommandHandler("backtest", self._rate_limited("backtest", self.backtest),
+                                                    block=False))
+        self.application.add_handler(CommandHandler("analyze", self._rate_limited("analyze", self.analyze),
+                                                    block=False))
+        self.application.add_handler(CommandHandler("alert", self.alert))
+        self.application.add_handler(CommandHandler("alerts", self.alerts))
+        self.application.add_handler(CommandHandler("delalert", self.delete_alert))
+        self.application.add_handler(CommandHandler("broadcast", self.broadcast, block=False))
+
+    def _instrument(self):
+        """Erfasst Latenz, laufende Aufrufe und Fehler aller Handler und der Upstream-Clients."""
+        for handlers in self.application.handlers.values():
+            for handler in handlers:
+                commands = getattr(handler, "commands", None)
+                operation = max(commands, key=len) if commands else handler.callback.__name__
+                handler.callback = self.metrics.instrument(handler.callback, "handler", operation)
+        self.metrics.instrument_object(self.db, "sqlite", include=("_commit_batch",))
+        if self.binance_client is not None:
+            self.metrics.instrument_object(self.binance_client, "binance")
+
+        def executor_queue_depth() -> dict:
+            depths = {}
+            default_executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+            if default_executor is not None:
+                depths[(("pool", "default"),)] = default_executor._work_queue.qsize()
+            scanner_executor = getattr(self._scanner, "_executor", None)
+            if scanner_executor is not None:
+                depths[(("pool", "scanner"),)] = len(scanner_executor._pending_work_items)
+            return depths
+
+        self.metrics.register_gauge("executor_queue_depth", executor_queue_depth,
+                                    "Wartende Aufgaben in den Thread- und Prozess-Pools")
+        self.metrics.register_gauge("db_write_queue_depth",
+                                    lambda: self.db._write_queue.qsize() if self.db._write_queue else 0,
+                                    "Schreibvorgänge, die auf den nächsten Commit warten")
+        self.metrics.register_gauge("dispatcher_queue_depth", lambda: {
+            (("lane", lane),): count for lane, count in self.dispatcher.queue_depth().items()
+        }, "Ausgehende Nachrichten pro Prioritätsspur")
+        self.metrics.register_gauge("update_queue_depth", lambda: self.application.update_queue.qsize(),
+                                    "Empfangene, noch nicht verarbeitete Updates")
+        self.metrics.register_gauge("active_subscriptions", lambda: len(self.payment_handler.entitlements),
+                                    "Aktive Abonnements im Berechtigungs-Cache")
+        self.metrics.register_counter("rate_limited_total", lambda: self.rate_limiter.rejected,
+                                      "Vom RateLimiter abgelehnte Aufrufe seit dem Start")
+
+    def _rate_limited(self, command: str, handler):
+        """
+        Umhüllt einen Handler mit dem Kontingent des Befehls.
+
+        Die Prüfung nutzt nur den Berechtigungs-Cache und den RateLimiter im Speicher; abgelehnte
+        Aufrufe erreichen weder die Datenbank noch Binance oder Claude.
+        """
+        @functools.wraps(handler)
+        async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+            user = update.effective_user
+            if user is not None:
+                decision = self.rate_limiter.acquire(command, user.id, self.payment_handler.entitlements.tier(user.id))
+                if not decision.allowed:
+                    if decision.notify:
+                        await self._reply(update, f"Sie haben das Limit für /{command} erreicht. Bitte versuchen "
+                                                  f"Sie es in {math.ceil(decision.retry_after)} Sekunden erneut.")
+                    return
+            await handler(update, context)
+
+        return wrapper
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Sendet Willkommensnachricht und fügt Benutzer zur Datenbank hinzu."""
@@ -79,7 +331,8 @@ class CryptoScalpingBot:
         await self.db.add_user(user_id, username)
 
         # Die Willkommensnachricht ist hier definiert
-        await update.message.reply_text(
+        await self._reply(
+            update,
             f"Hi {username}! Willkommen beim Crypto Analyzer! "
             "Ich helfe dir, den Crypto-Markt zu analysieren."
         )
@@ -93,7 +346,7 @@ class CryptoScalpingBot:
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         # Die Abonnement-Aufforderung ist hier definiert
-        await update.message.reply_text("Wählen Sie ein Abonnement:", reply_markup=reply_markup)
+        await self._reply(update, "Wählen Sie ein Abonnement:", reply_markup=reply_markup)
 
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Behandelt Callback-Abfragen von Inline-Buttons."""
@@ -101,12 +354,33 @@ class CryptoScalpingBot:
         user_id = query.from_user.id
         await query.answer()
 
+        if query.data.startswith("pay_"):
+            # pay_<anbieter>_<typ> aus der Anbieterauswahl
+            _, provider_name, subscription_type = query.data.split("_", 2)
+            await self._start_checkout(query, subscription_type, provider_name)
+            return
+
         if query.data.startswith("subscribe_"):
             subscription_type = query.data.split("_")[1]
             price = await self.payment_handler.get_subscription_price(subscription_type)
 
-            if price is not None:
-                payment_successful = await self.payment_handler.handle_payment(user_id, subscription_type)
+            providers = list(self.payment_handler.providers)
+            if price is not None and len(providers) == 1:
+                await self._start_checkout(query, subscription_type, providers[0])
+            elif price is not None and providers:
+                keyboard = [[InlineKeyboardButton(PROVIDER_LABELS.get(name, name),
+                                                  callback_data=f"pay_{name}_{subscription_type}")]
+                            for name in providers]
+                await query.edit_message_text("Wie möchten Sie bezahlen?",
+                                              reply_markup=InlineKeyboardMarkup(keyboard))
+            elif price is not None:
+                # Die ID der Callback-Abfrage macht wiederholt zugestellte Updates idempotent
+                payment_successful = await self.payment_handler.handle_payment(
+                    user_id,
+                    subscription_type,
+                    idempotency_key=f"telegram-callback:{query.id}",
+                    username=query.from_user.username
+                )
                 if payment_successful:
                     # Erfolgsmeldung ist hier definiert
                     await query.edit_message_text(
@@ -121,6 +395,51 @@ class CryptoScalpingBot:
                 # Meldung für ungültigen Abonnementtyp ist hier definiert
                 await query.edit_message_text("Ungültiger Abonnementtyp ausgewählt.")
 
+    async def _start_checkout(self, query, subscription_type: str, provider_name: str) -> None:
+        """Legt eine Rechnung an; das Abonnement wird erst mit der Bestätigung des Anbieters aktiviert."""
+        result = await self.payment_handler.create_invoice(
+            query.from_user.id, query.message.chat.id, subscription_type, provider_name)
+        if result is None:
+            await query.edit_message_text("Die Rechnung konnte nicht erstellt werden. Bitte versuchen Sie es später erneut.")
+            return
+        invoice, pay_url = result
+        minutes = max(1, (invoice.expires_at - int(time.time())) // 60)
+        if pay_url:
+            await query.edit_message_text(
+                f"Ihre Rechnung für das {subscription_type}-Abonnement ist {minutes} Minuten gültig.",
+                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Jetzt bezahlen", url=pay_url)]])
+            )
+        else:
+            await query.edit_message_text(
+                f"Die Rechnung für Ihr {subscription_type}-Abonnement wurde gesendet ({minutes} Minuten gültig).")
+
+    async def pre_checkout(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Bestätigt Telegram vor der Zahlung, dass die Rechnung noch offen ist."""
+        query = update.pre_checkout_query
+        if await self.payment_handler.is_payable(query.invoice_payload):
+            await query.answer(ok=True)
+        else:
+            await query.answer(ok=False, error_message="Diese Rechnung ist abgelaufen. Bitte fordern Sie mit /sub "
+                                                       "eine neue an.")
+
+    async def successful_payment(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Verbucht eine über Telegram Payments abgeschlossene Zahlung."""
+        from payment_providers import TelegramPaymentsProvider
+
+        provider = self.payment_handler.providers.get(TelegramPaymentsProvider.name)
+        if provider is not None:
+            await provider.handle_successful_payment(update.message)
+
+    async def _on_payment_activated(self, invoice: "Invoice", expires_at: int) -> None:
+        """Benachrichtigt den Benutzer, sobald eine Zahlung bestätigt und verbucht ist."""
+        subscription_type = Tier(invoice.tier).name.lower()
+        self.dispatcher.submit(
+            invoice.chat_id,
+            f"Vielen Dank! Ihr {subscription_type}-Abonnement ist aktiv bis "
+            f"{datetime.date.fromtimestamp(expires_at - 1)}.",
+            PRIORITY_NOTIFICATION
+        )
+
     async def check_subscription(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Überprüft den Abonnementstatus des Benutzers."""
         user_id = update.effective_user.id
@@ -128,29 +447,324 @@ class CryptoScalpingBot:
 
         if user_data and user_data.get('subscription_type'):
             subscription_type = user_data['subscription_type']
-            end_date = user_data.get('subscription_end_date', 'Unbekannt')
+            expires_at = user_data.get('subscription_expires')
+            # Ablauf ist der Beginn des Folgetags; angezeigt wird der letzte gültige Tag
+            end_date = datetime.date.fromtimestamp(expires_at - 1) if expires_at else 'Unbekannt'
             # Abonnementstatus-Meldung ist hier definiert
-            await update.message.reply_text(
+            await self._reply(
+                update,
                 f"Ihr aktuelles Abonnement: {subscription_type}\n"
                 f"Gültig bis: {end_date}"
             )
         else:
             # Meldung bei fehlendem Abonnement ist hier definiert
-            await update.message.reply_text("Sie haben derzeit kein aktives Abonnement.")
+            await self._reply(update, "Sie haben derzeit kein aktives Abonnement.")
+
+    async def scan(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Listet die USDT-Paare mit den besten Scalping-Setups auf."""
+        if self.scanner is None:
+            await self._reply(update, "Der Markt-Scanner ist derzeit nicht verfügbar.")
+            return
+        if not await self.can_make_request(update.effective_user.id):
+            await self._reply(update, "Für diese Funktion benötigen Sie ein aktives Abonnement.")
+            return
+
+        await self._reply(update, "Scanne alle USDT-Paare, bitte einen Moment...")
+        results = await self.scanner.scan(top=10)
+        skipped = self.scanner.last_scan_stats.get("skipped", [])
+        if not results:
+            await self._reply(update, "Der Scan hat keine Ergebnisse geliefert.")
+            return
+
+        lines = [f"Top {len(results)} Scalping-Setups ({self.scanner.interval}):"]
+        for rank, result in enumerate(results, start=1):
+            lines.append(
+                f"{rank}. {result['symbol']}: Score {result['score']:.2f} | "
+                f"RSI {result['rsi']:.1f} | Vol x{result['volume_ratio']:.1f}"
+            )
+        if skipped:
+            lines.append(f"{len(skipped)} Paare mit zu kurzer Historie wurden nicht bewertet.")
+        await self._reply(update, "\n".join(lines))
+
+    async def backtest(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Testet die RSI-Scalping-Strategie über die letzten 1000 Candlesticks eines Paares."""
+        if self.binance_client is None:
+            await self._reply(update, "Backtests sind derzeit nicht verfügbar.")
+            return
+        if not await self.can_make_request(update.effective_user.id):
+            await self._reply(update, "Für diese Funktion benötigen Sie ein aktives Abonnement.")
+            return
+        if not context.args:
+            await self._reply(update, "Verwendung: /backtest SYMBOL [INTERVALL], z.B. /backtest BTCUSDT 5m")
+            return
+
+        symbol = context.args[0].upper()
+        interval = context.args[1] if len(context.args) > 1 else "1m"
+        klines = await self.binance_client.get_klines(symbol, interval, limit=1000)
+        if len(klines) < 50:
+            await self._reply(update, f"Nicht genügend Daten für {symbol} ({interval}).")
+            return
+
+        from backtester import format_result, parameter_sweep
+
+        close = [float(k[4]) for k in klines]
+        # Kleiner Sweep im Thread-Pool, damit der Event-Loop frei bleibt
+        results = await asyncio.to_thread(
+            parameter_sweep, close, interval, [7, 14], [20, 25, 30], [65, 70, 75], max_workers=1
+        )
+        lines = [f"Backtest {symbol} ({interval}, {len(close)} Candlesticks), beste Parameter:"]
+        lines.extend(format_result(result) for result in results[:3])
+        await self._reply(update, "\n".join(lines))
+
+    async def analyze(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Erstellt eine KI-Analyse eines Paares und streamt sie progressiv in die Antwortnachricht."""
+        if self.binance_client is None:
+            await self._reply(update, "Analysen sind derzeit nicht verfügbar.")
+            return
+        if not await self.can_make_request(update.effective_user.id):
+            await self._reply(update, "Für diese Funktion benötigen Sie ein aktives Abonnement.")
+            return
+        if not context.args:
+            await self._reply(update, "Verwendung: /analyze SYMBOL [INTERVALL], z.B. /analyze BTCUSDT 5m")
+            return
+
+        symbol = context.args[0].upper()
+        interval = context.args[1] if len(context.args) > 1 else "5m"
+        klines = await self.binance_client.get_klines(symbol, interval, limit=100)
+        if not klines:
+            await self._reply(update, f"Keine Marktdaten für {symbol} ({interval}) gefunden.")
+            return
+
+        from market_cache import candle_close_time
+
+        message = await self._reply(update, f"Analysiere {symbol} ({interval})...")
+        loop = asyncio.get_running_loop()
+        last_edit = loop.time()
+
+        async def on_text(text: str) -> None:
+            nonlocal last_edit
+            if loop.time() - last_edit >= STREAM_EDIT_INTERVAL:
+                last_edit = loop.time()
+                await self._edit_text(message, text + " ▌")
+
+        analysis = await self.claude_api.analyze(
+            ANALYSIS_PROMPT, self.snapshot_builder.build(symbol, interval, klines),
+            expires_at=candle_close_time(interval), on_text=on_text
+        )
+        await self._edit_text(message, analysis)
+
+    async def alert(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Legt einen Preisalarm an, z.B. /alert BTCUSDT > 70000."""
+        if self.alert_engine is None:
+            await self._reply(update, "Preisalarme sind derzeit nicht verfügbar.")
+            return
+        if not await self.can_make_request(update.effective_user.id):
+            await self._reply(update, "Für diese Funktion benötigen Sie ein aktives Abonnement.")
+            return
+        match = ALERT_PATTERN.match(" ".join(context.args[1:])) if len(context.args) >= 2 else None
+        if match is None:
+            await self._reply(update, "Verwendung: /alert SYMBOL > PREIS oder /alert SYMBOL < PREIS")
+            return
+
+        symbol = context.args[0].upper()
+        # Nur handelbare Paare: jeder gespeicherte Alarm wird bei jeder Abfrage mitgeprüft
+        tradable = await self.binance_client.get_usdt_symbols()
+        if not tradable:
+            await self._reply(update, "Die Handelspaare können gerade nicht geprüft werden. Bitte später erneut versuchen.")
+            return
+        if symbol not in tradable:
+            await self._reply(update, f"Unbekanntes Handelspaar {symbol}. Alarme sind für handelbare USDT-Paare möglich.")
+            return
+        from price_alerts import ABOVE, BELOW
+
+        direction = ABOVE if match.group(1).startswith(">") else BELOW
+        threshold = float(match.group(2))
+        new_alert = await self.alert_engine.add(update.effective_user.id, symbol, direction, threshold)
+        if new_alert is None:
+            await self._reply(
+                update,
+                f"Sie haben bereits {self.alert_engine.max_alerts_per_user} aktive Alarme. "
+                "Löschen Sie zuerst einen mit /delalert ID.")
+            return
+        sign = ">=" if direction == ABOVE else "<="
+        await self._reply(update, f"Alarm #{new_alert.alert_id} gesetzt: {symbol} {sign} {threshold:g}")
+
+    async def alerts(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Listet die aktiven Preisalarme des Benutzers auf."""
+        if self.alert_engine is None:
+            await self._reply(update, "Preisalarme sind derzeit nicht verfügbar.")
+            return
+        user_alerts = self.alert_engine.user_alerts(update.effective_user.id)
+        if not user_alerts:
+            await self._reply(update, "Sie haben keine aktiven Preisalarme.")
+            return
+        from price_alerts import ABOVE
+
+        lines = ["Ihre Preisalarme:"]
+        for a in user_alerts:
+            lines.append(f"#{a.alert_id} {a.symbol} {'>=' if a.direction == ABOVE else '<='} {a.threshold:g}")
+        await self._reply(update, "\n".join(lines))
+
+    async def delete_alert(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Löscht einen Preisalarm, z.B. /delalert 12."""
+        if self.alert_engine is None:
+            await self._reply(update, "Preisalarme sind derzeit nicht verfügbar.")
+            return
+        if not context.args or not context.args[0].lstrip("#").isdigit():
+            await self._reply(update, "Verwendung: /delalert ID")
+            return
+        alert_id = int(context.args[0].lstrip("#"))
+        if await self.alert_engine.remove(update.effective_user.id, alert_id):
+            await self._reply(update, f"Alarm #{alert_id} gelöscht.")
+        else:
+            await self._reply(update, f"Alarm #{alert_id} wurde nicht gefunden.")
+
+    async def broadcast_signal(self, text: str, subscription_types: list[str] | None = None) -> dict:
+        """
+        Sendet eine Nachricht an alle Benutzer mit aktivem Abonnement.
+
+        Die Empfänger werden seitenweise aus der Datenbank gelesen und direkt an den Dispatcher
+        weitergereicht; die Empfängerliste liegt nie vollständig im Speicher.
+
+        Args:
+            text (str): Die Nachricht, z.B. ein Scalping-Signal.
+            subscription_types (list[str] | None): Nur Abonnenten dieser Typen. Standard: alle.
+
+        Returns:
+            dict: Anzahl der gesendeten ('sent') und fehlgeschlagenen ('failed') Nachrichten.
+        """
+        tiers = [Tier.from_name(name) for name in subscription_types] if subscription_types else None
+
+        async def recipients():
+            async for user_id, _ in self.db.iter_active_subscribers(int(time.time()), tiers):
+                yield user_id
+
+        return await self.dispatcher.broadcast_stream(recipients(), text)
+
+    async def broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Sendet eine Nachricht an alle Abonnenten, z.B. /broadcast vip,premium Text (nur für Admins)."""
+        if update.effective_user.id not in self.admin_ids:
+            return
+        if not context.args:
+            await self._reply(update, "Verwendung: /broadcast [TYP,TYP] NACHRICHT")
+            return
+        from payment_handler import PRICES
+
+        args = list(context.args)
+        subscription_types = None
+        candidates = args[0].lower().split(",")
+        if len(args) > 1 and all(candidate in PRICES for candidate in candidates):
+            subscription_types = candidates
+            args = args[1:]
+        result = await self.broadcast_signal(" ".join(args), subscription_types)
+        await self._reply(update, f"Broadcast beendet: {result['sent']} gesendet, {result['failed']} fehlgeschlagen.")
+
+    async def _reply(self, update: Update, text: str, **kwargs):
+        """Antwortet im Chat des Updates über den Dispatcher (höchste Priorität)."""
+        return await self.dispatcher.send_message(update.effective_chat.id, text, **kwargs)
 
     @staticmethod
-    async def can_make_request(user_id: int) -> bool:
+    async def _edit_text(message, text: str) -> None:
+        """Bearbeitet eine Nachricht und ignoriert unveränderte Inhalte."""
+        try:
+            await message.edit_text(text[:4096])
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+
+    async def can_make_request(self, user_id: int) -> bool:
         """Überprüft, ob der Benutzer Anfragen basierend auf dem Abonnementstatus stellen kann."""
-        # Platzhalter - tatsächliche Abonnementprüfung implementieren
-        return True
-
-    # Diese Methode ist SYNCHRON, da run_polling selbst den Loop verwaltet
-    def run(self):
-        """Startet das Polling des Bots. Diese Methode ist blockierend."""
-        print("Bot polling wird gestartet...")
-        self.application.run_polling(
-            allowed_updates=Update.ALL_TYPES
-        )
+        # Reiner Dictionary-Zugriff auf den Berechtigungs-Cache, ohne Datenbank oder Datumsparsing
+        return self.payment_handler.entitlements.is_active(user_id)
+
+    async def serve_webhook(self, webhook_url: str | None, listen: str = "0.0.0.0", port: int = 8443,
+                            secret_token: str | None = None, stop_event: asyncio.Event | None = None,
+                            max_connections: int = 40) -> None:
+        """
+        Betreibt den Bot im Webhook-Modus, bis stop_event gesetzt wird.
+
+        Args:
+            webhook_url (str | None): Öffentliche HTTPS-URL des Endpunkts. None registriert keinen Webhook
+                                      bei Telegram (z.B. hinter einem bereits konfigurierten Proxy).
+            listen (str): Die Adresse, auf der der Server lauscht.
+            port (int): Der Port, auf dem der Server lauscht.
+            secret_token (str | None): Geheimes Token, das Telegram bei jedem Update mitsendet. Ohne Token
+                                       wird eines erzeugt und mit setWebhook registriert; ohne webhook_url
+                                       ist es Pflicht.
+            stop_event (asyncio.Event | None): Beendet den Betrieb, sobald es gesetzt ist.
+            max_connections (int): Maximale Anzahl paralleler Verbindungen, die Telegram öffnet.
+        """
+        from webhook_server import ALLOWED_UPDATES, WebhookServer, resolve_secret_token
+
+        path = urlparse(webhook_url).path if webhook_url else "/telegram"
+        if webhook_url:
+            secret_token = resolve_secret_token(secret_token)
+        server = WebhookServer(self.application, path=path or "/telegram", secret_token=secret_token,
+                               listen=listen, port=port, routes=self.payment_handler.routes())
+        self.webhook_server = server
+        stop_event = stop_event or asyncio.Event()
+
+        async with self.lifecycle():
+            await server.start()
+            try:
+                if webhook_url:
+                    await self.application.bot.set_webhook(
+                        webhook_url, allowed_updates=ALLOWED_UPDATES, secret_token=secret_token,
+                        max_connections=max_connections, drop_pending_updates=False
+                    )
+                print(f"Bot: Webhook-Server lauscht auf {listen}:{server.port}{server.path}")
+                await stop_event.wait()
+            finally:
+                await server.stop()
+
+    @contextlib.asynccontextmanager
+    async def lifecycle(self):
+        """
+        Startet die Application ohne eigenen Update-Empfang (Webhook, Worker-Prozess).
+
+        Dieselbe Reihenfolge wie run_polling: initialize, post_init, start ... stop, shutdown,
+        post_shutdown. stop() verarbeitet vorher alle Updates, die bereits in der update_queue liegen.
+        """
+        with STARTUP.phase("init Telegram (getMe, HTTP-Clients)"):
+            await self.application.initialize()
+        try:
+            await self.application.post_init(self.application)
+            await self.application.start()
+            yield self.application
+        finally:
+            if self.application.running:
+                await self.application.stop()
+            await self.application.shutdown()
+            await self.application.post_shutdown(self.application)
+
+    # Diese Methode ist SYNCHRON, da run_polling bzw. asyncio.run selbst den Loop verwalten
+    def run(self, webhook_url: str | None = None, listen: str = "0.0.0.0", port: int = 8443,
+            secret_token: str | None = None):
+        """
+        Startet den Bot. Diese Methode ist blockierend.
+
+        Ohne webhook_url wird gepollt, andernfalls stellt Telegram die Updates per Webhook zu.
+        """
+        if not webhook_url:
+            from webhook_server import ALLOWED_UPDATES
+
+            print("Bot polling wird gestartet...")
+            self.application.run_polling(allowed_updates=ALLOWED_UPDATES)
+            return
+
+        print("Bot webhook wird gestartet...")
+
+        async def serve():
+            stop_event = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, stop_event.set)
+                except NotImplementedError:
+                    pass  # z.B. unter Windows
+            await self.serve_webhook(webhook_url, listen, port, secret_token, stop_event)
+
+        asyncio.run(serve())
 
 
 # Nur ausführen, wenn direkt aufgerufen (nicht importiert)
@@ -170,6 +784,9 @@ if __name__ == "__main__":
         exit(1)
 
     # Komponenten initialisieren
+    from payment_handler import PaymentHandler
+    from user_database import UserDatabase
+
     db_instance = UserDatabase()
     payment_handler_instance = PaymentHandler(db_instance)
 
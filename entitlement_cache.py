@@ -0,0 +1,101 @@
+"""
+Entitlement Cache - In-Memory-Cache der aktiven Abonnements für die Anfrageprüfung
+"""
+
+import heapq
+import time
+from enum import IntEnum
+
+
+class Tier(IntEnum):
+    """Abonnementstufen als kleine Ganzzahlen."""
+    NONE = 0
+    BASIC = 1
+    PREMIUM = 2
+    VIP = 3
+
+    @classmethod
+    def from_name(cls, name: str | None) -> "Tier":
+        """Wandelt einen Abonnementtyp wie 'premium' in die Stufe um (unbekannt -> NONE)."""
+        if not name:
+            return cls.NONE
+        return cls.__members__.get(name.upper(), cls.NONE)
+
+
+class EntitlementCache:
+    """
+    Hält Stufe und Ablaufzeit aller aktiven Benutzer als (Epoch-int, Tier)-Tupel im Speicher.
+
+    Abgelaufene Einträge werden über einen Min-Heap der Ablaufzeiten entfernt, ohne alle
+    Einträge zu durchsuchen. Veraltete Heap-Einträge (nach Verlängerungen) werden beim
+    Herausnehmen übersprungen.
+    """
+
+    def __init__(self):
+        self._entries: dict[int, tuple[int, Tier]] = {}
+        self._expiry_heap: list[tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set(self, user_id: int, tier: Tier, expires_at: int) -> None:
+        """
+        Setzt oder ersetzt die Berechtigung eines Benutzers.
+
+        Args:
+            user_id (int): Die ID des Benutzers.
+            tier (Tier): Die Abonnementstufe.
+            expires_at (int): Der Ablaufzeitpunkt als Unix-Zeit in Sekunden.
+        """
+        if tier == Tier.NONE or expires_at <= time.time():
+            self._entries.pop(user_id, None)
+            return
+        self._entries[user_id] = (expires_at, tier)
+        heapq.heappush(self._expiry_heap, (expires_at, user_id))
+
+    def invalidate(self, user_id: int) -> None:
+        """Entfernt die Berechtigung eines Benutzers. Der Heap-Eintrag verfällt von selbst."""
+        self._entries.pop(user_id, None)
+
+    def expire(self, now: float | None = None) -> int:
+        """
+        Entfernt alle Einträge, deren Ablaufzeit erreicht ist.
+
+        Returns:
+            int: Die Anzahl der entfernten Benutzer.
+        """
+        now = time.time() if now is None else now
+        heap = self._expiry_heap
+        removed = 0
+        while heap and heap[0][0] <= now:
+            expires_at, user_id = heapq.heappop(heap)
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == expires_at:
+                del self._entries[user_id]
+                removed += 1
+        return removed
+
+    def tier(self, user_id: int) -> Tier:
+        """Gibt die aktive Stufe eines Benutzers zurück (Tier.NONE ohne aktives Abonnement)."""
+        if self._expiry_heap and self._expiry_heap[0][0] <= time.time():
+            self.expire()
+        entry = self._entries.get(user_id)
+        return entry[1] if entry is not None else Tier.NONE
+
+    def is_active(self, user_id: int) -> bool:
+        """Prüft ohne I/O, ob ein Benutzer ein aktives Abonnement hat."""
+        return self.tier(user_id) != Tier.NONE
+
+    async def load(self, db) -> int:
+        """
+        Füllt den Cache mit allen aktiven Abonnements aus der Datenbank.
+
+        Args:
+            db (UserDatabase): Die verbundene Datenbank.
+
+        Returns:
+            int: Die Anzahl der geladenen Benutzer.
+        """
+        for user_id, tier, expires_at in await db.get_active_subscriptions(int(time.time())):
+            self.set(user_id, Tier(tier), expires_at)
+        return len(self._entries)
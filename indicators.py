@@ -0,0 +1,500 @@
+"""
+Indicators - Vektorisierte technische Indikatoren für Scalping-Signale
+
+Alle Funktionen arbeiten entlang der letzten Achse. Ein 1-D-Array ist die Zeitreihe eines
+Symbols, ein 2-D-Array der Form (Symbole, Candlesticks) berechnet viele Symbole in einem Durchlauf.
+Werte, für die noch nicht genügend Candlesticks vorliegen, sind NaN. Zeilen, die vorne mit NaN
+aufgefüllt sind (z.B. kürzere Historien aus KlineStore.matrix), werden ab ihrem ersten gültigen
+Wert berechnet, als lägen nur diese Candlesticks vor.
+
+Die *State-Klassen halten den Zustand am Ende einer Zeitreihe und aktualisieren ihn in O(1),
+wenn ein neuer Candlestick schließt. Auch sie arbeiten auf Arrays der Form (Symbole,).
+"""
+
+import functools
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Größter zulässiger Exponent für b**-k innerhalb eines EMA-Blocks (e**500 ≈ 1e217)
+_MAX_EXPONENT = 500.0
+
+
+def _as_float(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+
+def _nan_prefix(values: np.ndarray, n: int, length: int) -> np.ndarray:
+    """Stellt den Ergebnissen n NaN-Werte voran, sodass die letzte Achse die Länge length hat."""
+    out = np.full(values.shape[:-1] + (length,), np.nan)
+    out[..., n:] = values
+    return out
+
+
+def _row_aligned(n_arrays: int):
+    """
+    Berechnet einen Indikator für Zeilen mit führenden NaN ab deren erstem gültigen Wert.
+
+    Jede Zeile wird so verschoben, dass sie mit ihrem ersten gültigen Wert beginnt, berechnet und
+    zurückgeschoben; die Positionen davor sind NaN. Da alle Indikatoren kausal sind (der Wert bei t
+    hängt nur von Werten bis t ab), entspricht das einer Berechnung nur über den gültigen Teil.
+
+    Args:
+        n_arrays (int): Anzahl der führenden Positionsargumente, die Zeitreihen sind.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arrays = [_as_float(a) for a in args[:n_arrays]]
+            leading = np.isnan(arrays[0][..., 0]) if arrays[0].shape[-1] else np.False_
+            if not np.any(leading):
+                return func(*arrays, *args[n_arrays:], **kwargs)
+
+            n = arrays[0].shape[-1]
+            valid = ~np.isnan(arrays[0])
+            first = np.where(valid.any(axis=-1), valid.argmax(axis=-1), n)[..., None]
+            positions = np.arange(n)
+            forward = (positions + first) % n
+            backward = (positions - first) % n
+            aligned = [np.take_along_axis(a, np.broadcast_to(forward, a.shape), axis=-1) for a in arrays]
+            result = func(*aligned, *args[n_arrays:], **kwargs)
+
+            def restore(values: np.ndarray) -> np.ndarray:
+                out = np.take_along_axis(values, np.broadcast_to(backward, values.shape), axis=-1)
+                out[np.broadcast_to(positions < first, out.shape)] = np.nan
+                return out
+
+            return tuple(restore(r) for r in result) if isinstance(result, tuple) else restore(result)
+
+        return wrapper
+
+    return decorate
+
+
+def ewm(x, alpha: float, init=None) -> np.ndarray:
+    """
+    Exponentiell gewichteter Mittelwert y[t] = (1 - alpha) * y[t-1] + alpha * x[t].
+
+    Die Rekursion wird blockweise in geschlossener Form über cumsum berechnet, sodass keine
+    Python-Schleife pro Candlestick nötig ist. Die Blockgröße hält die Potenzen von (1 - alpha)
+    im Wertebereich von float64.
+
+    Args:
+        x (array_like): Die Eingabereihe(n).
+        alpha (float): Der Glättungsfaktor im Bereich (0, 1].
+        init (array_like | None): Der Wert y[-1]. None startet mit dem ersten Wert der Reihe.
+
+    Returns:
+        np.ndarray: Der geglättete Verlauf in derselben Form wie x.
+    """
+    x = _as_float(x)
+    if not 0.0 < alpha <= 1.0:
+        raise ValueError("alpha muss im Bereich (0, 1] liegen.")
+    if x.shape[-1] == 0 or alpha == 1.0:
+        return x.copy()
+
+    beta = 1.0 - alpha
+    block = max(1, int(_MAX_EXPONENT / -np.log(beta)))
+    prev = x[..., 0].copy() if init is None else np.broadcast_to(_as_float(init), x.shape[:-1]).copy()
+    out = np.empty_like(x)
+    n = x.shape[-1]
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        powers = beta ** np.arange(1, stop - start + 1)
+        out[..., start:stop] = powers * (prev[..., None] + np.cumsum(alpha * x[..., start:stop] / powers, axis=-1))
+        prev = out[..., stop - 1]
+    return out
+
+
+def _wilder(x: np.ndarray, period: int) -> np.ndarray:
+    """Wilder-Glättung (RMA), gestartet mit dem einfachen Mittel der ersten period Werte."""
+    n = x.shape[-1]
+    if n < period:
+        return np.full(x.shape, np.nan)
+    seed = x[..., :period].mean(axis=-1)
+    smoothed = ewm(x[..., period:], 1.0 / period, init=seed)
+    return _nan_prefix(np.concatenate([seed[..., None], smoothed], axis=-1), period - 1, n)
+
+
+@_row_aligned(1)
+def sma(x, period: int) -> np.ndarray:
+    """
+    Einfacher gleitender Durchschnitt.
+
+    Args:
+        x (array_like): Die Eingabereihe(n).
+        period (int): Die Fensterlänge.
+
+    Returns:
+        np.ndarray: Der SMA, die ersten period - 1 Werte sind NaN.
+    """
+    x = _as_float(x)
+    n = x.shape[-1]
+    if n < period:
+        return np.full(x.shape, np.nan)
+    csum = np.cumsum(x, axis=-1)
+    sums = csum[..., period - 1:].copy()
+    sums[..., 1:] -= csum[..., :-period]
+    return _nan_prefix(sums / period, period - 1, n)
+
+
+@_row_aligned(1)
+def ema(x, period: int) -> np.ndarray:
+    """
+    Exponentieller gleitender Durchschnitt mit alpha = 2 / (period + 1).
+
+    Args:
+        x (array_like): Die Eingabereihe(n).
+        period (int): Die Periode.
+
+    Returns:
+        np.ndarray: Der EMA, gestartet mit dem ersten Wert der Reihe.
+    """
+    return ewm(x, 2.0 / (period + 1))
+
+
+def _rsi_averages(close: np.ndarray, period: int) -> tuple[np.ndarray, np.ndarray]:
+    delta = np.diff(close, axis=-1)
+    gains = np.clip(delta, 0.0, None)
+    losses = np.clip(-delta, 0.0, None)
+    return _wilder(gains, period), _wilder(losses, period)
+
+
+def _rsi_from_averages(avg_gain, avg_loss) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi_values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0.0, np.where(avg_gain == 0.0, 50.0, 100.0), rsi_values)
+
+
+@_row_aligned(1)
+def rsi(close, period: int = 14) -> np.ndarray:
+    """
+    Relative Strength Index nach Wilder.
+
+    Args:
+        close (array_like): Die Schlusskurse.
+        period (int): Die Periode.
+
+    Returns:
+        np.ndarray: Der RSI im Bereich 0-100, die ersten period Werte sind NaN.
+    """
+    close = _as_float(close)
+    avg_gain, avg_loss = _rsi_averages(close, period)
+    values = np.where(np.isnan(avg_gain), np.nan, _rsi_from_averages(avg_gain, avg_loss))
+    return _nan_prefix(values, 1, close.shape[-1])
+
+
+@_row_aligned(1)
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Moving Average Convergence Divergence.
+
+    Args:
+        close (array_like): Die Schlusskurse.
+        fast (int): Periode des schnellen EMA.
+        slow (int): Periode des langsamen EMA.
+        signal (int): Periode der Signallinie.
+
+    Returns:
+        tuple: (MACD-Linie, Signallinie, Histogramm).
+    """
+    close = _as_float(close)
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+@_row_aligned(1)
+def bollinger_bands(close, period: int = 20, num_std: float = 2.0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bollinger-Bänder mit der Populations-Standardabweichung des Fensters.
+
+    Args:
+        close (array_like): Die Schlusskurse.
+        period (int): Die Fensterlänge.
+        num_std (float): Abstand der Bänder in Standardabweichungen.
+
+    Returns:
+        tuple: (Mittelband, oberes Band, unteres Band).
+    """
+    close = _as_float(close)
+    n = close.shape[-1]
+    if n < period:
+        nan = np.full(close.shape, np.nan)
+        return nan, nan.copy(), nan.copy()
+    windows = sliding_window_view(close, period, axis=-1)
+    mid = _nan_prefix(windows.mean(axis=-1), period - 1, n)
+    std = _nan_prefix(windows.std(axis=-1), period - 1, n)
+    return mid, mid + num_std * std, mid - num_std * std
+
+
+@_row_aligned(3)
+def true_range(high, low, close) -> np.ndarray:
+    """
+    True Range. Für den ersten Candlestick wird High - Low verwendet.
+
+    Args:
+        high (array_like): Die Höchstkurse.
+        low (array_like): Die Tiefstkurse.
+        close (array_like): Die Schlusskurse.
+
+    Returns:
+        np.ndarray: Die True Range pro Candlestick.
+    """
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    tr = high - low
+    prev_close = close[..., :-1]
+    tr[..., 1:] = np.maximum(
+        tr[..., 1:],
+        np.maximum(np.abs(high[..., 1:] - prev_close), np.abs(low[..., 1:] - prev_close)),
+    )
+    return tr
+
+
+@_row_aligned(3)
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """
+    Average True Range nach Wilder.
+
+    Args:
+        high (array_like): Die Höchstkurse.
+        low (array_like): Die Tiefstkurse.
+        close (array_like): Die Schlusskurse.
+        period (int): Die Periode.
+
+    Returns:
+        np.ndarray: Die ATR, die ersten period - 1 Werte sind NaN.
+    """
+    return _wilder(true_range(high, low, close), period)
+
+
+@_row_aligned(4)
+def vwap(high, low, close, volume, period: int | None = None) -> np.ndarray:
+    """
+    Volume Weighted Average Price auf Basis des typischen Preises (H + L + C) / 3.
+
+    Args:
+        high (array_like): Die Höchstkurse.
+        low (array_like): Die Tiefstkurse.
+        close (array_like): Die Schlusskurse.
+        volume (array_like): Die Volumina.
+        period (int | None): Fensterlänge für einen gleitenden VWAP. None kumuliert ab dem
+                             ersten Candlestick des Fensters.
+
+    Returns:
+        np.ndarray: Der VWAP.
+    """
+    high, low, close, volume = _as_float(high), _as_float(low), _as_float(close), _as_float(volume)
+    typical = (high + low + close) / 3.0
+    if period is None:
+        cum_pv = np.cumsum(typical * volume, axis=-1)
+        cum_v = np.cumsum(volume, axis=-1)
+    else:
+        cum_pv = sma(typical * volume, period)
+        cum_v = sma(volume, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cum_v == 0, typical, cum_pv / cum_v)
+
+
+@_row_aligned(3)
+def stochastic(high, low, close, k_period: int = 14, d_period: int = 3) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Stochastik-Oszillator.
+
+    Args:
+        high (array_like): Die Höchstkurse.
+        low (array_like): Die Tiefstkurse.
+        close (array_like): Die Schlusskurse.
+        k_period (int): Fensterlänge für %K.
+        d_period (int): Glättung von %K zu %D (SMA).
+
+    Returns:
+        tuple: (%K, %D) im Bereich 0-100.
+    """
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    n = close.shape[-1]
+    if n < k_period:
+        nan = np.full(close.shape, np.nan)
+        return nan, nan.copy()
+    highest = sliding_window_view(high, k_period, axis=-1).max(axis=-1)
+    lowest = sliding_window_view(low, k_period, axis=-1).min(axis=-1)
+    span = highest - lowest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = np.where(span > 0, 100.0 * (close[..., k_period - 1:] - lowest) / span, 50.0)
+    k = _nan_prefix(k, k_period - 1, n)
+    d = _nan_prefix(sma(k[..., k_period - 1:], d_period), k_period - 1, n)
+    return k, d
+
+
+class EmaState:
+    """Inkrementeller EMA für ein oder viele Symbole."""
+
+    def __init__(self, period: int, value):
+        self.alpha = 2.0 / (period + 1)
+        self.value = _as_float(value).copy()
+
+    @classmethod
+    def from_series(cls, x, period: int) -> "EmaState":
+        """Startet den Zustand am Ende einer Zeitreihe."""
+        return cls(period, ema(x, period)[..., -1])
+
+    def update(self, x) -> np.ndarray:
+        """Übernimmt den neuen Wert x und gibt den aktuellen EMA zurück."""
+        self.value += self.alpha * (_as_float(x) - self.value)
+        return self.value
+
+
+class MacdState:
+    """Inkrementeller MACD für ein oder viele Symbole."""
+
+    def __init__(self, fast: EmaState, slow: EmaState, signal: EmaState):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+
+    @classmethod
+    def from_series(cls, close, fast: int = 12, slow: int = 26, signal: int = 9) -> "MacdState":
+        """Startet den Zustand am Ende einer Zeitreihe."""
+        close = _as_float(close)
+        fast_ema, slow_ema = ema(close, fast), ema(close, slow)
+        signal_ema = ema(fast_ema - slow_ema, signal)
+        return cls(EmaState(fast, fast_ema[..., -1]), EmaState(slow, slow_ema[..., -1]),
+                   EmaState(signal, signal_ema[..., -1]))
+
+    def update(self, close) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Übernimmt den neuen Schlusskurs und gibt (MACD-Linie, Signallinie, Histogramm) zurück."""
+        line = self.fast.update(close) - self.slow.update(close)
+        signal_line = self.signal.update(line).copy()
+        return line, signal_line, line - signal_line
+
+
+class RsiState:
+    """Inkrementeller RSI nach Wilder für ein oder viele Symbole."""
+
+    def __init__(self, period: int, prev_close, avg_gain, avg_loss):
+        self.period = period
+        self.prev_close = _as_float(prev_close).copy()
+        self.avg_gain = _as_float(avg_gain).copy()
+        self.avg_loss = _as_float(avg_loss).copy()
+
+    @classmethod
+    def from_series(cls, close, period: int = 14) -> "RsiState":
+        """Startet den Zustand am Ende einer Zeitreihe (mindestens period + 1 Schlusskurse)."""
+        close = _as_float(close)
+        avg_gain, avg_loss = _rsi_averages(close, period)
+        return cls(period, close[..., -1], avg_gain[..., -1], avg_loss[..., -1])
+
+    @property
+    def value(self) -> np.ndarray:
+        return _rsi_from_averages(self.avg_gain, self.avg_loss)
+
+    def update(self, close) -> np.ndarray:
+        """Übernimmt den neuen Schlusskurs und gibt den aktuellen RSI zurück."""
+        close = _as_float(close)
+        delta = close - self.prev_close
+        alpha = 1.0 / self.period
+        self.avg_gain += alpha * (np.clip(delta, 0.0, None) - self.avg_gain)
+        self.avg_loss += alpha * (np.clip(-delta, 0.0, None) - self.avg_loss)
+        self.prev_close = close.copy()
+        return self.value
+
+
+class AtrState:
+    """Inkrementelle ATR nach Wilder für ein oder viele Symbole."""
+
+    def __init__(self, period: int, prev_close, value):
+        self.period = period
+        self.prev_close = _as_float(prev_close).copy()
+        self.value = _as_float(value).copy()
+
+    @classmethod
+    def from_series(cls, high, low, close, period: int = 14) -> "AtrState":
+        """Startet den Zustand am Ende einer Zeitreihe."""
+        close = _as_float(close)
+        return cls(period, close[..., -1], atr(high, low, close, period)[..., -1])
+
+    def update(self, high, low, close) -> np.ndarray:
+        """Übernimmt den neuen Candlestick und gibt die aktuelle ATR zurück."""
+        high, low, close = _as_float(high), _as_float(low), _as_float(close)
+        tr = np.maximum(high - low, np.maximum(np.abs(high - self.prev_close), np.abs(low - self.prev_close)))
+        self.value += (tr - self.value) / self.period
+        self.prev_close = close.copy()
+        return self.value
+
+
+class VwapState:
+    """Inkrementeller kumulativer VWAP für ein oder viele Symbole."""
+
+    def __init__(self, cum_pv, cum_volume):
+        self.cum_pv = _as_float(cum_pv).copy()
+        self.cum_volume = _as_float(cum_volume).copy()
+
+    @classmethod
+    def from_series(cls, high, low, close, volume) -> "VwapState":
+        """Startet den Zustand am Ende einer Zeitreihe."""
+        typical = (_as_float(high) + _as_float(low) + _as_float(close)) / 3.0
+        volume = _as_float(volume)
+        return cls((typical * volume).sum(axis=-1), volume.sum(axis=-1))
+
+    @property
+    def value(self) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.cum_pv / self.cum_volume
+
+    def update(self, high, low, close, volume) -> np.ndarray:
+        """Übernimmt den neuen Candlestick und gibt den aktuellen VWAP zurück."""
+        volume = _as_float(volume)
+        self.cum_pv += (_as_float(high) + _as_float(low) + _as_float(close)) / 3.0 * volume
+        self.cum_volume += volume
+        return self.value
+
+
+class RollingWindowState:
+    """
+    Gleitendes Fenster der letzten period Werte für SMA und Bollinger-Bänder.
+
+    Summe und Quadratsumme werden in O(1) fortgeschrieben und alle period Updates aus dem
+    Fenster neu berechnet, damit sich keine Rundungsfehler aufsummieren.
+    """
+
+    def __init__(self, window):
+        self.window = _as_float(window).copy()
+        self.period = self.window.shape[-1]
+        self._pos = 0
+        self._resync()
+
+    @classmethod
+    def from_series(cls, x, period: int) -> "RollingWindowState":
+        """Startet den Zustand mit den letzten period Werten einer Zeitreihe."""
+        return cls(_as_float(x)[..., -period:])
+
+    def _resync(self) -> None:
+        self.total = self.window.sum(axis=-1)
+        self.total_sq = (self.window * self.window).sum(axis=-1)
+
+    def update(self, x) -> np.ndarray:
+        """Übernimmt den neuen Wert x und gibt den aktuellen SMA zurück."""
+        x = _as_float(x)
+        old = self.window[..., self._pos].copy()
+        self.window[..., self._pos] = x
+        self._pos = (self._pos + 1) % self.period
+        if self._pos == 0:
+            self._resync()
+        else:
+            self.total += x - old
+            self.total_sq += x * x - old * old
+        return self.mean
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.total / self.period
+
+    @property
+    def std(self) -> np.ndarray:
+        mean = self.mean
+        return np.sqrt(np.clip(self.total_sq / self.period - mean * mean, 0.0, None))
+
+    def bollinger_bands(self, num_std: float = 2.0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Gibt (Mittelband, oberes Band, unteres Band) für das aktuelle Fenster zurück."""
+        mid, std = self.mean, self.std
+        return mid, mid + num_std * std, mid - num_std * std
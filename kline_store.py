@@ -0,0 +1,268 @@
+"""
+Kline Store - Spaltenorientierter In-Memory-Speicher für Candlestick-Daten
+"""
+
+import numpy as np
+
+# Spaltenlayout eines Candlesticks (entspricht der Reihenfolge der Binance-Klines ohne 'Ignore')
+KLINE_COLUMNS = (
+    ("open_time", np.int64),
+    ("open", np.float64),
+    ("high", np.float64),
+    ("low", np.float64),
+    ("close", np.float64),
+    ("volume", np.float64),
+    ("close_time", np.int64),
+    ("quote_volume", np.float64),
+    ("trades", np.int64),
+    ("taker_buy_base_volume", np.float64),
+    ("taker_buy_quote_volume", np.float64),
+)
+
+COLUMN_NAMES = tuple(name for name, _ in KLINE_COLUMNS)
+
+# Dauer eines Binance-Intervalls in Millisekunden ('1M' wird mit 30 Tagen angenähert)
+_INTERVAL_UNIT_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000, "M": 2_592_000_000}
+
+
+def interval_to_ms(interval: str) -> int:
+    """
+    Rechnet ein Binance-Intervall in Millisekunden um.
+
+    Args:
+        interval (str): Das Zeitintervall (z.B. '1m', '15m', '4h', '1d').
+
+    Returns:
+        int: Die Dauer eines Candlesticks in Millisekunden.
+    """
+    try:
+        return int(interval[:-1]) * _INTERVAL_UNIT_MS[interval[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Ungültiges Binance-Intervall '{interval}'") from None
+
+
+class KlineBuffer:
+    """Ringpuffer fester Kapazität für die Candlesticks eines Symbols in einem Intervall."""
+
+    def __init__(self, capacity: int = 1000):
+        """
+        Initialisiert den KlineBuffer.
+
+        Jede Spalte wird mit doppelter Kapazität angelegt und jede Zeile an zwei Positionen
+        geschrieben. Dadurch liegt jedes Fenster der letzten n Candlesticks zusammenhängend
+        im Speicher und kann ohne Kopie als View zurückgegeben werden.
+
+        Args:
+            capacity (int): Die maximale Anzahl gehaltener Candlesticks.
+        """
+        if capacity <= 0:
+            raise ValueError("Die Kapazität des KlineBuffer muss größer als 0 sein.")
+        self.capacity = capacity
+        self._columns = {name: np.zeros(2 * capacity, dtype=dtype) for name, dtype in KLINE_COLUMNS}
+        self._head = 0  # Nächste Schreibposition im Bereich [0, capacity)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_open_time(self) -> int | None:
+        """Öffnungszeit des jüngsten Candlesticks in Millisekunden oder None, wenn leer."""
+        if self._size == 0:
+            return None
+        return int(self._columns["open_time"][self._head + self.capacity - 1])
+
+    def _write_row(self, pos: int, values: tuple) -> None:
+        for (name, _), value in zip(KLINE_COLUMNS, values):
+            column = self._columns[name]
+            column[pos] = value
+            column[pos + self.capacity] = value
+
+    def append(self, kline: list | tuple) -> None:
+        """
+        Fügt einen Candlestick im Binance-Format hinzu oder aktualisiert den letzten.
+
+        Die Preisfelder werden hier einmalig von String nach float geparst. Hat der Candlestick
+        dieselbe Öffnungszeit wie der jüngste gespeicherte (noch nicht geschlossene Kerze),
+        wird dieser an Ort und Stelle überschrieben. Ältere Candlesticks werden ignoriert.
+
+        Args:
+            kline (list | tuple): Ein Candlestick im Format von BinanceAPIClient.get_klines.
+        """
+        values = (
+            int(kline[0]), float(kline[1]), float(kline[2]), float(kline[3]), float(kline[4]),
+            float(kline[5]), int(kline[6]), float(kline[7]), int(kline[8]), float(kline[9]),
+            float(kline[10]),
+        )
+        last_open_time = self.last_open_time
+        if last_open_time is not None:
+            if values[0] == last_open_time:
+                self._write_row((self._head - 1) % self.capacity, values)
+                return
+            if values[0] < last_open_time:
+                return
+
+        self._write_row(self._head, values)
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def extend(self, klines: list) -> None:
+        """
+        Fügt mehrere Candlesticks in chronologischer Reihenfolge hinzu.
+
+        Args:
+            klines (list): Eine Liste von Candlesticks im Binance-Format.
+        """
+        for kline in klines:
+            self.append(kline)
+
+    def column(self, name: str, n: int | None = None) -> np.ndarray:
+        """
+        Gibt eine Spalte der letzten n Candlesticks als Zero-Copy-View zurück.
+
+        Args:
+            name (str): Der Spaltenname (siehe COLUMN_NAMES).
+            n (int | None): Die Anzahl der Candlesticks. None liefert alle gespeicherten.
+
+        Returns:
+            np.ndarray: Eine schreibgeschützte View, älteste Kerze zuerst.
+        """
+        if name not in self._columns:
+            raise KeyError(f"Unbekannte Kline-Spalte '{name}'")
+        n = self._size if n is None else min(n, self._size)
+        end = self._head + self.capacity
+        view = self._columns[name][end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def window(self, n: int | None = None) -> dict[str, np.ndarray]:
+        """
+        Gibt alle Spalten der letzten n Candlesticks als Zero-Copy-Views zurück.
+
+        Args:
+            n (int | None): Die Anzahl der Candlesticks. None liefert alle gespeicherten.
+
+        Returns:
+            dict[str, np.ndarray]: Spaltenname -> View, älteste Kerze zuerst.
+        """
+        return {name: self.column(name, n) for name in COLUMN_NAMES}
+
+    def to_rows(self, n: int | None = None) -> list:
+        """
+        Wandelt die letzten n Candlesticks zurück in das Listenformat von Binance.
+
+        Args:
+            n (int | None): Die Anzahl der Candlesticks. None liefert alle gespeicherten.
+
+        Returns:
+            list: Eine Liste von Listen im Format von BinanceAPIClient.get_klines,
+                  jedoch mit Zahlen statt Strings und '0' im Feld 'Ignore'.
+        """
+        columns = [self.column(name, n).tolist() for name in COLUMN_NAMES]
+        return [list(row) + ["0"] for row in zip(*columns)]
+
+
+class KlineStore:
+    """Verwaltet einen KlineBuffer pro (Symbol, Intervall)."""
+
+    def __init__(self, capacity: int = 1000):
+        """
+        Initialisiert den KlineStore.
+
+        Args:
+            capacity (int): Die Kapazität jedes neu angelegten KlineBuffer.
+        """
+        self.capacity = capacity
+        self._buffers: dict[tuple[str, str], KlineBuffer] = {}
+
+    def buffer(self, symbol: str, interval: str) -> KlineBuffer:
+        """
+        Gibt den KlineBuffer für ein Symbol und Intervall zurück und legt ihn bei Bedarf an.
+
+        Args:
+            symbol (str): Das Handelspaar (z.B. 'BTCUSDT').
+            interval (str): Das Zeitintervall (z.B. '1m', '5m', '1h').
+
+        Returns:
+            KlineBuffer: Der zugehörige Ringpuffer.
+        """
+        key = (symbol.upper(), interval)
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = KlineBuffer(self.capacity)
+            self._buffers[key] = buf
+        return buf
+
+    def get(self, symbol: str, interval: str) -> KlineBuffer | None:
+        """Gibt den KlineBuffer zurück, ohne ihn anzulegen."""
+        return self._buffers.get((symbol.upper(), interval))
+
+    def ingest(self, symbol: str, interval: str, klines: list) -> KlineBuffer:
+        """
+        Übernimmt rohe Klines von Binance in den passenden Ringpuffer.
+
+        Args:
+            symbol (str): Das Handelspaar.
+            interval (str): Das Zeitintervall.
+            klines (list): Candlesticks im Format von BinanceAPIClient.get_klines.
+
+        Returns:
+            KlineBuffer: Der aktualisierte Ringpuffer.
+        """
+        buf = self.buffer(symbol, interval)
+        # Reicht die Antwort weiter zurück als der Puffer (z.B. ein Intervall, das bisher nur lokal
+        # abgeleitet wurde), ersetzt sie ihn; append() würde ältere Candlesticks verwerfen.
+        if (klines and len(buf) and len(klines) > len(buf) and int(klines[-1][0]) >= buf.last_open_time
+                and int(klines[0][0]) < int(buf.column("open_time", len(buf))[0])):
+            buf = self.replace(symbol, interval)
+        buf.extend(klines)
+        return buf
+
+    def replace(self, symbol: str, interval: str) -> KlineBuffer:
+        """
+        Ersetzt den KlineBuffer eines Symbols und Intervalls durch einen leeren.
+
+        Args:
+            symbol (str): Das Handelspaar.
+            interval (str): Das Zeitintervall.
+
+        Returns:
+            KlineBuffer: Der neue, leere Ringpuffer.
+        """
+        buf = self._buffers[(symbol.upper(), interval)] = KlineBuffer(self.capacity)
+        return buf
+
+    def matrix(self, symbols: list[str], interval: str, column: str, n: int) -> np.ndarray:
+        """
+        Stapelt eine Spalte der letzten n Candlesticks mehrerer Symbole zu einem 2-D-Array.
+
+        Das Ergebnis hat die Form (len(symbols), n) und kann direkt an die Funktionen in
+        indicators.py übergeben werden. Symbole mit weniger als n Candlesticks werden vorne
+        mit NaN aufgefüllt; die Indikatoren berechnen solche Zeilen ab dem ersten gültigen Wert.
+
+        Args:
+            symbols (list[str]): Die Handelspaare.
+            interval (str): Das Zeitintervall.
+            column (str): Der Spaltenname (siehe COLUMN_NAMES).
+            n (int): Die Anzahl der Candlesticks pro Symbol.
+
+        Returns:
+            np.ndarray: Ein float64-Array der Form (len(symbols), n).
+        """
+        out = np.full((len(symbols), n), np.nan)
+        for row, symbol in enumerate(symbols):
+            buf = self.get(symbol, interval)
+            if buf is not None and len(buf):
+                values = buf.column(column, n)
+                out[row, n - len(values):] = values
+        return out
+
+    def keys(self) -> list[tuple[str, str]]:
+        """Gibt alle gespeicherten (Symbol, Intervall)-Paare zurück."""
+        return list(self._buffers.keys())
+
+    def nbytes(self) -> int:
+        """Gibt den belegten Speicher aller Ringpuffer in Bytes zurück."""
+        return sum(
+            column.nbytes for buf in self._buffers.values() for column in buf._columns.values()
+        )
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+CA3003BOT - Offline-Lasttest
+Treibt den Bot mit synthetischen Updates, ohne Telegram, Binance oder Anthropic zu erreichen.
+
+Die Application wird wie im Webhook-Betrieb gestartet (lifecycle), die Updates landen direkt in
+der update_queue. Bot API, Binance und Anthropic sind lokale Testserver mit einstellbarer Latenz,
+die in einem eigenen Thread laufen und den Event-Loop des Bots nicht belasten. Gemessen werden
+die Latenz der Handler (aus den Histogrammen von metrics.py), der Durchsatz in Updates pro Sekunde
+und die Commit-Rate der UserDatabase.
+
+Beispiele:
+    python load_test.py --rate 2000 --duration 10
+    python load_test.py --rate 0 --updates 20000 --save-baseline baselines/load_test.json
+    python load_test.py --compare baselines/load_test.json --tolerance 0.25
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from aiohttp import web
+from telegram import Update
+
+from binance_api_client import BinanceAPIClient
+from crypto_scalping_bot import CryptoScalpingBot
+from metrics import METRICS, Histogram
+from payment_handler import PaymentHandler
+from user_database import UserDatabase
+
+# Gewichte der Update-Arten; 'subscribe' sind die Callback-Abfragen subscribe_<typ>
+DEFAULT_MIX = "start=3,sub=2,check_sub=4,subscribe=1"
+COMMANDS = {
+    "start": "/start",
+    "sub": "/sub",
+    "check_sub": "/check_sub",
+    "analyze": "/analyze BTCUSDT 5m",
+    "alerts": "/alerts",
+}
+SUBSCRIPTION_TYPES = ("basic", "premium", "vip")
+SYMBOLS = ("BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT")
+
+# Kennzahlen für den Vergleich mit einer Baseline: (Schlüssel, True wenn größer besser ist)
+COMPARED = (
+    ("updates_per_second", True),
+    ("p50_ms", False),
+    ("p99_ms", False),
+)
+
+
+class StubServer:
+    """Betreibt eine aiohttp-Application in einem eigenen Thread mit eigenem Event-Loop."""
+
+    def __init__(self, app: web.Application):
+        self.app = app
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._runner: web.AppRunner | None = None
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def start(self) -> str:
+        """Startet den Server auf einem freien Port und gibt seine Basis-URL zurück."""
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _start(self) -> None:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def stop(self) -> None:
+        """Beendet den Server und den Thread."""
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def fake_bot_api(latency: float) -> web.Application:
+    """Bot API, die jede Methode nach latency Sekunden erfolgreich beantwortet."""
+    message_ids = itertools.count(1)
+    calls: dict[str, int] = {}
+    me = {"id": 1, "is_bot": True, "first_name": "LoadTest", "username": "load_test_bot"}
+
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            data = await request.json()
+        else:
+            data = dict(await request.post())
+        calls[method] = calls.get(method, 0) + 1
+        if latency:
+            await asyncio.sleep(latency)
+
+        if method == "getMe":
+            result = me
+        elif method in ("sendMessage", "editMessageText", "sendInvoice"):
+            result = {"message_id": next(message_ids), "date": int(time.time()),
+                      "chat": {"id": int(data.get("chat_id", 1)), "type": "private"},
+                      "from": me, "text": data.get("text", "")}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app["calls"] = calls
+    app.router.add_post("/bot{token}/{method}", handle)
+    return app
+
+
+def fake_binance(latency: float) -> web.Application:
+    """Binance REST API mit reproduzierbaren Klines (Random Walk pro Symbol und Intervall)."""
+    klines_cache: dict[tuple[str, str], list] = {}
+
+    def klines(symbol: str, interval: str) -> list:
+        rows = klines_cache.get((symbol, interval))
+        if rows is None:
+            rng = random.Random(f"{symbol}:{interval}")
+            price = rng.uniform(1, 50_000)
+            open_time = int(time.time() // 60 * 60_000) - 1000 * 60_000
+            rows = []
+            for i in range(1000):
+                close = price * (1 + rng.gauss(0, 0.002))
+                high, low = max(price, close) * 1.001, min(price, close) * 0.999
+                start = open_time + i * 60_000
+                rows.append([start, f"{price:.4f}", f"{high:.4f}", f"{low:.4f}", f"{close:.4f}", "12.5",
+                             start + 59_999, "1000.0", 100, "6.0", "500.0", "0"])
+                price = close
+            klines_cache[(symbol, interval)] = rows
+        return rows
+
+    async def get_klines(request: web.Request) -> web.Response:
+        if latency:
+            await asyncio.sleep(latency)
+        limit = int(request.query.get("limit", "500"))
+        return web.json_response(klines(request.query["symbol"], request.query.get("interval", "1m"))[-limit:])
+
+    async def get_price(request: web.Request) -> web.Response:
+        if latency:
+            await asyncio.sleep(latency)
+        if "symbol" not in request.query:
+            # Ohne Symbol antwortet Binance mit den Preisen aller Handelspaare
+            return web.json_response([{"symbol": s, "price": klines(s, "1m")[-1][4]} for s in SYMBOLS])
+        symbol = request.query["symbol"]
+        return web.json_response({"symbol": symbol, "price": klines(symbol, "1m")[-1][4]})
+
+    async def get_exchange_info(request: web.Request) -> web.Response:
+        if latency:
+            await asyncio.sleep(latency)
+        return web.json_response({"symbols": [
+            {"symbol": symbol, "status": "TRADING", "quoteAsset": "USDT"} for symbol in SYMBOLS
+        ]})
+
+    app = web.Application()
+    app.router.add_get("/api/v3/klines", get_klines)
+    app.router.add_get("/api/v3/ticker/price", get_price)
+    app.router.add_get("/api/v3/exchangeInfo", get_exchange_info)
+    return app
+
+
+def fake_anthropic(latency: float, chunks: int = 8) -> web.Application:
+    """Messages API, die nach latency Sekunden antwortet bzw. beim Streaming in chunks Teilen."""
+
+    async def messages(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        words = [f"Wort{i}" for i in range(chunks)]
+        usage = {"input_tokens": 500, "output_tokens": chunks}
+        if not body.get("stream"):
+            if latency:
+                await asyncio.sleep(latency)
+            return web.json_response({
+                "id": "msg_load_test", "type": "message", "role": "assistant", "model": body["model"],
+                "content": [{"type": "text", "text": " ".join(words)}], "stop_reason": "end_turn",
+                "stop_sequence": None, "usage": usage,
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        async def event(name: str, data: dict) -> None:
+            await response.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode())
+
+        await event("message_start", {"type": "message_start", "message": {
+            "id": "msg_load_test", "type": "message", "role": "assistant", "model": body["model"],
+            "content": [], "stop_reason": None, "stop_sequence": None,
+            "usage": {"input_tokens": usage["input_tokens"], "output_tokens": 1}}})
+        await event("content_block_start", {"type": "content_block_start", "index": 0,
+                                            "content_block": {"type": "text", "text": ""}})
+        for word in words:
+            if latency:
+                await asyncio.sleep(latency / chunks)
+            await event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                "delta": {"type": "text_delta", "text": word + " "}})
+        await event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        await event("message_delta", {"type": "message_delta", "usage": {"output_tokens": chunks},
+                                      "delta": {"stop_reason": "end_turn", "stop_sequence": None}})
+        await event("message_stop", {"type": "message_stop"})
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/messages", messages)
+    return app
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """Liest 'start=3,sub=2,...' in {Art: Gewicht}."""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind != "subscribe" and kind not in COMMANDS:
+            raise ValueError(f"Unbekannte Update-Art '{kind}' (erlaubt: subscribe, {', '.join(COMMANDS)})")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def synthetic_updates(count: int, users: int, mix: dict[str, float], seed: int = 1, first_update_id: int = 1):
+    """
+    Erzeugt Updates als JSON-Dictionaries, wie sie die Bot API zustellt.
+
+    Args:
+        count (int): Anzahl der Updates.
+        users (int): Anzahl verschiedener Benutzer (jeder in seinem privaten Chat).
+        mix (dict[str, float]): Gewichte der Update-Arten.
+        seed (int): Startwert des Zufallsgenerators; gleiche Parameter ergeben gleiche Updates.
+        first_update_id (int): update_id des ersten Updates.
+
+    Yields:
+        dict: Ein Update.
+    """
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    now = int(time.time())
+    for update_id in range(first_update_id, first_update_id + count):
+        user_id = rng.randint(1, users)
+        user = {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+        chat = {"id": user_id, "type": "private"}
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "subscribe":
+            yield {"update_id": update_id, "callback_query": {
+                "id": str(update_id), "from": user, "chat_instance": str(user_id),
+                "data": f"subscribe_{rng.choice(SUBSCRIPTION_TYPES)}",
+                "message": {"message_id": 1, "date": now, "chat": chat, "text": "Wählen Sie ein Abonnement:",
+                            "from": {"id": 1, "is_bot": True, "first_name": "LoadTest"}},
+            }}
+            continue
+        text = COMMANDS[kind]
+        yield {"update_id": update_id, "message": {
+            "message_id": update_id, "date": now, "chat": chat, "from": user, "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+        }}
+
+
+def _handler_snapshot() -> dict[str, tuple[list[int], int, float]]:
+    """Kopiert die Handler-Histogramme, um später nur die Messphase auszuwerten."""
+    return {
+        dict(labels)["operation"]: (list(histogram.counts), histogram.count, histogram.total)
+        for labels, histogram in METRICS._histograms.get("call_seconds", {}).items()
+        if dict(labels)["component"] == "handler"
+    }
+
+
+def _handler_latencies(before: dict) -> tuple[Histogram, dict[str, Histogram]]:
+    """Histogramme der Handler seit dem Snapshot before: (alle Handler, pro Operation)."""
+    combined = Histogram()
+    per_operation = {}
+    for labels, histogram in METRICS._histograms.get("call_seconds", {}).items():
+        labels = dict(labels)
+        if labels["component"] != "handler":
+            continue
+        counts, count, total = before.get(labels["operation"], ([0] * len(histogram.counts), 0, 0.0))
+        if histogram.count == count:
+            continue
+        delta = Histogram()
+        delta.counts = [after - earlier for after, earlier in zip(histogram.counts, counts)]
+        delta.count = histogram.count - count
+        delta.total = histogram.total - total
+        delta.max = histogram.max
+        per_operation[labels["operation"]] = delta
+        combined.counts = [a + b for a, b in zip(combined.counts, delta.counts)]
+        combined.count += delta.count
+        combined.total += delta.total
+        combined.max = max(combined.max, delta.max)
+    return combined, per_operation
+
+
+def _handler_errors() -> float:
+    return sum(value for labels, value in METRICS._counters.get("call_errors_total", {}).items()
+               if dict(labels)["component"] == "handler")
+
+
+async def _inject(application, updates, rate: float, chunk: int = 20) -> None:
+    """Legt die Updates mit der Zielrate (0 = so schnell wie möglich) in die update_queue."""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for sent, data in enumerate(updates):
+        if sent % chunk == 0:
+            # Offene Schleife: die Rate hängt nicht davon ab, wie schnell der Bot antwortet
+            delay = started + sent / rate - loop.time() if rate else 0
+            await asyncio.sleep(max(delay, 0))
+        application.update_queue.put_nowait(Update.de_json(data, application.bot))
+
+
+async def _drain(processed, expected: int, timeout: float) -> bool:
+    """Wartet, bis alle Updates von einem Handler verarbeitet wurden."""
+    deadline = time.perf_counter() + timeout
+    while processed() < expected:
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.005)
+    return True
+
+
+async def run_load_test(updates: int = 10_000, rate: float = 2000.0, users: int = 5000, mix: str = DEFAULT_MIX,
+                        warmup: int = 500, concurrency: int = 64, telegram_latency: float = 0.02,
+                        binance_latency: float = 0.05, anthropic_latency: float = 1.0,
+                        outbound_rate: float = 100_000.0, path: str | None = None, seed: int = 1,
+                        drain_timeout: float = 120.0, verbose: bool = False) -> dict:
+    """
+    Führt einen Lasttest durch.
+
+    Args:
+        updates (int): Anzahl der Updates in der Messphase.
+        rate (float): Angebotene Updates pro Sekunde (0 = so schnell wie möglich).
+        users (int): Anzahl verschiedener Benutzer.
+        mix (str): Gewichte der Update-Arten, z.B. 'start=3,sub=2,check_sub=4,subscribe=1,analyze=1'.
+        warmup (int): Updates vor der Messphase (Verbindungen, Caches, Statement-Cache).
+        concurrency (int): concurrent_updates des Bots.
+        telegram_latency (float): Antwortzeit der Bot API in Sekunden.
+        binance_latency (float): Antwortzeit der Binance API in Sekunden.
+        anthropic_latency (float): Dauer einer Completion der Anthropic API in Sekunden.
+        outbound_rate (float): Globales Sendelimit des Dispatchers. Standardmäßig so hoch, dass
+                               nicht das Flood-Limit von Telegram gemessen wird.
+        path (str | None): Pfad der Test-Datenbank (Standard: temporär).
+        seed (int): Startwert für die synthetischen Updates.
+        drain_timeout (float): Maximale Wartezeit in Sekunden auf die letzten Updates.
+        verbose (bool): Zeigt die Ausgaben des Bots an.
+
+    Returns:
+        dict: Die Ergebnisse (siehe print_report).
+    """
+    weights = parse_mix(mix)
+    path = path or os.path.join(tempfile.mkdtemp(prefix="ca3003bot-"), "load_test.db")
+    telegram = StubServer(fake_bot_api(telegram_latency))
+    binance = StubServer(fake_binance(binance_latency))
+    anthropic = StubServer(fake_anthropic(anthropic_latency))
+    telegram_url, binance_url, anthropic_url = telegram.start(), binance.start(), anthropic.start()
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with output:
+            db = UserDatabase(path)
+            binance_client = BinanceAPIClient("load-test", "load-test", base_url=binance_url)
+            bot = CryptoScalpingBot("123456:LOAD-TEST", "load-test", db, PaymentHandler(db), binance_client,
+                                    concurrent_updates=concurrency, base_url=f"{telegram_url}/bot",
+                                    outbound_rate=outbound_rate, anthropic_base_url=anthropic_url)
+            application = bot.application
+
+            async with bot.lifecycle():
+                # Jedes Update trifft genau einen Handler
+                processed = lambda: sum(count for _, count, _ in _handler_snapshot().values())
+                if warmup:
+                    done = processed()
+                    await _inject(application, synthetic_updates(warmup, users, weights, seed + 1), rate)
+                    await _drain(processed, done + warmup, drain_timeout)
+
+                before = _handler_snapshot()
+                done, errors, commits, writes = processed(), _handler_errors(), db.commits, db.writes
+                first_update_id = warmup + 1
+                started = time.perf_counter()
+                await _inject(application, synthetic_updates(updates, users, weights, seed, first_update_id), rate)
+                injected = time.perf_counter() - started
+                drained = await _drain(processed, done + updates, drain_timeout)
+                elapsed = time.perf_counter() - started
+
+                latency, per_operation = _handler_latencies(before)
+                commits, writes = db.commits - commits, db.writes - writes
+                errors = _handler_errors() - errors
+                pending = done + updates - processed()
+    finally:
+        telegram_calls = dict(telegram.app["calls"])
+        for server in (telegram, binance, anthropic):
+            server.stop()
+
+    return {
+        "config": {
+            "updates": updates, "rate": rate, "users": users, "mix": mix, "concurrency": concurrency,
+            "telegram_latency": telegram_latency, "binance_latency": binance_latency,
+            "anthropic_latency": anthropic_latency, "seed": seed,
+        },
+        "elapsed": elapsed,
+        "offered_per_second": updates / injected if injected else 0.0,
+        "updates_per_second": (updates - pending) / elapsed,
+        "unprocessed": pending,
+        "drained": drained,
+        "handler_errors": errors,
+        "p50_ms": latency.quantile(0.5) * 1000,
+        "p99_ms": latency.quantile(0.99) * 1000,
+        "max_ms": latency.max * 1000,
+        "operations": {
+            operation: {"count": histogram.count, "p50_ms": histogram.quantile(0.5) * 1000,
+                        "p99_ms": histogram.quantile(0.99) * 1000}
+            for operation, histogram in sorted(per_operation.items())
+        },
+        "db_commits": commits,
+        "db_commits_per_second": commits / elapsed,
+        "db_writes_per_commit": writes / commits if commits else 0.0,
+        "telegram_calls": telegram_calls,
+    }
+
+
+def print_report(result: dict) -> None:
+    """Gibt die Ergebnisse eines Lasttests aus."""
+    config = result["config"]
+    print(f"{config['updates']} Updates, {config['users']} Benutzer, Mix {config['mix']}, "
+          f"concurrent_updates={config['concurrency']}")
+    print(f"Latenz der Stubs: Telegram {config['telegram_latency'] * 1000:.0f} ms, "
+          f"Binance {config['binance_latency'] * 1000:.0f} ms, Anthropic {config['anthropic_latency'] * 1000:.0f} ms")
+    print(f"Angeboten: {result['offered_per_second']:.0f} Updates/s, "
+          f"verarbeitet: {result['updates_per_second']:.0f} Updates/s in {result['elapsed']:.2f}s")
+    print(f"Handler-Latenz p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, "
+          f"max {result['max_ms']:.1f} ms, {result['handler_errors']:.0f} Fehler")
+    print(f"Datenbank: {result['db_commits']} Commits ({result['db_commits_per_second']:.0f}/s, "
+          f"{result['db_writes_per_commit']:.1f} Schreibvorgänge pro Commit)")
+    if result["unprocessed"]:
+        print(f"WARNUNG: {result['unprocessed']} Updates wurden nicht rechtzeitig verarbeitet.")
+    print(f"\n{'Handler':<22}{'Anzahl':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for operation, stats in result["operations"].items():
+        print(f"{operation:<22}{stats['count']:>10}{stats['p50_ms']:>12.1f}{stats['p99_ms']:>12.1f}")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Vergleicht ein Ergebnis mit einer gespeicherten Baseline.
+
+    Args:
+        result (dict): Das aktuelle Ergebnis.
+        baseline (dict): Das Ergebnis der Baseline.
+        tolerance (float): Erlaubte relative Verschlechterung (0.2 = 20 %).
+
+    Returns:
+        list[str]: Beschreibungen aller Regressionen (leer, wenn keine).
+    """
+    regressions = []
+    for key, higher_is_better in COMPARED:
+        old, new = baseline[key], result[key]
+        if not old:
+            continue
+        change = (new - old) / old
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{key}: {old:.1f} -> {new:.1f} ({change:+.0%})")
+    if result["handler_errors"] > baseline.get("handler_errors", 0):
+        regressions.append(f"handler_errors: {baseline.get('handler_errors', 0):.0f} -> {result['handler_errors']:.0f}")
+    if result["unprocessed"]:
+        regressions.append(f"unprocessed: {result['unprocessed']} Updates")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline-Lasttest des Bots mit synthetischen Updates.")
+    parser.add_argument("--updates", type=int, default=None, help="Anzahl der Updates (Standard: rate * duration)")
+    parser.add_argument("--rate", type=float, default=2000.0, help="Angebotene Updates/s (0 = unbegrenzt)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Dauer der Messphase in Sekunden")
+    parser.add_argument("--users", type=int, default=5000, help="Anzahl verschiedener Benutzer")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Gewichte der Update-Arten (Standard: {DEFAULT_MIX})")
+    parser.add_argument("--warmup", type=int, default=500, help="Updates vor der Messphase")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent_updates des Bots")
+    parser.add_argument("--telegram-latency", type=float, default=0.02, help="Latenz der Bot API in Sekunden")
+    parser.add_argument("--binance-latency", type=float, default=0.05, help="Latenz der Binance API in Sekunden")
+    parser.add_argument("--anthropic-latency", type=float, default=1.0, help="Dauer einer Completion in Sekunden")
+    parser.add_argument("--path", default=None, help="Pfad der Test-Datenbank (Standard: temporär)")
+    parser.add_argument("--seed", type=int, default=1, help="Startwert der synthetischen Updates")
+    parser.add_argument("--save-baseline", default=None, help="Speichert das Ergebnis als JSON-Baseline")
+    parser.add_argument("--compare", default=None, help="Vergleicht mit einer JSON-Baseline (Exit-Code 1 bei Regression)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Erlaubte relative Verschlechterung")
+    parser.add_argument("--verbose", action="store_true", help="Ausgaben des Bots anzeigen")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        # Ohne explizite Parameter wird mit der Konfiguration der Baseline gemessen
+        config = baseline["config"]
+        for key in ("rate", "users", "mix", "concurrency", "telegram_latency", "binance_latency",
+                    "anthropic_latency", "seed"):
+            if getattr(args, key) == parser.get_default(key):
+                setattr(args, key, config[key])
+        if args.updates is None:
+            args.updates = config["updates"]
+
+    updates = args.updates or int((args.rate or 2000.0) * args.duration)
+    result = asyncio.run(run_load_test(
+        updates, args.rate, args.users, args.mix, args.warmup, args.concurrency, args.telegram_latency,
+        args.binance_latency, args.anthropic_latency, path=args.path, seed=args.seed, verbose=args.verbose
+    ))
+    print_report(result)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"\nBaseline gespeichert: {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressionen gegenüber {args.compare} (Toleranz {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nKeine Regression gegenüber {args.compare} (Toleranz {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
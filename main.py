@@ -6,15 +6,105 @@ Main entry point for the application.
 
 import os
 # asyncio wird hier NICHT mehr direkt für asyncio.run() benötigt
+from typing import TYPE_CHECKING
+
 from dotenv import load_dotenv
 
-from user_database import UserDatabase
-from payment_handler import PaymentHandler
-from crypto_scalping_bot import CryptoScalpingBot
+from startup import STARTUP
+
+if TYPE_CHECKING:
+    from crypto_scalping_bot import CryptoScalpingBot
+    from payment_providers import PaymentProvider
 
 # Lade Umgebungsvariablen so früh wie möglich
 load_dotenv()
 
+# Subsysteme, die erst create_bot lädt: der Ingress im Multi-Worker-Modus erzeugt keinen Bot.
+# Die Reihenfolge bestimmt, welcher Phase gemeinsame Abhängigkeiten zugerechnet werden.
+SUBSYSTEMS = (
+    ("telegram.ext", "import telegram"),
+    ("aiohttp", "import aiohttp"),
+    ("user_database", "import Datenbank (aiosqlite)"),
+    ("payment_handler", "import Zahlungen"),
+    ("crypto_scalping_bot", "import Bot (Handler)"),
+)
+
+
+def create_payment_providers(config: dict) -> list["PaymentProvider"]:
+    """Erstellt die konfigurierten Zahlungsanbieter. Ohne Anbieter werden Zahlungen simuliert."""
+    from payment_providers import CryptoInvoiceProvider, TelegramPaymentsProvider
+
+    providers = []
+    if config["telegram_payment_token"]:
+        providers.append(TelegramPaymentsProvider(config["telegram_payment_token"]))
+    crypto = config["crypto_pay"]
+    if all(crypto.values()):
+        providers.append(CryptoInvoiceProvider(crypto["api_url"], crypto["api_key"], crypto["webhook_secret"],
+                                               crypto["callback_url"]))
+    return providers
+
+
+def create_bot(config: dict) -> "CryptoScalpingBot":
+    """
+    Erstellt den Bot mit Datenbank, Zahlungsabwicklung und optionalem Binance-Client.
+
+    Wird im Einzelprozess-Modus direkt und im Multi-Worker-Modus in jedem Worker-Prozess aufgerufen,
+    sodass jeder Worker eigene Verbindungen und einen eigenen Marktdaten-Cache erhält. Die Dauer der
+    Importe und der Initialisierung erscheint im Startbericht (siehe startup.py).
+    """
+    for module, phase in SUBSYSTEMS:
+        STARTUP.import_module(module, phase)
+    from crypto_scalping_bot import CryptoScalpingBot
+    from payment_handler import PaymentHandler
+    from user_database import UserDatabase
+
+    # Binance ist optional: ohne Schlüssel stehen die Marktdaten-Befehle (z.B. /scan) nicht zur Verfügung,
+    # und NumPy wird gar nicht erst geladen. Der Client öffnet seine Verbindungen erst beim ersten Aufruf.
+    binance_client = None
+    if config["binance_api_key"] and config["binance_api_secret"]:
+        STARTUP.import_module("binance_api_client", "import Binance (numpy)")
+        from binance_api_client import BinanceAPIClient
+        from kline_store import KlineStore
+        from market_cache import MarketDataCache
+        from market_stream import MarketDataStream
+
+        with STARTUP.phase("init Binance (Client, Stream)"):
+            binance_client = BinanceAPIClient(
+                config["binance_api_key"], config["binance_api_secret"],
+                kline_store=KlineStore(),
+                cache=MarketDataCache(max_entries=config["market_cache_size"])
+            )
+            if config["stream_symbols"]:
+                # Ein 1m-Stream pro Symbol; höhere Intervalle werden daraus lokal abgeleitet
+                binance_client.market_stream = MarketDataStream(
+                    config["stream_symbols"], kline_store=binance_client.kline_store, rest_client=binance_client
+                )
+
+    # Initialize database and payment handler
+    db_instance = UserDatabase(config["db_path"])
+    with STARTUP.phase("init Zahlungsanbieter"):
+        payment_handler_instance = PaymentHandler(db_instance, providers=create_payment_providers(config))
+
+    # Der Anthropic-Client wird erst bei der ersten Analyse geladen (siehe ClaudeAPI.client)
+    with STARTUP.phase("init Bot (Application, Handler)"):
+        return CryptoScalpingBot(
+            token=config["telegram_token"],
+            anthropic_api_key=config["anthropic_api_key"],
+            user_db=db_instance,
+            payment_handler_param=payment_handler_instance,
+            binance_client=binance_client,
+            concurrent_updates=config["concurrent_updates"],
+            shard=config.get("shard"),
+            outbound_rate=config["outbound_rate"],
+            admin_ids=config["admin_ids"],
+            # Im Multi-Worker-Modus nimmt der Ingress die Zahlungs-Webhooks an
+            payment_port=config["payment_port"] if config.get("shard") is None else None,
+            # Jeder Worker erhält einen eigenen Metrik-Port direkt hinter METRICS_PORT
+            metrics_port=config["metrics_port"] + (config["shard"][0] + 1 if config.get("shard") else 0)
+            if config["metrics_port"] else None,
+            profile=config["profile"]
+        )
+
 
 # Die main-Funktion ist jetzt wieder SYNCHRON, da bot.run() (welches run_polling aufruft) den asyncio-Loop verwaltet
 def main():
@@ -36,22 +126,65 @@ def main():
         print("ERROR: ANTHROPIC_API_KEY is missing or empty! Please check your .env file.")
         return
 
-    # Initialize database and payment handler
-    db_instance = UserDatabase()
-    payment_handler_instance = PaymentHandler(db_instance)
+    config = {
+        "telegram_token": telegram_token,
+        "anthropic_api_key": anthropic_api_key,
+        "binance_api_key": (os.getenv("BINANCE_API_KEY") or "").strip(),
+        "binance_api_secret": (os.getenv("BINANCE_API_SECRET") or "").strip(),
+        "market_cache_size": int(os.getenv("MARKET_CACHE_SIZE", "10000")),
+        # Kommagetrennte Symbole, deren Klines und Preise per WebSocket aktuell gehalten werden
+        "stream_symbols": [s.strip().upper() for s in (os.getenv("MARKET_STREAM_SYMBOLS") or "").split(",") if s.strip()],
+        "db_path": os.getenv("USER_DB_PATH", "user_data.db"),
+        "concurrent_updates": int(os.getenv("BOT_CONCURRENT_UPDATES", "8")),
+        # Kommagetrennte Telegram-IDs, die z.B. /broadcast verwenden dürfen
+        "admin_ids": {int(i) for i in (os.getenv("ADMIN_USER_IDS") or "").split(",") if i.strip()},
+        # Zahlungsanbieter: Telegram Payments und/oder Krypto-Rechnungen
+        "telegram_payment_token": (os.getenv("TELEGRAM_PAYMENT_PROVIDER_TOKEN") or "").strip(),
+        "crypto_pay": {
+            "api_url": (os.getenv("CRYPTO_PAY_API_URL") or "").strip(),
+            "api_key": (os.getenv("CRYPTO_PAY_API_KEY") or "").strip(),
+            "webhook_secret": (os.getenv("CRYPTO_PAY_WEBHOOK_SECRET") or "").strip(),
+            # Öffentliche URL des Bestätigungs-Webhooks, z.B. https://example.org/payments/crypto
+            "callback_url": (os.getenv("CRYPTO_PAY_CALLBACK_URL") or "").strip(),
+        },
+        # Port der Zahlungs-Webhooks beim Polling (im Webhook-Modus dient WEBHOOK_PORT)
+        "payment_port": int(os.getenv("PAYMENT_WEBHOOK_PORT", "0")) or None,
+        # Prometheus-Endpunkt auf 127.0.0.1 und Sampling-Profiler (METRICS_PROFILE=1)
+        "metrics_port": int(os.getenv("METRICS_PORT", "0")) or None,
+        "profile": os.getenv("METRICS_PROFILE", "0") == "1",
+    }
+    if not (config["binance_api_key"] and config["binance_api_secret"]):
+        print("WARNING: BINANCE_API_KEY/BINANCE_API_SECRET missing, market data commands are disabled.")
+
+    # Mit TELEGRAM_WEBHOOK_URL stellt Telegram die Updates per Webhook zu, sonst wird gepollt
+    serve_options = {
+        "webhook_url": (os.getenv("TELEGRAM_WEBHOOK_URL") or "").strip() or None,
+        "listen": os.getenv("WEBHOOK_LISTEN", "0.0.0.0"),
+        "port": int(os.getenv("WEBHOOK_PORT", "8443")),
+        "secret_token": (os.getenv("TELEGRAM_WEBHOOK_SECRET") or "").strip() or None,
+    }
+
+    # Mit BOT_WORKERS > 1 verteilt ein Ingress-Prozess die Updates nach user_id auf mehrere Worker-Prozesse
+    workers = int(os.getenv("BOT_WORKERS", "1"))
+    # Telegram begrenzt den Versand pro Bot, nicht pro Prozess: die Worker teilen sich das Limit
+    config["outbound_rate"] = float(os.getenv("BOT_OUTBOUND_RATE", "25")) / max(1, workers)
+    if workers > 1:
+        print(f"Starting CA3003BOT with {workers} workers...")
+        from worker_pool import WorkerPool
+
+        pool = WorkerPool(create_bot, config, telegram_token, workers=workers,
+                          socket_dir=os.getenv("BOT_SOCKET_DIR") or None,
+                          payment_providers=[p for p in create_payment_providers(config) if p.routes()],
+                          payment_port=config["payment_port"])
+        pool.run(**serve_options) # Diese Methode blockiert, bis der Bot gestoppt wird
+        return
 
-    # Initialize and start bot
-    bot = CryptoScalpingBot(
-        token=telegram_token,
-        anthropic_api_key=anthropic_api_key,
-        user_db=db_instance,
-        payment_handler_param=payment_handler_instance
-    )
+    bot = create_bot(config)
 
     print("Starting CA3003BOT...")
 
     # Die Datenbankverbindung wird jetzt über die post_init/post_shutdown Callbacks des Bots verwaltet.
-    bot.run() # Diese Methode blockiert, bis der Bot gestoppt wird
+    bot.run(**serve_options) # Diese Methode blockiert, bis der Bot gestoppt wird
 
 
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+"""
+Market Cache - TTL- und LRU-Cache für Marktdaten mit Single-Flight-Deduplizierung
+"""
+
+import asyncio
+import datetime
+import time
+from collections import OrderedDict
+
+from kline_store import interval_to_ms
+
+# Binance-Wochen beginnen montags, die Unix-Epoche an einem Donnerstag
+_WEEK_OFFSET_MS = 4 * 86_400_000
+
+
+class _LoaderCancelled(Exception):
+    """Der Aufrufer, der einen gemeinsamen Ladevorgang ausgelöst hat, wurde abgebrochen."""
+
+
+def candle_close_time(interval: str, now: float | None = None) -> float:
+    """
+    Gibt den Zeitpunkt zurück, an dem der aktuell laufende Candlestick schließt.
+
+    Args:
+        interval (str): Das Zeitintervall (z.B. '1m', '1h', '1w', '1M').
+        now (float | None): Der Bezugszeitpunkt als Unix-Zeit in Sekunden (Standard: jetzt).
+
+    Returns:
+        float: Der Schlusszeitpunkt als Unix-Zeit in Sekunden.
+    """
+    now = time.time() if now is None else now
+    if interval.endswith("M"):
+        current = datetime.datetime.fromtimestamp(now, tz=datetime.timezone.utc)
+        month_index = current.year * 12 + current.month - 1 + int(interval[:-1])
+        close = datetime.datetime(month_index // 12, month_index % 12 + 1, 1, tzinfo=datetime.timezone.utc)
+        return close.timestamp()
+    step = interval_to_ms(interval)
+    offset = _WEEK_OFFSET_MS if interval.endswith("w") else 0
+    now_ms = int(now * 1000)
+    return (((now_ms - offset) // step + 1) * step + offset) / 1000.0
+
+
+class MarketDataCache:
+    """Begrenzter Cache mit Ablaufzeit pro Eintrag, LRU-Verdrängung und Single-Flight-Ladevorgängen."""
+
+    def __init__(self, max_entries: int = 10_000, ticker_ttl: float = 1.0):
+        """
+        Initialisiert den MarketDataCache.
+
+        Args:
+            max_entries (int): Die maximale Anzahl gehaltener Einträge.
+            ticker_ttl (float): Gültigkeit eines Tickerpreises in Sekunden.
+        """
+        self.max_entries = max_entries
+        self.ticker_ttl = ticker_ttl
+        self._entries: OrderedDict = OrderedDict()  # Schlüssel -> (Ablaufzeit, Wert)
+        self._inflight: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Gibt einen gültigen Eintrag zurück und markiert ihn als zuletzt verwendet.
+
+        Returns:
+            Der gespeicherte Wert oder None, wenn kein gültiger Eintrag existiert.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value, expires_at: float) -> None:
+        """
+        Speichert einen Wert bis zum angegebenen Zeitpunkt.
+
+        Args:
+            key: Der Cache-Schlüssel.
+            value: Der zu speichernde Wert.
+            expires_at (float): Die Ablaufzeit als Unix-Zeit in Sekunden.
+        """
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key) -> None:
+        """Entfernt einen Eintrag aus dem Cache."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Leert den Cache, die Zähler bleiben erhalten."""
+        self._entries.clear()
+
+    async def get_or_load(self, key, expires_at, loader):
+        """
+        Gibt einen gültigen Eintrag zurück oder lädt ihn genau einmal nach.
+
+        Gleichzeitige Fehlzugriffe auf denselben Schlüssel warten auf denselben Ladevorgang.
+        Ausnahmen des Loaders werden an alle Wartenden weitergereicht und nicht gespeichert.
+        Wird der auslösende Aufrufer abgebrochen, lädt ein Wartender mit seinem eigenen Loader neu.
+
+        Args:
+            key: Der Cache-Schlüssel.
+            expires_at (float | Callable[[], float]): Die Ablaufzeit des geladenen Werts oder eine
+                                                      Funktion, die sie nach dem Laden berechnet.
+            loader (Callable[[], Awaitable]): Lädt den Wert bei einem Fehlzugriff.
+
+        Returns:
+            Der gespeicherte oder frisch geladene Wert.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        while (future := self._inflight.get(key)) is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except _LoaderCancelled:
+                continue
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Nicht future.cancel(): die Wartenden selbst wurden nicht abgebrochen und laden neu
+            future.set_exception(_LoaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            if value is not None:
+                self.put(key, value, expires_at() if callable(expires_at) else expires_at)
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def ticker_expiry(self) -> float:
+        """Ablaufzeit für einen jetzt geladenen Tickerpreis."""
+        return time.time() + self.ticker_ttl
+
+    @staticmethod
+    def klines_expiry(interval: str) -> float:
+        """Ablaufzeit für jetzt geladene Klines: der Schluss des laufenden Candlesticks."""
+        return candle_close_time(interval)
+
+    def stats(self) -> dict:
+        """
+        Gibt die Zähler des Caches zurück.
+
+        Returns:
+            dict: Einträge, Treffer, Fehlzugriffe, Verdrängungen, Abläufe, zusammengelegte
+                  Ladevorgänge und die Trefferquote.
+        """
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,155 @@
+"""
+Market Snapshot - Kompakte, reproduzierbare Marktzusammenfassung für den LLM-Pfad
+
+Statt Hunderter Candlesticks als Text erhält das Modell eine Zusammenfassung fester Größe:
+heruntergerechneter Preisverlauf, wichtige Niveaus, Indikatorwerte und Regime-Labels.
+Alle Zahlen werden auf wenige signifikante Stellen gerundet, sodass derselbe Marktzustand
+Byte für Byte denselben Text ergibt und als Cache-Schlüssel dienen kann.
+"""
+
+import time
+
+import numpy as np
+
+import indicators
+
+# Grobe Schätzung für Claude-Tokenizer: etwa 4 Zeichen pro Token
+CHARS_PER_TOKEN = 4
+
+# Geschätzte Tokens eines rohen Candlesticks als JSON im Binance-Format (etwa 160 Zeichen:
+# zwei Zeitstempel, acht Dezimalstrings mit 8 Nachkommastellen, Anzahl der Trades)
+RAW_TOKENS_PER_CANDLE = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """Schätzt die Anzahl der Tokens eines Textes."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _q(value: float, digits: int = 4) -> str:
+    """Rundet auf signifikante Stellen und formatiert stabil ('-' für NaN)."""
+    if value is None or not np.isfinite(value):
+        return "-"
+    return f"{float(value):.{digits}g}"
+
+
+def _pct(value: float) -> str:
+    """Formatiert einen Anteil als Prozent mit zwei Nachkommastellen."""
+    if value is None or not np.isfinite(value):
+        return "-"
+    return f"{value * 100:+.2f}%"
+
+
+def _columns(candles) -> dict[str, np.ndarray]:
+    """Akzeptiert Klines im Binance-Format oder ein Spalten-Dictionary (KlineBuffer.window)."""
+    if isinstance(candles, dict):
+        return {name: np.asarray(candles[name], dtype=np.float64) for name in ("open", "high", "low", "close", "volume")}
+    rows = np.array([[float(v) for v in k[1:6]] for k in candles], dtype=np.float64).reshape(-1, 5)
+    return {"open": rows[:, 0], "high": rows[:, 1], "low": rows[:, 2], "close": rows[:, 3], "volume": rows[:, 4]}
+
+
+class SnapshotBuilder:
+    """Erzeugt Markt-Snapshots und zählt, wie viel Kontext gegenüber rohen Klines gespart wird."""
+
+    def __init__(self, path_points: int = 12, max_chars: int = 600):
+        """
+        Initialisiert den SnapshotBuilder.
+
+        Args:
+            path_points (int): Anzahl der Punkte des heruntergerechneten Preisverlaufs.
+            max_chars (int): Feste Obergrenze für die Länge eines Snapshots.
+        """
+        self.path_points = path_points
+        self.max_chars = max_chars
+        self.builds = 0
+        self.snapshot_tokens = 0
+        self.raw_tokens = 0
+        self.build_seconds = 0.0
+
+    def build(self, symbol: str, interval: str, candles) -> str:
+        """
+        Erzeugt den Snapshot eines Symbols.
+
+        Args:
+            symbol (str): Das Handelspaar.
+            interval (str): Das Zeitintervall der Candlesticks.
+            candles (list | dict): Klines im Format von BinanceAPIClient.get_klines oder
+                                   ein Spalten-Dictionary wie von KlineBuffer.window.
+
+        Returns:
+            str: Der Snapshot, höchstens max_chars Zeichen lang.
+        """
+        started = time.perf_counter()
+        c = _columns(candles)
+        close, high, low, volume = c["close"], c["high"], c["low"], c["volume"]
+        n = len(close)
+        if n == 0:
+            return f"{symbol} {interval}: keine Daten"
+        last = close[-1]
+
+        # Preisverlauf: Schlusskurs am Ende jedes Abschnitts relativ zum letzten Kurs
+        edges = np.linspace(0, n, min(self.path_points, n) + 1).astype(int)[1:] - 1
+        path = " ".join(_pct(close[i] / last - 1.0) for i in edges)
+
+        rsi = indicators.rsi(close, 14)[-1]
+        _, _, hist = indicators.macd(close)
+        mid, upper, lower = indicators.bollinger_bands(close, 20, 2.0)
+        atr = indicators.atr(high, low, close, 14)
+        atr_pct = atr[-1] / last
+        k, d = indicators.stochastic(high, low, close)
+        ema_fast, ema_slow = indicators.ema(close, 9)[-1], indicators.ema(close, 21)[-1]
+        vwap = indicators.vwap(high, low, close, volume)[-1]
+        recent = slice(max(0, n - 20), n)
+        volume_ratio = volume[-1] / np.mean(volume[max(0, n - 21):n - 1]) if n > 1 else np.nan
+
+        trend = "seitwärts"
+        if ema_fast > ema_slow * 1.001:
+            trend = "aufwärts"
+        elif ema_fast < ema_slow * 0.999:
+            trend = "abwärts"
+        median_atr = np.nanmedian(atr) if np.isfinite(atr).any() else np.nan
+        volatility = "normal"
+        if np.isfinite(median_atr) and atr[-1] > 1.5 * median_atr:
+            volatility = "hoch"
+        elif np.isfinite(median_atr) and atr[-1] < 0.67 * median_atr:
+            volatility = "niedrig"
+        momentum = "neutral"
+        if np.isfinite(rsi) and rsi >= 70:
+            momentum = "überkauft"
+        elif np.isfinite(rsi) and rsi <= 30:
+            momentum = "überverkauft"
+        volume_label = "Spike" if np.isfinite(volume_ratio) and volume_ratio >= 2.0 else "normal"
+
+        lines = [
+            f"{symbol} {interval} n={n} Kurs={_q(last, 6)} Δ={_pct(last / close[0] - 1.0)}",
+            f"Verlauf: {path}",
+            f"Niveaus: H={_q(high.max(), 6)} T={_q(low.min(), 6)} H20={_q(high[recent].max(), 6)} "
+            f"T20={_q(low[recent].min(), 6)} VWAP={_q(vwap, 6)} BB={_q(lower[-1], 6)}/{_q(upper[-1], 6)}",
+            f"Indikatoren: RSI={_q(rsi, 3)} MACDh={_q(hist[-1] / last * 1e4, 3)}bp ATR={_pct(atr_pct)} "
+            f"Stoch={_q(k[-1], 3)}/{_q(d[-1], 3)} EMA9/21={_q(ema_fast / ema_slow - 1.0, 3)} Vol×={_q(volume_ratio, 3)}",
+            f"Regime: Trend={trend} Volatilität={volatility} Momentum={momentum} Volumen={volume_label}",
+        ]
+        snapshot = "\n".join(lines)[:self.max_chars]
+
+        self.builds += 1
+        self.snapshot_tokens += estimate_tokens(snapshot)
+        # Nur geschätzt: die rohen Klines für die Statistik zu serialisieren kostete mehr als der Snapshot
+        self.raw_tokens += n * RAW_TOKENS_PER_CANDLE
+        self.build_seconds += time.perf_counter() - started
+        return snapshot
+
+    def stats(self) -> dict:
+        """
+        Gibt die Zähler des Builders zurück.
+
+        Returns:
+            dict: Anzahl der Snapshots, geschätzte Tokens der Snapshots und der rohen Klines,
+                  die Einsparung und die mittlere Erstellungszeit.
+        """
+        return {
+            "builds": self.builds,
+            "snapshot_tokens": self.snapshot_tokens,
+            "raw_tokens": self.raw_tokens,
+            "saved_ratio": 1.0 - self.snapshot_tokens / self.raw_tokens if self.raw_tokens else 0.0,
+            "avg_build_ms": self.build_seconds / self.builds * 1000 if self.builds else 0.0,
+        }
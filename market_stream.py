@@ -0,0 +1,187 @@
+"""
+Market Stream - WebSocket-Ingest für Binance Kline- und MiniTicker-Streams
+"""
+
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from kline_store import KlineStore, interval_to_ms
+from resampler import BASE_INTERVAL, DEFAULT_INTERVALS, Resampler
+
+
+class MarketDataStream:
+    """Hält Preise und Candlesticks für eine feste Symbolmenge über Binance-WebSockets aktuell."""
+
+    def __init__(self, symbols: list[str], intervals: list[str] | None = None,
+                 kline_store: KlineStore | None = None, rest_client=None,
+                 base_url: str = "wss://stream.binance.com:9443",
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0,
+                 resample_intervals=DEFAULT_INTERVALS):
+        """
+        Initialisiert den MarketDataStream.
+
+        Args:
+            symbols (list[str]): Die zu abonnierenden Handelspaare (z.B. ['BTCUSDT', 'ETHUSDT']).
+            intervals (list[str] | None): Die Kline-Intervalle pro Symbol (Standard: ['1m']).
+            kline_store (KlineStore | None): Speicher für die Candlesticks. Wird bei Bedarf angelegt.
+            rest_client (BinanceAPIClient | None): Client zum Auffüllen von Lücken über REST.
+            base_url (str): Basis-URL des WebSocket-Endpunkts.
+            reconnect_delay (float): Anfängliche Wartezeit in Sekunden vor einem Reconnect.
+            max_reconnect_delay (float): Maximale Wartezeit in Sekunden zwischen Reconnects.
+            resample_intervals (Iterable[str]): Intervalle, die lokal aus dem 1m-Stream abgeleitet statt
+                                                abonniert oder per REST abgerufen werden (siehe resampler.py).
+        """
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.intervals = intervals or ["1m"]
+        self.kline_store = kline_store if kline_store is not None else KlineStore()
+        self.rest_client = rest_client
+        self.base_url = base_url.rstrip("/")
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        # Abgeleitete Intervalle gibt es nur mit 1m-Stream; direkt abonnierte haben Vorrang
+        derived = [interval for interval in resample_intervals if interval not in self.intervals]
+        self.resampler = Resampler(self.kline_store, derived) if BASE_INTERVAL in self.intervals and derived else None
+
+        self.prices: dict[str, float] = {}
+        # Werden bei jedem Preis-Update mit (symbol, price) aufgerufen, z.B. von der PriceAlertEngine
+        self.price_listeners: list = []
+        self.connected = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def url(self) -> str:
+        """Die URL des kombinierten Streams für alle Symbole und Intervalle."""
+        streams = []
+        for symbol in self.symbols:
+            lower = symbol.lower()
+            streams.append(f"{lower}@miniTicker")
+            streams.extend(f"{lower}@kline_{interval}" for interval in self.intervals)
+        return f"{self.base_url}/stream?streams={'/'.join(streams)}"
+
+    async def start(self) -> None:
+        """Startet den Empfang im Hintergrund."""
+        if self._task is None:
+            self._session = aiohttp.ClientSession()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Beendet den Empfang und schließt die Verbindung."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self.connected.clear()
+
+    async def _run(self) -> None:
+        """Verbindet sich mit dem Stream und stellt die Verbindung nach Abbrüchen wieder her."""
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with self._session.ws_connect(self.url) as ws:
+                    # Lücken auffüllen, bevor Nachrichten verarbeitet werden. Die Stream-Nachrichten
+                    # werden solange gepuffert und danach in der richtigen Reihenfolge übernommen.
+                    await self._backfill()
+                    self.connected.set()
+                    delay = self.reconnect_delay
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._handle_message(json.loads(msg.data))
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+                print("Stream: Verbindung zu Binance wurde geschlossen.")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Stream: Fehler in der Verbindung zu Binance: {e}")
+            self.connected.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _backfill(self) -> None:
+        """Lädt über REST alle Candlesticks nach, die seit dem letzten empfangenen fehlen."""
+        if self.rest_client is None:
+            return
+        now_ms = int(time.time() * 1000)
+        max_limit = min(self.kline_store.capacity, 1000)
+        for symbol in self.symbols:
+            for interval in self.intervals:
+                buf = self.kline_store.buffer(symbol, interval)
+                if buf.last_open_time is None:
+                    limit = max_limit
+                else:
+                    limit = (now_ms - buf.last_open_time) // interval_to_ms(interval) + 1
+                    if limit > max_limit:
+                        # Die Seite reicht nicht bis zum letzten gespeicherten Candlestick zurück:
+                        # angehängt entstünde eine stille Lücke, daher beginnt der Puffer neu
+                        buf = self.kline_store.replace(symbol, interval)
+                limit = max(1, min(limit, max_limit))
+                klines = await self.rest_client.fetch_klines(symbol, interval, limit)
+                buf.extend(klines)
+            if self.resampler is not None:
+                self.resampler.rebuild(symbol)
+
+    def _handle_message(self, message: dict) -> None:
+        """Übernimmt eine Nachricht des kombinierten Streams in den Speicher."""
+        data = message.get("data", message)
+        event = data.get("e")
+        if event == "24hrMiniTicker":
+            price = float(data["c"])
+            self.prices[data["s"]] = price
+            for listener in self.price_listeners:
+                listener(data["s"], price)
+        elif event == "kline":
+            k = data["k"]
+            kline = (k["t"], k["o"], k["h"], k["l"], k["c"], k["v"], k["T"], k["q"], k["n"], k["V"], k["Q"])
+            self.kline_store.buffer(k["s"], k["i"]).append(kline)
+            if self.resampler is not None and k["i"] == BASE_INTERVAL:
+                self.resampler.on_kline(k["s"], kline)
+            self.prices[k["s"]] = float(k["c"])
+
+    def get_price(self, symbol: str) -> float | None:
+        """
+        Gibt den zuletzt empfangenen Preis zurück.
+
+        Args:
+            symbol (str): Das Handelspaar.
+
+        Returns:
+            float | None: Der Preis oder None, wenn der Stream ihn nicht aktuell liefern kann.
+        """
+        if not self.connected.is_set():
+            return None
+        return self.prices.get(symbol.upper())
+
+    def get_klines(self, symbol: str, interval: str, limit: int) -> list | None:
+        """
+        Gibt die letzten Candlesticks aus dem Speicher zurück.
+
+        Args:
+            symbol (str): Das Handelspaar.
+            interval (str): Das Zeitintervall.
+            limit (int): Die gewünschte Anzahl der Candlesticks.
+
+        Returns:
+            list | None: Candlesticks im Format von BinanceAPIClient.get_klines oder None,
+                         wenn der Stream die Anfrage nicht vollständig beantworten kann.
+        """
+        if not self.connected.is_set() or symbol.upper() not in self.symbols:
+            return None
+        if interval not in self.intervals:
+            # Höhere Intervalle aus dem 1m-Stream, sofern genug Historie vorliegt
+            if self.resampler is not None and interval in self.resampler.intervals:
+                return self.resampler.get_klines(symbol, interval, limit)
+            return None
+        buf = self.kline_store.get(symbol, interval)
+        if buf is None or len(buf) < limit:
+            return None
+        return buf.to_rows(limit)
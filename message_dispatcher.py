@@ -0,0 +1,356 @@
+"""
+Message Dispatcher - Ausgehende Telegram-Nachrichten mit Flood-Control
+
+Alle Nachrichten laufen durch einen Scheduler mit Token-Buckets für das globale Limit
+(~30 Nachrichten/s) und das Limit pro Chat (~1 Nachricht/s). Prioritätsspuren sorgen dafür,
+dass Antworten auf Befehle vor Benachrichtigungen und Broadcasts gesendet werden; ein
+RetryAfter von Telegram pausiert den gesamten Versand für die verlangte Zeit.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+
+from telegram.error import NetworkError, RetryAfter, TimedOut
+
+# Prioritätsspuren: kleinere Werte werden zuerst gesendet
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NOTIFICATION = 1
+PRIORITY_BROADCAST = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_NOTIFICATION: "notification",
+                  PRIORITY_BROADCAST: "broadcast"}
+
+
+class TokenBucket:
+    """Token-Bucket mit rate Tokens pro Sekunde und höchstens capacity Tokens."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def ready_at(self, now: float) -> float:
+        """Zeitpunkt, ab dem ein Token verfügbar ist (now, falls sofort)."""
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return now
+        return now + (1.0 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        """Entnimmt ein Token. Vorher muss ready_at(now) <= now geprüft worden sein."""
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Job:
+    """Eine Nachricht an einen Chat. payload wird bei Broadcasts von allen Jobs geteilt."""
+
+    __slots__ = ("chat_id", "payload", "priority", "seq", "future", "enqueued_at", "attempts")
+
+    def __init__(self, chat_id: int, payload: dict, priority: int, seq: int, future: asyncio.Future, now: float):
+        self.chat_id = chat_id
+        self.payload = payload
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+        self.enqueued_at = now
+        self.attempts = 0
+
+
+class MessageDispatcher:
+    """Sendet Nachrichten über einen telegram.Bot unter Einhaltung der Flood-Limits."""
+
+    def __init__(self, bot, global_rate: float = 25.0, per_chat_rate: float = 1.0, per_chat_burst: int = 3,
+                 max_in_flight: int = 32, max_retries: int = 3, latency_window: int = 1000):
+        """
+        Initialisiert den MessageDispatcher.
+
+        Args:
+            bot (telegram.Bot): Der Bot, über den gesendet wird.
+            global_rate (float): Maximale Anzahl Nachrichten pro Sekunde insgesamt.
+            per_chat_rate (float): Maximale Anzahl Nachrichten pro Sekunde und Chat im Dauerbetrieb.
+            per_chat_burst (int): Anzahl Nachrichten, die ein Chat kurzfristig am Stück erhalten darf.
+            max_in_flight (int): Maximale Anzahl gleichzeitig laufender HTTP-Anfragen.
+            max_retries (int): Wiederholungen nach RetryAfter oder Zeitüberschreitung.
+            latency_window (int): Anzahl der letzten Sendelatenzen für die Perzentile.
+        """
+        self.bot = bot
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+
+        self._global_bucket: TokenBucket | None = None
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        # Sendebereite Jobs nach (Priorität, Reihenfolge); wegen des Chat-Limits zurückgestellte
+        # Jobs nach (Bereitschaftszeit, Priorität, Reihenfolge)
+        self._ready: list[tuple[int, int, _Job]] = []
+        self._delayed: list[tuple[float, int, int, _Job]] = []
+        self._queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._in_flight: asyncio.Semaphore | None = None
+        self._sends: set[asyncio.Task] = set()
+        self._paused_until = 0.0
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+        # Metriken
+        self.sent = 0
+        self.failed = 0
+        self.retry_after_events = 0
+        self._latencies: deque[float] = deque(maxlen=latency_window)
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+
+    def start(self) -> None:
+        """Startet den Scheduler im Hintergrund."""
+        if self._task is None:
+            self._stopping = False
+            # Kleiner Burst, damit auch im ersten Sekundenfenster das globale Limit hält
+            self._global_bucket = TokenBucket(self.global_rate, max(1.0, self.global_rate / 5), time.monotonic())
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, drain: bool = True) -> None:
+        """
+        Beendet den Scheduler.
+
+        Args:
+            drain (bool): Wartende Nachrichten vorher noch senden. Sonst werden sie abgebrochen.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        if not drain:
+            for *_, job in self._ready + self._delayed:
+                job.future.cancel()
+            self._ready.clear()
+            self._delayed.clear()
+            self._queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        if self._sends:
+            await asyncio.gather(*self._sends, return_exceptions=True)
+
+    def submit(self, chat_id: int, text: str, priority: int = PRIORITY_INTERACTIVE, **kwargs) -> asyncio.Future:
+        """
+        Reiht eine Nachricht ein, ohne auf den Versand zu warten.
+
+        Args:
+            chat_id (int): Der Ziel-Chat.
+            text (str): Der Nachrichtentext.
+            priority (int): PRIORITY_INTERACTIVE, PRIORITY_NOTIFICATION oder PRIORITY_BROADCAST.
+            **kwargs: Weitere Parameter für Bot.send_message (z.B. reply_markup, parse_mode).
+
+        Returns:
+            asyncio.Future: Wird mit der gesendeten telegram.Message oder dem Fehler aufgelöst.
+        """
+        return self._enqueue(chat_id, dict(kwargs, text=text), priority)
+
+    async def send_message(self, chat_id: int, text: str, priority: int = PRIORITY_INTERACTIVE, **kwargs):
+        """Wie submit(), wartet aber auf den Versand und gibt die gesendete telegram.Message zurück."""
+        return await self.submit(chat_id, text, priority, **kwargs)
+
+    def broadcast(self, chat_ids, text: str, priority: int = PRIORITY_BROADCAST, **kwargs) -> list[asyncio.Future]:
+        """
+        Sendet dieselbe Nachricht an viele Chats. Der Inhalt wird einmal aufgebaut und geteilt.
+
+        Args:
+            chat_ids (Iterable[int]): Die Ziel-Chats.
+            text (str): Der Nachrichtentext.
+            priority (int): Die Prioritätsspur (Standard: PRIORITY_BROADCAST).
+            **kwargs: Weitere Parameter für Bot.send_message.
+
+        Returns:
+            list[asyncio.Future]: Ein Future pro Chat, siehe submit().
+        """
+        payload = dict(kwargs, text=text)
+        return [self._enqueue(chat_id, payload, priority) for chat_id in chat_ids]
+
+    async def broadcast_stream(self, chat_ids, text: str, priority: int = PRIORITY_BROADCAST,
+                               max_pending: int = 500, **kwargs) -> dict:
+        """
+        Sendet dieselbe Nachricht an Chats aus einem asynchronen Iterator mit Gegendruck.
+
+        Es sind höchstens max_pending Nachrichten gleichzeitig eingereiht; weitere Empfänger werden
+        erst gelesen, wenn Nachrichten versendet wurden. So bleibt der Speicherbedarf unabhängig von
+        der Anzahl der Empfänger.
+
+        Args:
+            chat_ids (AsyncIterable[int]): Die Ziel-Chats, z.B. aus UserDatabase.iter_active_subscribers.
+            text (str): Der Nachrichtentext.
+            priority (int): Die Prioritätsspur (Standard: PRIORITY_BROADCAST).
+            max_pending (int): Maximale Anzahl eingereihter, noch nicht versendeter Nachrichten.
+            **kwargs: Weitere Parameter für Bot.send_message.
+
+        Returns:
+            dict: Anzahl der gesendeten ('sent') und fehlgeschlagenen ('failed') Nachrichten.
+        """
+        payload = dict(kwargs, text=text)
+        pending: set[asyncio.Future] = set()
+        result = {"sent": 0, "failed": 0}
+
+        def collect(done) -> None:
+            for future in done:
+                if future.cancelled() or future.exception() is not None:
+                    result["failed"] += 1
+                else:
+                    result["sent"] += 1
+
+        async for chat_id in chat_ids:
+            if len(pending) >= max_pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+            pending.add(self._enqueue(chat_id, payload, priority))
+        if pending:
+            done, _ = await asyncio.wait(pending)
+            collect(done)
+        return result
+
+    def _enqueue(self, chat_id: int, payload: dict, priority: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        if self._stopping:
+            future.set_exception(RuntimeError("MessageDispatcher wird beendet"))
+            return future
+        job = _Job(chat_id, payload, priority, next(self._seq), future, time.monotonic())
+        heapq.heappush(self._ready, (priority, job.seq, job))
+        self._queued[priority] += 1
+        self._wakeup.set()
+        return future
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= 10000:
+                # Volle Buckets verhalten sich wie neue und können verworfen werden
+                self._chat_buckets = {c: b for c, b in self._chat_buckets.items() if not b.is_full(now)}
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.per_chat_rate, self.per_chat_burst, now)
+        return bucket
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, priority, seq, job = heapq.heappop(self._delayed)
+                heapq.heappush(self._ready, (priority, seq, job))
+
+            if not self._ready:
+                if self._stopping and not self._delayed:
+                    return
+                self._wakeup.clear()
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Globale Pause nach RetryAfter und globales Limit
+            wait = max(self._paused_until, self._global_bucket.ready_at(now)) - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            _, _, job = heapq.heappop(self._ready)
+            chat_bucket = self._chat_bucket(job.chat_id, now)
+            ready_at = chat_bucket.ready_at(now)
+            if ready_at > now:
+                heapq.heappush(self._delayed, (ready_at, job.priority, job.seq, job))
+                continue
+
+            chat_bucket.consume(now)
+            self._global_bucket.consume(now)
+            self._queued[job.priority] -= 1
+            await self._in_flight.acquire()
+            task = asyncio.create_task(self._send(job))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _send(self, job: _Job) -> None:
+        try:
+            if job.future.cancelled():
+                return
+            job.attempts += 1
+            try:
+                message = await self.bot.send_message(chat_id=job.chat_id, **job.payload)
+            except RetryAfter as e:
+                self.retry_after_events += 1
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                self._paused_until = max(self._paused_until, time.monotonic() + float(retry_after))
+                self._retry(job, e)
+                return
+            except TimedOut as e:
+                self._retry(job, e)
+                return
+            except Exception as e:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+                return
+
+            latency = time.monotonic() - job.enqueued_at
+            self.sent += 1
+            self._latencies.append(latency)
+            self._latency_sum += latency
+            self._latency_max = max(self._latency_max, latency)
+            if not job.future.done():
+                job.future.set_result(message)
+        finally:
+            self._in_flight.release()
+
+    def _retry(self, job: _Job, error: NetworkError) -> None:
+        """Stellt einen Job an seiner ursprünglichen Position wieder ein oder gibt nach max_retries auf."""
+        if job.attempts > self.max_retries:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(error)
+            return
+        heapq.heappush(self._ready, (job.priority, job.seq, job))
+        self._queued[job.priority] += 1
+        self._wakeup.set()
+
+    def queue_depth(self) -> dict[str, int]:
+        """Anzahl wartender Nachrichten pro Prioritätsspur."""
+        return {PRIORITY_NAMES[priority]: count for priority, count in self._queued.items()}
+
+    def stats(self) -> dict:
+        """
+        Gibt die Metriken des Dispatchers zurück.
+
+        Returns:
+            dict: Warteschlangen pro Spur, laufende Anfragen, Zähler und Sendelatenzen (Einreihen bis
+                  Versand) in Sekunden als Mittelwert, p50, p95 und Maximum.
+        """
+        latencies = sorted(self._latencies)
+
+        def percentile(q: float) -> float:
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+
+        return {
+            "queued": self.queue_depth(),
+            "in_flight": len(self._sends),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retry_after_events": self.retry_after_events,
+            "latency_avg": self._latency_sum / self.sent if self.sent else 0.0,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "latency_max": self._latency_max,
+        }
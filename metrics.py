@@ -0,0 +1,386 @@
+"""
+Metrics - Latenz-Histogramme, Gauges und Fehlerzähler mit Prometheus-Endpunkt
+
+Jeder instrumentierte Aufruf (Handler, Telegram-, Binance-, Claude- und SQLite-Aufrufe) wird
+mit Komponente und Operation erfasst:
+
+    ca3003bot_call_seconds{component, operation}         Latenz (Summary mit Quantilen)
+    ca3003bot_calls_in_flight{component, operation}      gerade laufende Aufrufe
+    ca3003bot_call_errors_total{component, operation}    Aufrufe, die mit einer Exception endeten
+
+Die Histogramme sind HDR-artig: pro Zweierpotenz 16 lineare Unter-Buckets über ganze
+Mikrosekunden, also höchstens ~6 % relativer Fehler bei konstantem Speicher und einer
+Aufzeichnung ohne Sortierung oder Allokation. Dazu kommen Gauges, die erst beim Abruf
+gelesen werden (z.B. Tiefe der Thread-Pool-Warteschlangen), und ein abschaltbarer
+Sampling-Profiler für den Produktivbetrieb.
+"""
+
+import functools
+import inspect
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable
+
+from aiohttp import web
+from telegram.request import HTTPXRequest
+
+# Unter-Buckets pro Zweierpotenz (2^SUB_BITS)
+SUB_BITS = 4
+SUB_COUNT = 1 << SUB_BITS
+# Bis 2^36 µs (~19 Stunden); größere Werte landen im letzten Bucket
+MAX_EXPONENT = 36 - SUB_BITS
+BUCKETS = SUB_COUNT * (MAX_EXPONENT + 2)
+
+# Quantile, die als Prometheus-Summary exportiert werden
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+PREFIX = "ca3003bot_"
+
+
+def _bucket(micros: int) -> int:
+    """Index des Buckets eines Werts in Mikrosekunden."""
+    if micros < SUB_COUNT:
+        return micros
+    exponent = micros.bit_length() - SUB_BITS - 1
+    if exponent > MAX_EXPONENT:
+        return BUCKETS - 1
+    return SUB_COUNT * (exponent + 1) + (micros >> exponent) - SUB_COUNT
+
+
+def _bucket_value(index: int) -> float:
+    """Mittelpunkt eines Buckets in Mikrosekunden."""
+    if index < SUB_COUNT:
+        return float(index)
+    exponent = index // SUB_COUNT - 1
+    lower = (index % SUB_COUNT + SUB_COUNT) << exponent
+    return lower + ((1 << exponent) - 1) / 2
+
+
+class Histogram:
+    """Latenz-Histogramm mit logarithmisch-linearen Buckets (HDR-Schema)."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Zeichnet eine Dauer in Sekunden auf."""
+        self.counts[_bucket(int(seconds * 1_000_000))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Gibt das q-Quantil in Sekunden zurück (0.0 ohne Werte)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_bucket_value(index) / 1_000_000, self.max)
+        return self.max
+
+
+def _format_labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metrics:
+    """Sammlung aller Metriken eines Prozesses."""
+
+    def __init__(self):
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._gauges: dict[str, dict[tuple, float]] = {}
+        # Name -> (Typ, Funktion, die beim Abruf {Labels: Wert} liefert)
+        self._callbacks: dict[str, tuple[str, Callable[[], dict[tuple, float] | float]]] = {}
+        self._help: dict[str, str] = {}
+        self.profiler = SamplingProfiler()
+
+    def describe(self, name: str, help_text: str) -> None:
+        """Setzt den HELP-Text einer Metrik."""
+        self._help[name] = help_text
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        """Gibt das Histogramm mit diesen Labels zurück und legt es bei Bedarf an."""
+        series = self._histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        return histogram
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        """Erhöht einen Zähler."""
+        series = self._counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0.0) + value
+
+    def gauge_add(self, name: str, delta: float, **labels) -> None:
+        """Verändert einen Gauge um delta (z.B. laufende Aufrufe)."""
+        series = self._gauges.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0.0) + delta
+
+    def register_gauge(self, name: str, callback: Callable[[], dict[tuple, float] | float], help_text: str = "") -> None:
+        """
+        Registriert einen Gauge, dessen Wert erst beim Abruf gelesen wird.
+
+        Args:
+            name (str): Der Name der Metrik (ohne Präfix).
+            callback (Callable): Liefert einen Wert oder {((label, wert), ...): wert}.
+            help_text (str): Der HELP-Text.
+        """
+        self._callbacks[name] = ("gauge", callback)
+        if help_text:
+            self._help[name] = help_text
+
+    def register_counter(self, name: str, callback: Callable[[], dict[tuple, float] | float], help_text: str = "") -> None:
+        """
+        Registriert einen Zähler, dessen Stand ein anderes Objekt führt und der erst beim Abruf gelesen wird.
+
+        Args:
+            name (str): Der Name der Metrik (ohne Präfix, mit Endung '_total').
+            callback (Callable): Liefert einen monoton steigenden Wert oder {((label, wert), ...): wert}.
+            help_text (str): Der HELP-Text.
+        """
+        self._callbacks[name] = ("counter", callback)
+        if help_text:
+            self._help[name] = help_text
+
+    def instrument(self, func: Callable, component: str, operation: str | None = None) -> Callable:
+        """
+        Umhüllt eine Coroutine- oder Async-Generator-Funktion mit Latenz, In-Flight-Gauge und Fehlerzähler.
+
+        Args:
+            func (Callable): Die Funktion.
+            component (str): Die Komponente, z.B. 'binance' oder 'handler'.
+            operation (str | None): Der Name der Operation. Standard: der Funktionsname.
+
+        Returns:
+            Callable: Die instrumentierte Funktion.
+        """
+        operation = operation or func.__name__
+        histogram = self.histogram("call_seconds", component=component, operation=operation)
+        gauges = self._gauges.setdefault("calls_in_flight", {})
+        gauge_key = (("component", component), ("operation", operation))
+        gauges.setdefault(gauge_key, 0.0)
+        errors = self._counters.setdefault("call_errors_total", {})
+        errors.setdefault(gauge_key, 0.0)
+        clock = time.perf_counter
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def generator_wrapper(*args, **kwargs):
+                gauges[gauge_key] += 1
+                started = clock()
+                try:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                except Exception:
+                    errors[gauge_key] += 1
+                    raise
+                finally:
+                    gauges[gauge_key] -= 1
+                    histogram.record(clock() - started)
+
+            return generator_wrapper
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            gauges[gauge_key] += 1
+            started = clock()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors[gauge_key] += 1
+                raise
+            finally:
+                gauges[gauge_key] -= 1
+                histogram.record(clock() - started)
+
+        return wrapper
+
+    def instrument_object(self, obj, component: str, include: tuple[str, ...] = (),
+                          exclude: tuple[str, ...] = ("close",)):
+        """
+        Instrumentiert alle öffentlichen asynchronen Methoden eines Objekts (auf der Instanz).
+
+        Args:
+            obj: Das Objekt, z.B. eine UserDatabase.
+            component (str): Die Komponente für die Labels.
+            include (tuple[str, ...]): Zusätzliche (private) Methoden.
+            exclude (tuple[str, ...]): Methoden, die nicht instrumentiert werden.
+
+        Returns:
+            Das Objekt.
+        """
+        for name, method in inspect.getmembers(type(obj), predicate=inspect.isfunction):
+            if name in exclude or (name.startswith("_") and name not in include):
+                continue
+            if inspect.iscoroutinefunction(method) or inspect.isasyncgenfunction(method):
+                setattr(obj, name, self.instrument(getattr(obj, name), component, name))
+        return obj
+
+    def render(self) -> str:
+        """Gibt alle Metriken im Prometheus-Textformat zurück."""
+        lines = []
+
+        def header(name: str, kind: str) -> None:
+            if name in self._help:
+                lines.append(f"# HELP {PREFIX}{name} {self._help[name]}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        for name, series in self._histograms.items():
+            header(name, "summary")
+            for labels, histogram in series.items():
+                for q in QUANTILES:
+                    quantile = f'quantile="{q}"'
+                    # Ohne Messwerte ist ein Quantil undefiniert (wie bei den Prometheus-Clients)
+                    value = f"{histogram.quantile(q):.6f}" if histogram.count else "NaN"
+                    lines.append(f"{PREFIX}{name}{_format_labels(labels, quantile)} {value}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {histogram.total:.6f}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {histogram.count}")
+        for name, series in self._counters.items():
+            header(name, "counter")
+            for labels, value in series.items():
+                lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value:g}")
+        for name, series in self._gauges.items():
+            header(name, "gauge")
+            for labels, value in series.items():
+                lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value:g}")
+        for name, (kind, callback) in self._callbacks.items():
+            try:
+                values = callback()
+            except Exception as e:
+                print(f"Metrics: {kind.capitalize()} {name} konnte nicht gelesen werden: {e}")
+                continue
+            header(name, kind)
+            if not isinstance(values, dict):
+                values = {(): values}
+            for labels, value in values.items():
+                lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def routes(self) -> list[web.RouteDef]:
+        """Endpunkte: GET /metrics, GET /profile, POST /profile/start und POST /profile/stop."""
+        return [
+            web.get("/metrics", self._handle_metrics),
+            web.get("/profile", self._handle_profile),
+            web.post("/profile/start", self._handle_profile_start),
+            web.post("/profile/stop", self._handle_profile_stop),
+        ]
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def _handle_profile(self, request: web.Request) -> web.Response:
+        limit = int(request.query.get("limit", "200"))
+        return web.Response(text=self.profiler.report(limit))
+
+    async def _handle_profile_start(self, request: web.Request) -> web.Response:
+        self.profiler.start(float(request.query.get("interval", self.profiler.interval)))
+        return web.Response(text="Profiler gestartet\n")
+
+    async def _handle_profile_stop(self, request: web.Request) -> web.Response:
+        self.profiler.stop()
+        return web.Response(text="Profiler gestoppt\n")
+
+
+class SamplingProfiler:
+    """
+    Stichproben-Profiler für den Event-Loop-Thread.
+
+    Ein Hintergrund-Thread liest in festen Abständen den Stack des beobachteten Threads und zählt
+    die Stacks im Collapsed-Format (für Flamegraphs). Ausgeschaltet kostet er nichts.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        """
+        Initialisiert den SamplingProfiler.
+
+        Args:
+            interval (float): Abstand der Stichproben in Sekunden.
+            max_depth (int): Maximale Anzahl der Frames pro Stack.
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._target: int | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float | None = None, thread_id: int | None = None) -> None:
+        """Startet die Stichproben für thread_id (Standard: den aufrufenden Thread)."""
+        if self.running:
+            return
+        self.interval = interval or self.interval
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Beendet die Stichproben. Die gesammelten Stacks bleiben erhalten."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def report(self, limit: int = 200) -> str:
+        """Gibt die häufigsten Stacks im Collapsed-Format ('a;b;c anzahl') zurück."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common(limit))
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest, der die Latenz jedes Bot-API-Aufrufs pro Methode erfasst (component 'telegram')."""
+
+    def __init__(self, metrics: Metrics, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics
+        self._instrumented: dict[str, Callable] = {}
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        # Letztes Pfadsegment ist die Bot-API-Methode (ohne Token)
+        operation = url.rsplit("/", 1)[-1]
+        call = self._instrumented.get(operation)
+        if call is None:
+            call = self._instrumented[operation] = self.metrics.instrument(
+                super().do_request, "telegram", operation)
+        return await call(url, method, *args, **kwargs)
+
+
+# Gemeinsame Metriken des Prozesses
+METRICS = Metrics()
+METRICS.describe("call_seconds", "Latenz instrumentierter Aufrufe in Sekunden")
+METRICS.describe("calls_in_flight", "Gerade laufende Aufrufe")
+METRICS.describe("call_errors_total", "Aufrufe, die mit einer Exception endeten")
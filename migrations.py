@@ -0,0 +1,268 @@
+"""
+Migrations - Versionierte Schema-Migrationen für user_data.db
+
+Die Schema-Version steht in PRAGMA user_version. Jede Migration läuft in einer eigenen
+Transaktion (BEGIN IMMEDIATE) zusammen mit dem Hochsetzen der Version; starten mehrere
+Worker-Prozesse gleichzeitig, migriert der erste und die übrigen sehen danach die neue
+Version. Migrationen werden nie nachträglich geändert, nur neue angehängt.
+
+Benchmark (vorher/nachher auf einer Tabelle mit einer Million Benutzern):
+    python migrations.py --rows 1000000
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import tempfile
+import time
+
+import aiosqlite
+
+# (Version, Beschreibung, SQL-Statements)
+MIGRATIONS: list[tuple[int, str, tuple[str, ...]]] = [
+    (1, "Ausgangsschema", (
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            subscription_type TEXT,
+            subscription_start_date TEXT,
+            subscription_end_date TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_users_subscription ON users (subscription_type, subscription_end_date)",
+        """
+        CREATE TABLE IF NOT EXISTS price_alerts (
+            alert_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            symbol TEXT NOT NULL,
+            direction TEXT NOT NULL,
+            threshold REAL NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_price_alerts_user ON price_alerts (user_id)",
+    )),
+    # Abonnements als Stufe (Tier) und Unix-Zeit statt Text-Datum. subscription_expires ist der
+    # Beginn des Tages nach dem bisherigen Enddatum in lokaler Zeit ('+1 day', 'utc' im INSERT).
+    (2, "Typisierte Abonnementspalten", (
+        """
+        CREATE TABLE users_new (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            tier INTEGER NOT NULL DEFAULT 0,
+            subscription_start INTEGER,
+            subscription_expires INTEGER
+        )
+        """,
+        """
+        INSERT INTO users_new (user_id, username, tier, subscription_start, subscription_expires)
+        SELECT user_id, username,
+               CASE lower(subscription_type) WHEN 'basic' THEN 1 WHEN 'premium' THEN 2 WHEN 'vip' THEN 3 ELSE 0 END,
+               CAST(strftime('%s', subscription_start_date, 'utc') AS INTEGER),
+               CAST(strftime('%s', subscription_end_date, '+1 day', 'utc') AS INTEGER)
+        FROM users
+        """,
+        "DROP TABLE users",
+        "ALTER TABLE users_new RENAME TO users",
+        # Ablauf-Sweeps und das Laden aktiver Abonnements (user_id steckt als rowid im Index)
+        "CREATE INDEX idx_users_expiry ON users (subscription_expires, tier)",
+        # Empfänger pro Stufe für Broadcasts, in Ablaufreihenfolge
+        "CREATE INDEX idx_users_tier ON users (tier, subscription_expires)",
+    )),
+    (3, "Zahlungs-Ledger", (
+        """
+        CREATE TABLE payments (
+            payment_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            tier INTEGER NOT NULL,
+            duration_days INTEGER NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            currency TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            external_id TEXT NOT NULL UNIQUE,
+            created_at INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX idx_payments_user ON payments (user_id, created_at)",
+    )),
+    # Buchungen werden nie geändert oder gelöscht; Korrekturen sind neue Zeilen
+    (4, "Ledger nur anhängend", (
+        """
+        CREATE TRIGGER payments_no_update BEFORE UPDATE ON payments
+        BEGIN SELECT RAISE(ABORT, 'payments ist nur anhängend'); END
+        """,
+        """
+        CREATE TRIGGER payments_no_delete BEFORE DELETE ON payments
+        BEGIN SELECT RAISE(ABORT, 'payments ist nur anhängend'); END
+        """,
+    )),
+    # Rechnungen der Zahlungsanbieter; status: pending, paid, expired, failed
+    (5, "Offene Rechnungen", (
+        """
+        CREATE TABLE invoices (
+            invoice_id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            tier INTEGER NOT NULL,
+            duration_days INTEGER NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            currency TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            created_at INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL
+        )
+        """,
+        # Der Ablauf-Sweep liest nur offene Rechnungen
+        "CREATE INDEX idx_invoices_pending ON invoices (expires_at) WHERE status = 'pending'",
+    )),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+async def get_version(conn: aiosqlite.Connection) -> int:
+    """Gibt die aktuelle Schema-Version der Datenbank zurück."""
+    async with conn.execute("PRAGMA user_version") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def migrate(conn: aiosqlite.Connection, target: int = SCHEMA_VERSION) -> tuple[int, int]:
+    """
+    Bringt die Datenbank auf die Schema-Version target.
+
+    Args:
+        conn (aiosqlite.Connection): Die Schreib-Verbindung.
+        target (int): Die Ziel-Version (Standard: die neueste).
+
+    Returns:
+        tuple[int, int]: (Version vorher, Version nachher).
+    """
+    before = await get_version(conn)
+    for version, description, statements in MIGRATIONS:
+        if version > target:
+            break
+        if version <= before:
+            continue
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Ein anderer Prozess kann zwischen Prüfung und Sperre migriert haben
+            if await get_version(conn) >= version:
+                await conn.rollback()
+                continue
+            for sql in statements:
+                await conn.execute(sql)
+            await conn.execute(f"PRAGMA user_version = {version}")
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+        print(f"Datenbank: Migration {version} ({description}) angewendet.")
+    return before, await get_version(conn)
+
+
+async def _timed(conn: aiosqlite.Connection, sql: str, params: tuple, repeat: int, consume=None) -> float:
+    """Mittlere Dauer einer Abfrage in Millisekunden (inkl. Verarbeitung der Zeilen durch consume)."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        async with conn.execute(sql, params) as cursor:
+            rows = await cursor.fetchall()
+        if consume is not None:
+            consume(rows)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def benchmark(rows: int = 1_000_000, path: str | None = None) -> None:
+    """Vergleicht typische Abfragen vor und nach Migration 2 auf einer synthetischen Tabelle."""
+    path = path or os.path.join(tempfile.mkdtemp(prefix="ca3003bot-"), "benchmark.db")
+    conn = await aiosqlite.connect(path)
+    await conn.execute("PRAGMA journal_mode = WAL")
+    await conn.execute("PRAGMA synchronous = NORMAL")
+    await migrate(conn, target=1)
+
+    rng = random.Random(1)
+    today = datetime.date.today()
+    types = (None, "basic", "premium", "vip")
+
+    def user(user_id: int) -> tuple:
+        subscription_type = rng.choice(types)
+        if subscription_type is None:
+            return user_id, f"user{user_id}", None, None, None
+        start = today - datetime.timedelta(days=rng.randint(0, 400))
+        end = start + datetime.timedelta(days=rng.choice((30, 90, 365)))
+        return user_id, f"user{user_id}", subscription_type, start.isoformat(), end.isoformat()
+
+    print(f"Erzeuge {rows} Benutzer in {path}...")
+    for offset in range(0, rows, 100_000):
+        await conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+                               [user(i) for i in range(offset + 1, min(rows, offset + 100_000) + 1)])
+    await conn.commit()
+    await conn.execute("ANALYZE")
+
+    today_str = today.strftime('%Y-%m-%d')
+    now = int(time.time())
+    sample = [rng.randint(1, rows) for _ in range(2000)]
+
+    def parse_end_dates(result):
+        for _, _, end_date in result:
+            datetime.datetime.strptime(end_date, '%Y-%m-%d')
+
+    async def point_lookups(sql: str, parse: bool) -> float:
+        started = time.perf_counter()
+        for user_id in sample:
+            async with conn.execute(sql, (user_id,)) as cursor:
+                row = await cursor.fetchone()
+            if parse and row and row[0]:
+                _ = datetime.datetime.strptime(row[0], '%Y-%m-%d').date() >= today
+            elif not parse and row:
+                _ = row[0] is not None and row[0] > now
+        return (time.perf_counter() - started) / len(sample) * 1000
+
+    before = {
+        "Aktive Abonnements laden": await _timed(
+            conn, "SELECT user_id, subscription_type, subscription_end_date FROM users "
+                  "WHERE subscription_type IS NOT NULL AND subscription_end_date >= ?", (today_str,), 3,
+            parse_end_dates),
+        "Ablauf-Prüfung eines Benutzers": await point_lookups(
+            "SELECT subscription_end_date FROM users WHERE user_id = ?", True),
+        "Zählung der VIP-Abonnenten": await _timed(
+            conn, "SELECT COUNT(*) FROM users WHERE lower(subscription_type) = 'vip' "
+                  "AND subscription_end_date >= ?", (today_str,), 3),
+        "Heute ablaufende Abonnements": await _timed(
+            conn, "SELECT user_id FROM users WHERE subscription_end_date = ?", (today_str,), 20),
+    }
+
+    started = time.perf_counter()
+    await migrate(conn)
+    migration_seconds = time.perf_counter() - started
+    await conn.execute("ANALYZE")
+
+    tomorrow = int(datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time()).timestamp())
+    after = {
+        "Aktive Abonnements laden": await _timed(
+            conn, "SELECT user_id, tier, subscription_expires FROM users "
+                  "WHERE subscription_expires > ? AND tier > 0", (now,), 3),
+        "Ablauf-Prüfung eines Benutzers": await point_lookups(
+            "SELECT subscription_expires FROM users WHERE user_id = ?", False),
+        "Zählung der VIP-Abonnenten": await _timed(
+            conn, "SELECT COUNT(*) FROM users WHERE tier = 3 AND subscription_expires > ?", (now,), 3),
+        "Heute ablaufende Abonnements": await _timed(
+            conn, "SELECT user_id FROM users WHERE subscription_expires = ?", (tomorrow,), 20),
+    }
+    await conn.close()
+
+    print(f"Migration auf Version {SCHEMA_VERSION}: {migration_seconds:.2f}s für {rows} Zeilen\n")
+    print(f"{'Abfrage':<34}{'vorher (ms)':>14}{'nachher (ms)':>14}")
+    for name in before:
+        print(f"{name:<34}{before[name]:>14.3f}{after[name]:>14.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark der Schema-Migration von user_data.db")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Anzahl synthetischer Benutzer")
+    parser.add_argument("--path", default=None, help="Pfad der Benchmark-Datenbank (Standard: temporär)")
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.rows, args.path))
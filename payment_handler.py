@@ -1,86 +1,263 @@
+import argparse
+import asyncio
+import contextlib
 import datetime
+import io
+import os
+import tempfile
+import time
+import uuid
+from typing import Awaitable, Callable
 
 # Annahme: Die UserDatabase-Klasse ist in user_database.py definiert.
 # Dieser Import ist entscheidend, um den Fehler "Unresolved reference 'UserDatabase'" zu beheben.
 from user_database import UserDatabase
+from entitlement_cache import EntitlementCache, Tier
+from payment_providers import Confirmation, Invoice, PaymentProvider, new_invoice_id
 
 # Definition der Preise direkt in dieser Datei für die Demo.
 # In einer realen Anwendung würden Sie dies wahrscheinlich aus einer zentralen Konfigurationsdatei importieren
 # (z.B. from config import PRICES), um die Wartung zu erleichtern.
+# rate_limits: Aufrufe pro Stunde und Burst der teuren Befehle je Abonnement (siehe rate_limiter.py)
 PRICES = {
-    "basic": {"duration_days": 30, "price_usd": 10.00},
-    "premium": {"duration_days": 90, "price_usd": 25.00},
-    "vip": {"duration_days": 365, "price_usd": 80.00},
+    "basic": {"duration_days": 30, "price_usd": 10.00,
+              "rate_limits": {"analyze": (10, 2), "scan": (20, 3), "backtest": (5, 1)}},
+    "premium": {"duration_days": 90, "price_usd": 25.00,
+                "rate_limits": {"analyze": (30, 5), "scan": (60, 5), "backtest": (20, 3)}},
+    "vip": {"duration_days": 365, "price_usd": 80.00,
+            "rate_limits": {"analyze": (120, 10), "scan": (240, 10), "backtest": (60, 5)}},
 }
 
 
 class PaymentHandler:
-    def __init__(self, db: UserDatabase):
+    def __init__(self, db: UserDatabase, entitlements: EntitlementCache | None = None,
+                 providers: list[PaymentProvider] | None = None, invoice_ttl: int = 900,
+                 sweep_interval: float = 60.0):
         """
         Initialisiert den PaymentHandler mit einer Instanz der UserDatabase.
         Args:
             db (UserDatabase): Eine Instanz der UserDatabase zur Interaktion mit der Datenbank.
+            entitlements (EntitlementCache | None): Cache der aktiven Abonnements, der bei jeder
+                                                    Aktivierung aktualisiert wird.
+            providers (list[PaymentProvider] | None): Die Zahlungsanbieter. Ohne Anbieter werden
+                                                      Zahlungen simuliert (handle_payment).
+            invoice_ttl (int): Zeit in Sekunden, in der eine Rechnung bezahlt werden kann.
+            sweep_interval (float): Abstand in Sekunden, in dem abgelaufene Rechnungen geschlossen werden.
         """
         self.db = db
+        self.entitlements = entitlements if entitlements is not None else EntitlementCache()
+        self.providers: dict[str, PaymentProvider] = {provider.name: provider for provider in providers or []}
+        for provider in self.providers.values():
+            provider.on_confirmed = self.confirm
+        self.invoice_ttl = invoice_ttl
+        self.sweep_interval = sweep_interval
+        # Wird nach jeder bestätigten Zahlung aufgerufen, z.B. um den Benutzer zu benachrichtigen
+        self.on_activated: Callable[[Invoice, int], Awaitable[None]] | None = None
+        self._sweeper: asyncio.Task | None = None
+        self.expired_invoices = 0
 
-    async def handle_payment(self, user_id: int, subscription_type: str) -> bool:
+    def start(self) -> None:
+        """Startet den periodischen Ablauf-Sweep der offenen Rechnungen."""
+        if self.providers and self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        """Stoppt den Ablauf-Sweep und schließt die Verbindungen der Anbieter."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._sweeper
+            self._sweeper = None
+        for provider in self.providers.values():
+            await provider.close()
+
+    def routes(self) -> list:
+        """Gibt die Bestätigungs-Endpunkte aller Anbieter zurück (aiohttp RouteDefs)."""
+        return [route for provider in self.providers.values() for route in provider.routes()]
+
+    async def sweep_expired(self, now: int | None = None) -> int:
+        """
+        Schließt alle offenen Rechnungen, deren Frist verstrichen ist.
+
+        Returns:
+            int: Die Anzahl der abgelaufenen Rechnungen.
+        """
+        expired = await self.db.expire_invoices(int(time.time()) if now is None else now)
+        self.expired_invoices += expired
+        return expired
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep_expired()
+            except Exception as e:
+                print(f"Fehler beim Schließen abgelaufener Rechnungen: {e}")
+
+    async def create_invoice(self, user_id: int, chat_id: int, subscription_type: str,
+                             provider_name: str) -> tuple[Invoice, str | None] | None:
+        """
+        Legt eine offene Rechnung an und lässt sie vom Anbieter zustellen.
+
+        Kehrt zurück, sobald die Rechnung zugestellt ist; das Abonnement wird erst aktiviert,
+        wenn der Anbieter die Zahlung über confirm() bestätigt.
+
+        Args:
+            user_id (int): Die ID des Benutzers.
+            chat_id (int): Der Chat, in den der Anbieter die Rechnung zustellt.
+            subscription_type (str): Der Typ des Abonnements (z.B. "basic", "premium", "vip").
+            provider_name (str): Der Name des Anbieters, z.B. 'telegram' oder 'crypto'.
+
+        Returns:
+            tuple[Invoice, str | None] | None: Die Rechnung und ggf. die Zahlungs-URL,
+                                               oder None bei einem Fehler.
+        """
+        provider = self.providers.get(provider_name)
+        if subscription_type not in PRICES or provider is None:
+            print(f"Fehler: Ungültiger Abonnementtyp '{subscription_type}' oder Anbieter '{provider_name}'")
+            return None
+
+        price = PRICES[subscription_type]
+        now = int(time.time())
+        invoice = Invoice(
+            invoice_id=new_invoice_id(user_id),
+            user_id=user_id,
+            chat_id=chat_id,
+            tier=Tier.from_name(subscription_type),
+            duration_days=price["duration_days"],
+            amount_cents=round(price["price_usd"] * 100),
+            currency="USD",
+            provider=provider.name,
+            status="pending",
+            expires_at=now + self.invoice_ttl
+        )
+        await self.db.add_invoice(invoice.invoice_id, user_id, chat_id, invoice.tier, invoice.duration_days,
+                                  invoice.amount_cents, invoice.currency, invoice.provider, now, invoice.expires_at)
+        title = f"CA3003BOT {subscription_type.capitalize()}"
+        description = f"{subscription_type.capitalize()}-Abonnement für {invoice.duration_days} Tage"
+        try:
+            pay_url = await provider.create_invoice(invoice, title, description)
+        except Exception as e:
+            print(f"Fehler beim Erstellen der Rechnung bei {provider.name} für Benutzer {user_id}: {e}")
+            await self.db.set_invoice_status(invoice.invoice_id, "failed")
+            return None
+        return invoice, pay_url
+
+    async def get_invoice(self, invoice_id: str) -> Invoice | None:
+        """Ruft eine Rechnung aus der Datenbank ab."""
+        row = await self.db.get_invoice(invoice_id)
+        return Invoice(*row) if row else None
+
+    async def is_payable(self, invoice_id: str) -> bool:
+        """Prüft (z.B. beim Pre-Checkout), ob eine Rechnung noch bezahlt werden kann."""
+        invoice = await self.get_invoice(invoice_id)
+        # Abgelaufene Rechnungen schließt der Sweep; hier genügt der Status
+        return invoice is not None and invoice.status == "pending"
+
+    async def confirm(self, confirmation: Confirmation) -> bool:
+        """
+        Verbucht eine vom Anbieter bestätigte Zahlung und aktiviert das Abonnement.
+
+        Wiederholte Bestätigungen derselben Zahlung (gleiche external_id) werden nur einmal angerechnet.
+
+        Args:
+            confirmation (Confirmation): Die Bestätigung des Anbieters.
+
+        Returns:
+            bool: True, wenn die Zahlung verbucht ist (auch bei Wiederholung), andernfalls False.
+        """
+        invoice = await self.get_invoice(confirmation.invoice_id)
+        if invoice is None or invoice.provider != confirmation.provider:
+            print(f"Fehler: Bestätigung für unbekannte Rechnung {confirmation.invoice_id} von {confirmation.provider}")
+            return False
+        if confirmation.currency.upper() != invoice.currency or confirmation.amount_cents < invoice.amount_cents:
+            print(f"Fehler: Betrag {confirmation.amount_cents} {confirmation.currency} passt nicht zu Rechnung "
+                  f"{invoice.invoice_id} ({invoice.amount_cents} {invoice.currency})")
+            return False
+        if invoice.status == "expired":
+            # Der Anbieter hat die Zahlung trotzdem angenommen: das Geld ist da, also anrechnen
+            print(f"Warnung: Zahlung für abgelaufene Rechnung {invoice.invoice_id} wird angerechnet")
+
+        result = await self.db.apply_payment(
+            user_id=invoice.user_id,
+            username=None,
+            tier=invoice.tier,
+            duration_days=invoice.duration_days,
+            amount_cents=confirmation.amount_cents,
+            currency=invoice.currency,
+            provider=invoice.provider,
+            external_id=f"{confirmation.provider}:{confirmation.external_id}",
+            now=int(time.time()),
+            invoice_id=invoice.invoice_id
+        )
+        if result is None:
+            return True
+        new_tier, new_expires = result
+        self.entitlements.set(invoice.user_id, Tier(new_tier), new_expires)
+        print(f"Benutzer {invoice.user_id} hat {Tier(invoice.tier).name.lower()} über {invoice.provider} "
+              f"abonniert bis {datetime.date.fromtimestamp(new_expires - 1)}")
+        if self.on_activated is not None:
+            try:
+                await self.on_activated(invoice, new_expires)
+            except Exception as e:
+                print(f"Fehler bei der Benachrichtigung über Zahlung {invoice.invoice_id}: {e}")
+        return True
+
+    async def handle_payment(self, user_id: int, subscription_type: str, idempotency_key: str | None = None,
+                             username: str | None = None) -> bool:
         """
         Verarbeitet den Zahlungsvorgang für das Abonnement eines Benutzers.
-        Aktualisiert das Abonnement des Benutzers in der Datenbank.
 
-        Diese Methode verwendet 'self.db' und sollte daher eine Instanzmethode sein (nicht statisch).
+        Buchung im Ledger und Verlängerung des Abonnements erfolgen in einer Transaktion
+        (UserDatabase.apply_payment). Wird dieselbe Zahlung erneut zugestellt, z.B. weil Telegram
+        ein Update wiederholt, erkennt der Idempotenzschlüssel sie und nichts wird doppelt angerechnet.
 
         Args:
             user_id (int): Die ID des Benutzers.
             subscription_type (str): Der Typ des Abonnements (z.B. "basic", "premium", "vip").
+            idempotency_key (str | None): Eindeutiger Schlüssel der Zahlung, z.B. aus der ID der
+                                          Callback-Abfrage. None erzeugt einen neuen Schlüssel.
+            username (str | None): Der Benutzername, falls der Benutzer noch nicht existiert.
 
         Returns:
-            bool: True, wenn die Zahlung erfolgreich war und das Abonnement aktualisiert wurde,
-                  andernfalls False.
+            bool: True, wenn die Zahlung erfolgreich war und das Abonnement aktiv ist
+                  (auch bei bereits gebuchter Zahlung), andernfalls False.
         """
         if subscription_type not in PRICES:
             print(f"Fehler: Ungültiger Abonnementtyp '{subscription_type}'")
             return False
 
-        # Hier würde in einem realen Szenario die Integration mit einem Zahlungs-Gateway erfolgen.
-        # Für den Moment simulieren wir einen erfolgreichen Zahlungsvorgang.
+        # Ohne konfigurierten Anbieter (Entwicklung) wird ein erfolgreicher Zahlungsvorgang simuliert;
+        # echte Zahlungen laufen über create_invoice() und die Bestätigung des Anbieters (confirm()).
         payment_successful = True  # Simulation des Zahlungserfolgs
 
         if payment_successful:
-            duration_days = PRICES[subscription_type]["duration_days"]
-            current_date = datetime.date.today()
-
-            # Aktuelles Abonnement-Enddatum des Benutzers abrufen
-            user_data = await self.db.get_user(user_id)
-
-            if user_data and user_data.get('subscription_end_date'):
-                # Wenn der Benutzer bereits ein Abonnement hat, verlängern Sie es ab dem aktuellen Enddatum
-                # Sicherstellen, dass das Datum korrekt geparst wird, falls es None oder leer ist
-                try:
-                    current_end_date_str = user_data['subscription_end_date']
-                    if current_end_date_str:
-                        current_end_date = datetime.datetime.strptime(current_end_date_str, '%Y-%m-%d').date()
-                        # Wenn das aktuelle Enddatum in der Vergangenheit liegt, starten Sie das neue Abonnement ab heute
-                        if current_end_date < current_date:
-                            new_end_date = current_date + datetime.timedelta(days=duration_days)
-                        else:
-                            new_end_date = current_end_date + datetime.timedelta(days=duration_days)
-                    else:
-                        # Wenn das Enddatum leer ist, starten Sie ab heute
-                        new_end_date = current_date + datetime.timedelta(days=duration_days)
-                except (ValueError, TypeError):
-                    # Bei Fehlern beim Parsen des Datums, starten Sie ab heute
-                    new_end_date = current_date + datetime.timedelta(days=duration_days)
-            else:
-                # Wenn kein bestehendes Abonnement vorhanden ist, starten Sie ab heute
-                new_end_date = current_date + datetime.timedelta(days=duration_days)
-
-            await self.db.update_user_subscription(
-                user_id=user_id,
-                subscription_type=subscription_type,
-                subscription_end_date=new_end_date.strftime('%Y-%m-%d')
-            )
-            print(f"Benutzer {user_id} hat {subscription_type} abonniert bis {new_end_date}")
+            price = PRICES[subscription_type]
+            tier = Tier.from_name(subscription_type)
+            try:
+                result = await self.db.apply_payment(
+                    user_id=user_id,
+                    username=username,
+                    tier=tier,
+                    duration_days=price["duration_days"],
+                    amount_cents=round(price["price_usd"] * 100),
+                    currency="USD",
+                    provider="simulated",
+                    external_id=idempotency_key or f"local:{uuid.uuid4().hex}",
+                    now=int(time.time())
+                )
+            except Exception as e:
+                print(f"Fehler beim Buchen der Zahlung für Benutzer {user_id}: {e}")
+                return False
+
+            if result is None:
+                print(f"Zahlung {idempotency_key} für Benutzer {user_id} wurde bereits verarbeitet")
+                return True
+            # Cache erst nach dem Commit aktualisieren, damit er nie mehr als die Datenbank gewährt
+            new_tier, new_expires = result
+            self.entitlements.set(user_id, Tier(new_tier), new_expires)
+            end_date = datetime.date.fromtimestamp(new_expires - 1)
+            print(f"Benutzer {user_id} hat {subscription_type} abonniert bis {end_date}")
             return True
         else:
             print(f"Zahlung für Benutzer {user_id} für {subscription_type} fehlgeschlagen")
@@ -113,3 +290,70 @@ class PaymentHandler:
         """
         return PRICES.get(subscription_type, {}).get("price_usd")
 
+
+async def benchmark(payments: int = 2000, users: int = 50, concurrency: int = 500, duplicates: float = 0.2,
+                    path: str | None = None) -> None:
+    """
+    Lasttest: viele gleichzeitige Zahlungen weniger Benutzer, davon ein Teil als Wiederholung.
+
+    Prüft, dass keine Verlängerung verloren geht und keine Wiederholung doppelt angerechnet wird,
+    und misst den Durchsatz sowie die Anzahl der Commits.
+    """
+    path = path or os.path.join(tempfile.mkdtemp(prefix="ca3003bot-"), "payments.db")
+    db = UserDatabase(path)
+    await db.connect()
+    handler = PaymentHandler(db)
+
+    keys = [f"bench:{i}" for i in range(payments)]
+    # Wiederholte Zustellungen verwenden den Schlüssel einer früheren Zahlung
+    deliveries = [(i % users + 1, keys[i]) for i in range(payments)]
+    deliveries += [deliveries[i] for i in range(0, payments, max(1, round(1 / duplicates)))] if duplicates else []
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def pay(user_id: int, key: str):
+        async with semaphore:
+            started = time.perf_counter()
+            assert await handler.handle_payment(user_id, "basic", idempotency_key=key)
+            latencies.append(time.perf_counter() - started)
+
+    commits = db.commits
+    started = time.perf_counter()
+    # Die Meldung pro Zahlung würde die Messung dominieren
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(pay(user_id, key) for user_id, key in deliveries))
+    elapsed = time.perf_counter() - started
+    commits = db.commits - commits
+
+    # Erwartung: jede Zahlung eines Benutzers verlängert genau einmal um 30 Tage
+    per_user = payments // users
+    first_day = datetime.date.today() + datetime.timedelta(days=PRICES["basic"]["duration_days"] * per_user + 1)
+    expected = int(datetime.datetime.combine(first_day, datetime.time()).timestamp())
+    wrong = 0
+    for user_id in range(1, users + 1):
+        user = await db.get_user(user_id)
+        booked = await db.get_payments(user_id)
+        if user["subscription_expires"] != expected or len(booked) != per_user:
+            wrong += 1
+    await db.close()
+
+    latencies.sort()
+    print(f"{len(deliveries)} Zustellungen ({payments} Zahlungen, {len(deliveries) - payments} Wiederholungen), "
+          f"{users} Benutzer, {concurrency} gleichzeitig")
+    print(f"Durchsatz: {len(deliveries) / elapsed:.0f} Zahlungen/s, {commits} Commits "
+          f"({len(deliveries) / max(commits, 1):.1f} Zahlungen pro Commit)")
+    print(f"Latenz p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"Benutzer mit falschem Ablaufdatum oder Ledger: {wrong}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lasttest der Zahlungsverarbeitung")
+    parser.add_argument("--payments", type=int, default=2000, help="Anzahl verschiedener Zahlungen")
+    parser.add_argument("--users", type=int, default=50, help="Anzahl der Benutzer")
+    parser.add_argument("--concurrency", type=int, default=500, help="Gleichzeitige Zahlungen")
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Anteil wiederholter Zustellungen")
+    parser.add_argument("--path", default=None, help="Pfad der Test-Datenbank (Standard: temporär)")
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.payments, args.users, args.concurrency, args.duplicates, args.path))
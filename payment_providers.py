@@ -0,0 +1,369 @@
+"""
+Payment Providers - Anbindung von Zahlungsanbietern über Rechnungen und asynchrone Bestätigung
+
+Der Ablauf ist bei allen Anbietern gleich: PaymentHandler legt eine offene Rechnung an, der
+Anbieter stellt sie dem Benutzer zu (create_invoice kehrt sofort zurück) und meldet die Zahlung
+später über on_confirmed. Erst diese Bestätigung aktiviert das Abonnement.
+
+- TelegramPaymentsProvider: Rechnung per Bot.send_invoice, Bestätigung über die
+  successful_payment-Nachricht (Pre-Checkout prüft der Bot).
+- CryptoInvoiceProvider: Rechnung über eine HTTP-API, Bestätigung per signiertem Webhook.
+  Protokoll:
+    POST {api_url}/invoices  (Authorization: Bearer <api_key>)
+        {"order_id", "amount": "10.00", "currency", "callback_url", "expires_at"} -> {"id", "pay_url"}
+    POST callback_url  (X-Signature: hex(HMAC-SHA256(webhook_secret, body)))
+        {"id", "order_id", "status": "paid", "amount", "currency"}
+- FakeCryptoGateway: lokaler Server mit diesem Protokoll für Tests und Entwicklung
+  (python payment_providers.py startet ihn).
+"""
+
+import abc
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import secrets
+from decimal import Decimal
+from typing import Awaitable, Callable, NamedTuple
+from urllib.parse import urlparse
+
+import aiohttp
+from aiohttp import web
+from telegram import LabeledPrice, Message
+
+# Header mit der HMAC-Signatur des Webhook-Bodys
+SIGNATURE_HEADER = "X-Signature"
+
+
+class ConfirmationFailed(Exception):
+    """Eine Bestätigung konnte vorübergehend nicht verbucht werden; der Anbieter soll sie wiederholen."""
+
+
+class Invoice(NamedTuple):
+    """Eine Rechnung in der Reihenfolge der Spalten von invoices."""
+    invoice_id: str
+    user_id: int
+    chat_id: int
+    tier: int
+    duration_days: int
+    amount_cents: int
+    currency: str
+    provider: str
+    status: str
+    expires_at: int
+
+
+class Confirmation(NamedTuple):
+    """Die vom Anbieter gemeldete Zahlung einer Rechnung."""
+    invoice_id: str
+    provider: str
+    external_id: str
+    amount_cents: int
+    currency: str
+
+
+def new_invoice_id(user_id: int) -> str:
+    """Erzeugt eine Rechnungs-ID. Sie enthält die user_id, damit Bestätigungen ihrem Shard zugeordnet werden."""
+    return f"{user_id}-{secrets.token_hex(8)}"
+
+
+def invoice_user_id(invoice_id: str) -> int | None:
+    """Gibt die user_id einer mit new_invoice_id erzeugten Rechnungs-ID zurück."""
+    try:
+        return int(invoice_id.split("-", 1)[0])
+    except ValueError:
+        return None
+
+
+def sign(secret: str, body: bytes) -> str:
+    """Berechnet die HMAC-SHA256-Signatur eines Webhook-Bodys."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def to_cents(amount) -> int:
+    """Wandelt einen Betrag wie '10.00' ohne Rundungsfehler in Cent um."""
+    return int(Decimal(str(amount)) * 100)
+
+
+class PaymentProvider(abc.ABC):
+    """Basisklasse der Zahlungsanbieter."""
+
+    name = "base"
+
+    def __init__(self):
+        # Wird von PaymentHandler gesetzt und aktiviert das Abonnement
+        self.on_confirmed: Callable[[Confirmation], Awaitable[bool]] | None = None
+
+    @abc.abstractmethod
+    async def create_invoice(self, invoice: Invoice, title: str, description: str) -> str | None:
+        """
+        Stellt eine Rechnung zu, ohne auf die Zahlung zu warten.
+
+        Args:
+            invoice (Invoice): Die bereits gespeicherte, offene Rechnung.
+            title (str): Der Titel der Rechnung.
+            description (str): Die Beschreibung der Rechnung.
+
+        Returns:
+            str | None: Eine Zahlungs-URL für den Benutzer oder None, wenn der Anbieter die
+                        Rechnung selbst im Chat zustellt.
+        """
+
+    def routes(self) -> list[web.RouteDef]:
+        """Gibt die HTTP-Endpunkte des Anbieters für Bestätigungen zurück."""
+        return []
+
+    async def close(self) -> None:
+        """Gibt Verbindungen des Anbieters frei."""
+
+    async def confirm(self, confirmation: Confirmation) -> bool:
+        """
+        Meldet eine Zahlung an den PaymentHandler weiter.
+
+        Returns:
+            bool: True, wenn die Zahlung verbucht ist, False, wenn sie dauerhaft abgelehnt wurde
+                  (unbekannte Rechnung, falscher Betrag).
+
+        Raises:
+            ConfirmationFailed: Bei vorübergehenden Fehlern, z.B. wenn noch keine Verarbeitung registriert ist.
+        """
+        if self.on_confirmed is None:
+            raise ConfirmationFailed(f"Keine Verarbeitung für Bestätigungen von {self.name} registriert")
+        return await self.on_confirmed(confirmation)
+
+
+class TelegramPaymentsProvider(PaymentProvider):
+    """Zahlungen über Telegram Payments (Bot.send_invoice)."""
+
+    name = "telegram"
+
+    def __init__(self, provider_token: str, bot=None):
+        """
+        Initialisiert den TelegramPaymentsProvider.
+
+        Args:
+            provider_token (str): Das Token des bei @BotFather verbundenen Zahlungsanbieters.
+            bot (telegram.Bot | None): Der Bot, über den die Rechnungen gesendet werden. None übernimmt
+                                       CryptoScalpingBot den Bot seiner Application.
+        """
+        super().__init__()
+        self.provider_token = provider_token
+        self.bot = bot
+
+    async def create_invoice(self, invoice: Invoice, title: str, description: str) -> str | None:
+        await self.bot.send_invoice(
+            chat_id=invoice.chat_id,
+            title=title,
+            description=description,
+            payload=invoice.invoice_id,
+            provider_token=self.provider_token,
+            currency=invoice.currency,
+            prices=[LabeledPrice(title, invoice.amount_cents)]
+        )
+        return None
+
+    async def handle_successful_payment(self, message: Message) -> bool:
+        """Bestätigt die Zahlung aus einer successful_payment-Nachricht."""
+        payment = message.successful_payment
+        return await self.confirm(Confirmation(
+            invoice_id=payment.invoice_payload,
+            provider=self.name,
+            external_id=payment.telegram_payment_charge_id,
+            amount_cents=payment.total_amount,
+            currency=payment.currency
+        ))
+
+
+class CryptoInvoiceProvider(PaymentProvider):
+    """Krypto-Rechnungen über eine HTTP-API mit signiertem Bestätigungs-Webhook."""
+
+    name = "crypto"
+
+    def __init__(self, api_url: str, api_key: str, webhook_secret: str, callback_url: str,
+                 webhook_path: str | None = None, timeout: float = 10.0):
+        """
+        Initialisiert den CryptoInvoiceProvider.
+
+        Args:
+            api_url (str): Basis-URL der Rechnungs-API.
+            api_key (str): API-Schlüssel für das Anlegen von Rechnungen.
+            webhook_secret (str): Geheimnis, mit dem der Anbieter die Webhooks signiert.
+            callback_url (str): Öffentliche URL, unter der webhook_path erreichbar ist.
+            webhook_path (str | None): Pfad des Bestätigungs-Endpunkts. Standard: der Pfad von callback_url.
+            timeout (float): Timeout für Aufrufe der Rechnungs-API in Sekunden.
+        """
+        super().__init__()
+        self.api_url = api_url.rstrip("/")
+        self.api_key = api_key
+        self.webhook_secret = webhook_secret
+        self.callback_url = callback_url
+        self.webhook_path = webhook_path or urlparse(callback_url).path or "/payments/crypto"
+        self.timeout = timeout
+        self._session: aiohttp.ClientSession | None = None
+
+        # Zähler für die Überwachung des Webhooks
+        self.confirmations = 0
+        self.rejected = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def create_invoice(self, invoice: Invoice, title: str, description: str) -> str | None:
+        async with self._get_session().post(
+            f"{self.api_url}/invoices",
+            json={
+                "order_id": invoice.invoice_id,
+                "amount": f"{Decimal(invoice.amount_cents) / 100:.2f}",
+                "currency": invoice.currency,
+                "description": description,
+                "callback_url": self.callback_url,
+                "expires_at": invoice.expires_at,
+            },
+            headers={"Authorization": f"Bearer {self.api_key}"}
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return data["pay_url"]
+
+    def routes(self) -> list[web.RouteDef]:
+        return [web.post(self.webhook_path, self._handle_webhook)]
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _handle_webhook(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        if not hmac.compare_digest(request.headers.get(SIGNATURE_HEADER, ""), sign(self.webhook_secret, body)):
+            self.rejected += 1
+            return web.Response(status=403)
+        try:
+            data = json.loads(body)
+            if data.get("status") != "paid":
+                return web.Response()
+            confirmation = Confirmation(
+                invoice_id=data["order_id"],
+                provider=self.name,
+                external_id=str(data["id"]),
+                amount_cents=to_cents(data["amount"]),
+                currency=data["currency"]
+            )
+        except (ValueError, KeyError, ArithmeticError) as e:
+            self.rejected += 1
+            print(f"Zahlung: Ungültiger Webhook von {self.name}: {e}")
+            return web.Response(status=400)
+
+        self.confirmations += 1
+        # Fehler beim Verbuchen führen zu 500, damit der Anbieter den Webhook wiederholt;
+        # wiederholte Zustellungen sind über die external_id idempotent
+        try:
+            booked = await self.confirm(confirmation)
+        except Exception as e:
+            print(f"Zahlung: Bestätigung für Rechnung {confirmation.invoice_id} nicht verbucht: {e}")
+            return web.Response(status=500)
+        if not booked:
+            # Dauerhaft abgelehnt: eine Wiederholung würde nichts ändern
+            self.rejected += 1
+            return web.Response(status=422)
+        return web.Response()
+
+
+class FakeCryptoGateway:
+    """Lokaler Rechnungs-Server mit dem Protokoll von CryptoInvoiceProvider (für Tests und Entwicklung)."""
+
+    def __init__(self, api_key: str = "test-key", webhook_secret: str = "test-secret",
+                 listen: str = "127.0.0.1", port: int = 0):
+        """
+        Initialisiert den FakeCryptoGateway.
+
+        Args:
+            api_key (str): Erwarteter API-Schlüssel.
+            webhook_secret (str): Geheimnis für die Signatur der Webhooks.
+            listen (str): Die Adresse, auf der der Server lauscht.
+            port (int): Der Port (0 wählt einen freien Port).
+        """
+        self.api_key = api_key
+        self.webhook_secret = webhook_secret
+        self.listen = listen
+        self.port = port
+        # id -> Rechnung wie beim Anlegen übermittelt, zusätzlich 'status'
+        self.invoices: dict[str, dict] = {}
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.listen}:{self.port}"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/invoices", self._handle_create)
+        app.router.add_get("/pay/{invoice_id}", self._handle_pay)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.listen, self.port)
+        await site.start()
+        sockets = getattr(site._server, "sockets", None)
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def pay(self, invoice_id: str, deliveries: int = 1) -> int:
+        """
+        Markiert eine Rechnung als bezahlt und sendet den Webhook (mehrfach, um Wiederholungen zu simulieren).
+
+        Returns:
+            int: Der HTTP-Status der letzten Zustellung.
+        """
+        invoice = self.invoices[invoice_id]
+        invoice["status"] = "paid"
+        body = json.dumps({
+            "id": invoice_id, "order_id": invoice["order_id"], "status": "paid",
+            "amount": invoice["amount"], "currency": invoice["currency"],
+        }).encode()
+        status = 0
+        async with aiohttp.ClientSession() as session:
+            for _ in range(deliveries):
+                async with session.post(invoice["callback_url"], data=body, headers={
+                    SIGNATURE_HEADER: sign(self.webhook_secret, body), "Content-Type": "application/json",
+                }) as response:
+                    status = response.status
+        return status
+
+    async def _handle_create(self, request: web.Request) -> web.Response:
+        if request.headers.get("Authorization") != f"Bearer {self.api_key}":
+            return web.Response(status=401)
+        data = await request.json()
+        invoice_id = secrets.token_hex(8)
+        self.invoices[invoice_id] = dict(data, status="pending")
+        return web.json_response({"id": invoice_id, "pay_url": f"{self.url}/pay/{invoice_id}"})
+
+    async def _handle_pay(self, request: web.Request) -> web.Response:
+        invoice_id = request.match_info["invoice_id"]
+        if invoice_id not in self.invoices:
+            return web.Response(status=404)
+        status = await self.pay(invoice_id)
+        return web.Response(text=f"Rechnung {invoice_id} bezahlt (Webhook: HTTP {status})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler Krypto-Rechnungs-Server für Tests")
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--api-key", default="test-key")
+    parser.add_argument("--webhook-secret", default="test-secret")
+    args = parser.parse_args()
+
+    async def serve():
+        gateway = FakeCryptoGateway(args.api_key, args.webhook_secret, port=args.port)
+        await gateway.start()
+        print(f"FakeCryptoGateway lauscht auf {gateway.url}")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
@@ -0,0 +1,374 @@
+"""
+Price Alerts - Preisalarme mit sortiertem Schwellen-Index pro Symbol
+
+Pro Symbol liegen die Schwellen beider Richtungen in sortierten Listen. Ein Preis-Tick
+löst per Binärsuche genau die überschrittenen Alarme aus: O(log n + k) statt einer
+Schleife über alle Alarme. Die Listen sind so sortiert, dass ausgelöste Alarme immer am
+Ende liegen und ohne Verschieben der übrigen Einträge entfernt werden.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple
+
+from message_dispatcher import PRIORITY_NOTIFICATION, MessageDispatcher
+
+ABOVE = "above"
+BELOW = "below"
+
+
+class PriceAlert(NamedTuple):
+    alert_id: int
+    user_id: int
+    symbol: str
+    direction: str
+    threshold: float
+
+
+class SymbolAlerts:
+    """
+    Sortierte Schwellen eines Symbols.
+
+    'above'-Alarme werden absteigend (als negierte Werte aufsteigend), 'below'-Alarme
+    aufsteigend gespeichert. Bei einem Preis p lösen die 'above'-Alarme mit Schwelle <= p
+    und die 'below'-Alarme mit Schwelle >= p aus; beide bilden jeweils das Listenende.
+    """
+
+    __slots__ = ("_above_keys", "_above_ids", "_below_keys", "_below_ids")
+
+    def __init__(self):
+        self._above_keys: list[float] = []
+        self._above_ids: list[int] = []
+        self._below_keys: list[float] = []
+        self._below_ids: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._above_ids) + len(self._below_ids)
+
+    def _lists(self, direction: str, threshold: float) -> tuple[list[float], list[int], float]:
+        if direction == ABOVE:
+            return self._above_keys, self._above_ids, -threshold
+        return self._below_keys, self._below_ids, threshold
+
+    def add(self, alert_id: int, direction: str, threshold: float) -> None:
+        """Fügt einen Alarm an der sortierten Position ein."""
+        keys, ids, key = self._lists(direction, threshold)
+        position = bisect_right(keys, key)
+        keys.insert(position, key)
+        ids.insert(position, alert_id)
+
+    def remove(self, alert_id: int, direction: str, threshold: float) -> bool:
+        """Entfernt einen Alarm. Gibt False zurück, wenn er nicht (mehr) im Index ist."""
+        keys, ids, key = self._lists(direction, threshold)
+        for position in range(bisect_left(keys, key), bisect_right(keys, key)):
+            if ids[position] == alert_id:
+                del keys[position]
+                del ids[position]
+                return True
+        return False
+
+    def crossed(self, price: float) -> list[int]:
+        """Entfernt und liefert die IDs aller Alarme, die beim Preis price auslösen."""
+        fired = []
+        start = bisect_left(self._above_keys, -price)
+        if start < len(self._above_keys):
+            fired.extend(self._above_ids[start:])
+            del self._above_keys[start:], self._above_ids[start:]
+        start = bisect_left(self._below_keys, price)
+        if start < len(self._below_keys):
+            fired.extend(self._below_ids[start:])
+            del self._below_keys[start:], self._below_ids[start:]
+        return fired
+
+
+class AlertNotifier:
+    """
+    Bündelt Alarm-Benachrichtigungen pro Chat und übergibt sie dem MessageDispatcher.
+
+    Alle Alarme, die innerhalb von batch_window für denselben Chat anfallen, gehen als eine
+    Nachricht hinaus. Die Flood-Limits setzt der Dispatcher durch.
+    """
+
+    def __init__(self, dispatcher: MessageDispatcher, batch_window: float = 1.0):
+        """
+        Initialisiert den AlertNotifier.
+
+        Args:
+            dispatcher (MessageDispatcher): Der Dispatcher, über den gesendet wird.
+            batch_window (float): Zeitfenster in Sekunden, in dem Alarme pro Chat gebündelt werden.
+        """
+        self.dispatcher = dispatcher
+        self.batch_window = batch_window
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+        self.dropped = 0
+
+    def notify(self, chat_id: int, text: str) -> None:
+        """Reiht eine Benachrichtigung ein (ohne zu warten)."""
+        self._queue.put_nowait((chat_id, text))
+
+    def start(self) -> None:
+        """Startet die Bündelung im Hintergrund."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Übergibt noch wartende Benachrichtigungen an den Dispatcher und beendet die Bündelung."""
+        if self._task is not None:
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            await asyncio.sleep(self.batch_window)
+            batch = [item]
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            grouped: dict[int, list[str]] = {}
+            for chat_id, text in batch:
+                grouped.setdefault(chat_id, []).append(text)
+            for chat_id, texts in grouped.items():
+                future = self.dispatcher.submit(chat_id, "\n".join(texts)[:4096], PRIORITY_NOTIFICATION)
+                future.add_done_callback(self._count)
+
+    def _count(self, future: asyncio.Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            self.dropped += 1
+        else:
+            self.sent += 1
+
+
+class PriceAlertEngine:
+    """Verwaltet die Preisalarme aller Benutzer und prüft sie gegen eingehende Preise."""
+
+    def __init__(self, db, binance_client=None, notifier: AlertNotifier | None = None,
+                 poll_interval: float = 2.0, max_alerts_per_user: int = 20,
+                 shard: tuple[int, int] | None = None):
+        """
+        Initialisiert die PriceAlertEngine.
+
+        Args:
+            db (UserDatabase): Die Datenbank, in der die Alarme gespeichert werden.
+            binance_client (BinanceAPIClient | None): Liefert die Preise für die Abfrageschleife.
+            notifier (AlertNotifier | None): Versendet die Benachrichtigungen ausgelöster Alarme.
+            poll_interval (float): Abstand der Preisabfragen in Sekunden.
+            max_alerts_per_user (int): Maximale Anzahl aktiver Alarme pro Benutzer.
+            shard (tuple[int, int] | None): (index, workers) im Multi-Worker-Modus; es werden nur die
+                                            Alarme der Benutzer mit user_id % workers == index geladen.
+        """
+        self.db = db
+        self.binance_client = binance_client
+        self.notifier = notifier
+        self.poll_interval = poll_interval
+        self.max_alerts_per_user = max_alerts_per_user
+        self.shard = shard
+
+        self._index: dict[str, SymbolAlerts] = {}
+        self._alerts: dict[int, PriceAlert] = {}
+        self._user_counts: dict[int, int] = {}
+        self._fired_ids: list[int] = []
+        self._task: asyncio.Task | None = None
+
+        # Zähler für die Überwachung
+        self.ticks = 0
+        self.fired = 0
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def symbols(self) -> list[str]:
+        """Die Symbole, für die mindestens ein Alarm aktiv ist."""
+        return [symbol for symbol, alerts in self._index.items() if len(alerts)]
+
+    def _index_alert(self, alert: PriceAlert) -> None:
+        self._alerts[alert.alert_id] = alert
+        self._index.setdefault(alert.symbol, SymbolAlerts()).add(alert.alert_id, alert.direction, alert.threshold)
+        self._user_counts[alert.user_id] = self._user_counts.get(alert.user_id, 0) + 1
+
+    def _unindex_alert(self, alert: PriceAlert) -> None:
+        del self._alerts[alert.alert_id]
+        count = self._user_counts.get(alert.user_id, 1) - 1
+        if count:
+            self._user_counts[alert.user_id] = count
+        else:
+            self._user_counts.pop(alert.user_id, None)
+
+    async def load(self) -> int:
+        """
+        Baut den Index aus allen gespeicherten Alarmen auf.
+
+        Returns:
+            int: Die Anzahl der geladenen Alarme.
+        """
+        for alert_id, user_id, symbol, direction, threshold, _ in await self.db.get_all_price_alerts():
+            if self.shard is not None and user_id % self.shard[1] != self.shard[0]:
+                continue
+            self._index_alert(PriceAlert(alert_id, user_id, symbol, direction, threshold))
+        return len(self._alerts)
+
+    async def add(self, user_id: int, symbol: str, direction: str, threshold: float) -> PriceAlert | None:
+        """
+        Legt einen Alarm an und speichert ihn.
+
+        Args:
+            user_id (int): Die ID des Benutzers.
+            symbol (str): Das Handelspaar.
+            direction (str): ABOVE oder BELOW.
+            threshold (float): Die Preisschwelle.
+
+        Returns:
+            PriceAlert | None: Der Alarm oder None, wenn der Benutzer sein Limit erreicht hat.
+        """
+        if direction not in (ABOVE, BELOW):
+            raise ValueError(f"Unbekannte Richtung: {direction}")
+        if self._user_counts.get(user_id, 0) >= self.max_alerts_per_user:
+            return None
+        symbol = symbol.upper()
+        alert_id = await self.db.add_price_alert(user_id, symbol, direction, threshold, int(time.time()))
+        alert = PriceAlert(alert_id, user_id, symbol, direction, threshold)
+        self._index_alert(alert)
+        return alert
+
+    async def remove(self, user_id: int, alert_id: int) -> bool:
+        """
+        Löscht einen Alarm des Benutzers.
+
+        Returns:
+            bool: True, wenn der Alarm existierte und dem Benutzer gehörte.
+        """
+        alert = self._alerts.get(alert_id)
+        if alert is None or alert.user_id != user_id:
+            return False
+        self._index[alert.symbol].remove(alert_id, alert.direction, alert.threshold)
+        self._unindex_alert(alert)
+        await self.db.delete_price_alert(alert_id, user_id)
+        return True
+
+    def user_alerts(self, user_id: int) -> list[PriceAlert]:
+        """Die aktiven Alarme eines Benutzers, sortiert nach ID."""
+        if not self._user_counts.get(user_id):
+            return []
+        return sorted((a for a in self._alerts.values() if a.user_id == user_id), key=lambda a: a.alert_id)
+
+    def on_price(self, symbol: str, price: float) -> list[PriceAlert]:
+        """
+        Prüft einen Preis-Tick und löst alle überschrittenen Alarme aus.
+
+        Kann direkt als Listener des MarketDataStream registriert werden. Ausgelöste Alarme
+        werden sofort aus dem Index entfernt; Löschen in der Datenbank und Benachrichtigung
+        erfolgen gebündelt im Hintergrund.
+
+        Args:
+            symbol (str): Das Handelspaar.
+            price (float): Der aktuelle Preis.
+
+        Returns:
+            list[PriceAlert]: Die ausgelösten Alarme.
+        """
+        self.ticks += 1
+        alerts = self._index.get(symbol)
+        if alerts is None:
+            return []
+        fired_ids = alerts.crossed(price)
+        if not fired_ids:
+            return []
+
+        fired = []
+        for alert_id in fired_ids:
+            alert = self._alerts[alert_id]
+            self._unindex_alert(alert)
+            fired.append(alert)
+            if self.notifier is not None:
+                sign = "≥" if alert.direction == ABOVE else "≤"
+                self.notifier.notify(
+                    alert.user_id, f"🔔 {alert.symbol} {sign} {alert.threshold:g} (aktuell {price:g})")
+        self._fired_ids.extend(fired_ids)
+        self.fired += len(fired)
+        return fired
+
+    async def flush(self) -> None:
+        """Löscht die seit dem letzten Aufruf ausgelösten Alarme in einem Commit aus der Datenbank."""
+        if self._fired_ids:
+            alert_ids, self._fired_ids = self._fired_ids, []
+            await self.db.delete_price_alerts(alert_ids)
+
+    async def poll_once(self) -> None:
+        """Fragt die Preise aller Symbole mit aktiven Alarmen in einem Aufruf ab und prüft sie."""
+        symbols = self.symbols()
+        if self.binance_client is not None and symbols:
+            prices = await self.binance_client.get_prices(symbols)
+            for symbol, price in prices.items():
+                self.on_price(symbol, price)
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                print(f"Fehler bei der Prüfung der Preisalarme: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        """Startet die Abfrageschleife und den Versand im Hintergrund."""
+        if self.notifier is not None:
+            self.notifier.start()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Beendet die Abfrageschleife, speichert ausgelöste Alarme und versendet wartende Nachrichten."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self.notifier is not None:
+            await self.notifier.stop()
+
+
+def benchmark(n_alerts: int = 100_000, n_symbols: int = 50, n_ticks: int = 100_000) -> None:
+    """Misst die Auswertung pro Tick bei n_alerts aktiven Alarmen (ohne Datenbank)."""
+    import random
+
+    rng = random.Random(1)
+    engine = PriceAlertEngine(db=None)
+    symbols = [f"SYM{i}USDT" for i in range(n_symbols)]
+    prices = {symbol: 100.0 for symbol in symbols}
+    for alert_id in range(n_alerts):
+        symbol = rng.choice(symbols)
+        direction = rng.choice((ABOVE, BELOW))
+        offset = rng.uniform(0.01, 0.5)
+        threshold = 100.0 * (1 + offset if direction == ABOVE else 1 - offset)
+        engine._index_alert(PriceAlert(alert_id, alert_id % 5000, symbol, direction, threshold))
+
+    ticks = [(rng.choice(symbols), 0.0) for _ in range(n_ticks)]
+    for i, (symbol, _) in enumerate(ticks):
+        prices[symbol] *= 1 + rng.gauss(0, 0.001)
+        ticks[i] = (symbol, prices[symbol])
+
+    started = time.perf_counter()
+    for symbol, price in ticks:
+        engine.on_price(symbol, price)
+    elapsed = time.perf_counter() - started
+    print(f"{n_alerts} Alarme, {n_ticks} Ticks: {elapsed / n_ticks * 1e6:.2f} µs pro Tick, "
+          f"{engine.fired} ausgelöst, {len(engine)} aktiv")
+
+
+if __name__ == "__main__":
+    benchmark()
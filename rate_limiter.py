@@ -0,0 +1,132 @@
+"""
+Rate Limiter - Kontingente pro Benutzer und Abonnementstufe für teure Befehle
+
+Jeder Befehl (z.B. /analyze) hat pro Stufe ein Kontingent aus Rate und Burst, das nach dem
+Generic Cell Rate Algorithm (GCRA) geprüft wird: pro Benutzer wird nur der theoretische
+Ankunftszeitpunkt (TAT) als float gespeichert. Einträge, deren TAT in der Vergangenheit liegt,
+tragen keine Information mehr und werden periodisch entfernt.
+"""
+
+import time
+from typing import NamedTuple
+
+from entitlement_cache import Tier
+
+
+class Quota(NamedTuple):
+    """Kontingent eines Befehls: im Mittel ein Aufruf pro interval Sekunden, bis zu burst am Stück."""
+    interval: float
+    burst: int
+
+    @classmethod
+    def per_hour(cls, calls: int, burst: int) -> "Quota":
+        return cls(3600.0 / calls, burst)
+
+
+class Decision(NamedTuple):
+    """Ergebnis einer Prüfung."""
+    allowed: bool
+    retry_after: float
+    # Nur die erste Ablehnung eines Fensters wird dem Benutzer gemeldet
+    notify: bool
+
+
+ALLOWED = Decision(True, 0.0, False)
+
+
+def quotas_from_prices(prices: dict) -> dict[str, dict[Tier, Quota]]:
+    """
+    Liest die Kontingente aus den 'rate_limits' der Preisliste.
+
+    Args:
+        prices (dict): PRICES mit {"rate_limits": {befehl: (aufrufe_pro_stunde, burst)}} pro Abonnementtyp.
+
+    Returns:
+        dict[str, dict[Tier, Quota]]: Kontingente pro Befehl und Stufe.
+    """
+    quotas: dict[str, dict[Tier, Quota]] = {}
+    for subscription_type, price in prices.items():
+        for command, (calls, burst) in price.get("rate_limits", {}).items():
+            quotas.setdefault(command, {})[Tier.from_name(subscription_type)] = Quota.per_hour(calls, burst)
+    return quotas
+
+
+class RateLimiter:
+    """GCRA-Limiter mit einem TAT pro Benutzer und Befehl."""
+
+    def __init__(self, quotas: dict[str, dict[Tier, Quota]], compact_interval: float = 60.0):
+        """
+        Initialisiert den RateLimiter.
+
+        Args:
+            quotas (dict[str, dict[Tier, Quota]]): Kontingente pro Befehl und Stufe. Stufen ohne
+                                                   Kontingent werden nicht begrenzt.
+            compact_interval (float): Abstand in Sekunden, in dem verfallene Einträge entfernt werden.
+        """
+        self.quotas = quotas
+        self.compact_interval = compact_interval
+        self._tats: dict[str, dict[int, float]] = {command: {} for command in quotas}
+        # Ende des Fensters, für das eine Ablehnung bereits gemeldet wurde
+        self._notified: dict[str, dict[int, float]] = {command: {} for command in quotas}
+        self._next_compaction = time.monotonic() + compact_interval
+
+        # Zähler für die Überwachung
+        self.allowed = 0
+        self.rejected = 0
+
+    def acquire(self, command: str, user_id: int, tier: Tier, now: float | None = None) -> Decision:
+        """
+        Prüft einen Aufruf und verbucht ihn, wenn er erlaubt ist.
+
+        Args:
+            command (str): Der Befehl, z.B. 'analyze'.
+            user_id (int): Die ID des Benutzers.
+            tier (Tier): Die aktive Stufe des Benutzers.
+            now (float | None): Zeitpunkt (time.monotonic); None verwendet die aktuelle Zeit.
+
+        Returns:
+            Decision: Ob der Aufruf erlaubt ist und wann frühestens der nächste erlaubt wäre.
+        """
+        quota = self.quotas.get(command, {}).get(tier)
+        if quota is None:
+            return ALLOWED
+        now = time.monotonic() if now is None else now
+        if now >= self._next_compaction:
+            self.compact(now)
+
+        tats = self._tats[command]
+        tat = max(tats.get(user_id, now), now)
+        # Erlaubt, solange der TAT höchstens (burst - 1) Intervalle in der Zukunft liegt
+        allow_at = tat - quota.interval * (quota.burst - 1)
+        if now < allow_at:
+            self.rejected += 1
+            retry_after = allow_at - now
+            notified = self._notified[command]
+            notify = notified.get(user_id, 0.0) <= now
+            if notify:
+                notified[user_id] = allow_at
+            return Decision(False, retry_after, notify)
+
+        tats[user_id] = tat + quota.interval
+        self.allowed += 1
+        return ALLOWED
+
+    def compact(self, now: float | None = None) -> int:
+        """
+        Entfernt alle Einträge, deren TAT bzw. Meldefenster abgelaufen ist.
+
+        Returns:
+            int: Die Anzahl der entfernten Einträge.
+        """
+        now = time.monotonic() if now is None else now
+        removed = 0
+        for table in (*self._tats.values(), *self._notified.values()):
+            expired = [user_id for user_id, until in table.items() if until <= now]
+            for user_id in expired:
+                del table[user_id]
+            removed += len(expired)
+        self._next_compaction = now + self.compact_interval
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(table) for table in self._tats.values())
@@ -0,0 +1,320 @@
+"""
+Resampler - Höhere Zeitrahmen aus einer einzigen 1m-Kline-Reihe
+
+Statt pro Intervall eigene Klines bei Binance abzurufen, werden 3m, 5m, 15m, 1h usw. lokal aus
+dem 1m-Ringpuffer eines KlineStore abgeleitet, einschließlich der noch laufenden Kerze:
+
+- resample() aggregiert ein ganzes 1m-Fenster vektorisiert (np.*.reduceat über die Bucket-Grenzen),
+  z.B. nach dem Auffüllen über REST.
+- Resampler.on_kline() rollt jede 1m-Aktualisierung inkrementell in die laufende Kerze jedes
+  abgeleiteten Intervalls ein. Geschlossene Minuten werden einmal zusammengefasst; nur die
+  laufende Minute wird bei jeder Aktualisierung neu kombiniert.
+
+Eine abgeleitete Kerze wird nur geschrieben und ausgeliefert, wenn alle Minuten ihres Buckets
+vorliegen. Andernfalls (z.B. '1d' mit mehr Minuten als der 1m-Puffer fasst) bleibt es beim
+REST-Abruf, bis ein Bucket vollständig im Stream beginnt.
+"""
+
+import time
+
+import numpy as np
+
+from kline_store import COLUMN_NAMES, KlineStore, interval_to_ms
+
+BASE_INTERVAL = "1m"
+BASE_MS = interval_to_ms(BASE_INTERVAL)
+
+# Standardmäßig abgeleitete Intervalle (bei 1000 Minuten im Puffer sofort vollständig)
+DEFAULT_INTERVALS = ("3m", "5m", "15m", "30m", "1h", "2h", "4h")
+
+# Binance richtet Intervalle an der Epoche aus, Wochen jedoch am Montag (1970-01-05)
+_WEEK_MS = interval_to_ms("1w")
+_WEEK_OFFSET_MS = 4 * interval_to_ms("1d")
+
+# Summierte Spalten einer Kerze
+_SUM_COLUMNS = ("volume", "quote_volume", "trades", "taker_buy_base_volume", "taker_buy_quote_volume")
+
+
+def bucket_start(open_time, step: int):
+    """Öffnungszeit des Buckets, in den open_time (int oder np.ndarray, ms) bei Intervalllänge step fällt."""
+    offset = _WEEK_OFFSET_MS if step == _WEEK_MS else 0
+    return (open_time - offset) // step * step + offset
+
+
+def _check_interval(interval: str) -> int:
+    if interval.endswith("M"):
+        raise ValueError("Monatliche Klines sind nicht gleich lang und können nicht abgeleitet werden.")
+    step = interval_to_ms(interval)
+    if step <= BASE_MS or step % BASE_MS:
+        raise ValueError(f"Intervall '{interval}' ist kein Vielfaches von {BASE_INTERVAL}.")
+    return step
+
+
+def resample(window: dict[str, np.ndarray], interval: str) -> dict[str, np.ndarray]:
+    """
+    Aggregiert ein 1m-Fenster vektorisiert zu Candlesticks eines höheren Intervalls.
+
+    Fehlen einem Bucket Minuten (am Anfang des Fensters oder durch eine Lücke im 1m-Puffer),
+    werden er und alle älteren Buckets verworfen, sodass die abgeleitete Reihe lückenlos ist.
+    Der letzte Bucket darf unvollständig sein und ist dann die laufende Kerze; bis zu seiner
+    jüngsten Minute muss er ebenfalls lückenlos sein.
+
+    Args:
+        window (dict[str, np.ndarray]): Spalten der 1m-Candlesticks, älteste zuerst (z.B. KlineBuffer.window()).
+        interval (str): Das Zielintervall (z.B. '15m', '1h').
+
+    Returns:
+        dict[str, np.ndarray]: Die Spalten der abgeleiteten Candlesticks (siehe COLUMN_NAMES).
+    """
+    step = _check_interval(interval)
+    open_time = window["open_time"]
+    if not len(open_time):
+        return {name: window[name][:0].copy() for name in COLUMN_NAMES}
+    buckets = bucket_start(open_time, step)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+
+    # Minuten pro Bucket; der laufende letzte Bucket nur bis zu seiner jüngsten Minute
+    expected = np.full(len(starts), step // BASE_MS)
+    expected[-1] = (open_time[-1] - buckets[-1]) // BASE_MS + 1
+    incomplete = np.flatnonzero(np.diff(np.r_[starts, len(open_time)]) != expected)
+    if len(incomplete):
+        kept = starts[incomplete[-1] + 1:]
+        first = kept[0] if len(kept) else len(open_time)
+        window = {name: column[first:] for name, column in window.items()}
+        open_time, buckets, starts = open_time[first:], buckets[first:], kept - first
+        if not len(open_time):
+            return {name: window[name][:0].copy() for name in COLUMN_NAMES}
+
+    # Letzte Zeile jedes Buckets
+    ends = np.r_[starts[1:], len(open_time)] - 1
+    result = {
+        "open_time": buckets[starts],
+        "open": window["open"][starts],
+        "high": np.maximum.reduceat(window["high"], starts),
+        "low": np.minimum.reduceat(window["low"], starts),
+        "close": window["close"][ends],
+        "close_time": buckets[starts] + step - 1,
+    }
+    for name in _SUM_COLUMNS:
+        result[name] = np.add.reduceat(window[name], starts)
+    return {name: result[name] for name in COLUMN_NAMES}
+
+
+def _rows(columns: dict[str, np.ndarray]) -> list:
+    """Spalten -> Zeilen im Format von BinanceAPIClient.get_klines."""
+    return [list(row) + ["0"] for row in zip(*(columns[name].tolist() for name in COLUMN_NAMES))]
+
+
+class _RollUp:
+    """Laufende Kerze eines abgeleiteten Intervalls: geschlossene Minuten plus die laufende Minute."""
+
+    __slots__ = ("open_time", "close_time", "complete", "closed", "minute", "forming")
+
+    def __init__(self, open_time: int, step: int, closed: list | None, complete: bool):
+        self.open_time = open_time
+        self.close_time = open_time + step - 1
+        self.complete = complete
+        # [open, high, low, close, volume, quote_volume, trades, taker_base, taker_quote] oder None
+        self.closed = closed
+        self.minute: int | None = None
+        self.forming: tuple | None = None
+
+    def close_minute(self) -> None:
+        """Übernimmt die bisher laufende Minute in die geschlossenen Minuten."""
+        f = self.forming
+        if self.closed is None:
+            self.closed = [f[1], f[2], f[3], f[4], f[5], f[7], f[8], f[9], f[10]]
+            return
+        c = self.closed
+        c[1] = max(c[1], f[2])
+        c[2] = min(c[2], f[3])
+        c[3] = f[4]
+        c[4] += f[5]
+        c[5] += f[7]
+        c[6] += f[8]
+        c[7] += f[9]
+        c[8] += f[10]
+
+    def row(self) -> tuple:
+        """Die aktuelle Kerze im Spaltenlayout von KLINE_COLUMNS."""
+        f, c = self.forming, self.closed
+        if c is None:
+            return (self.open_time, f[1], f[2], f[3], f[4], f[5], self.close_time, f[7], f[8], f[9], f[10])
+        return (self.open_time, c[0], max(c[1], f[2]), min(c[2], f[3]), f[4], c[4] + f[5], self.close_time,
+                c[5] + f[7], c[6] + f[8], c[7] + f[9], c[8] + f[10])
+
+
+class Resampler:
+    """Hält die abgeleiteten Intervalle eines KlineStore aus dessen 1m-Reihen aktuell."""
+
+    def __init__(self, kline_store: KlineStore, intervals=DEFAULT_INTERVALS):
+        """
+        Initialisiert den Resampler.
+
+        Args:
+            kline_store (KlineStore): Der Speicher mit den 1m-Reihen; die abgeleiteten Candlesticks
+                                      landen in dessen Puffern der jeweiligen Intervalle.
+            intervals (Iterable[str]): Die abzuleitenden Intervalle (Vielfache von 1m, nicht '1M').
+        """
+        self.kline_store = kline_store
+        self.steps = {interval: _check_interval(interval) for interval in intervals}
+        self.intervals = tuple(self.steps)
+        self._rollups: dict[tuple[str, str], _RollUp] = {}
+
+        # Zähler für die Überwachung
+        self.local_hits = 0
+        self.misses = 0
+
+    def on_kline(self, symbol: str, kline: tuple) -> None:
+        """
+        Rollt eine 1m-Aktualisierung in die laufenden Kerzen aller abgeleiteten Intervalle ein.
+
+        Muss nach dem Schreiben in den 1m-Puffer aufgerufen werden.
+
+        Args:
+            symbol (str): Das Handelspaar.
+            kline (tuple): Der 1m-Candlestick im Binance-Format (Strings oder Zahlen).
+        """
+        symbol = symbol.upper()
+        values = (
+            int(kline[0]), float(kline[1]), float(kline[2]), float(kline[3]), float(kline[4]),
+            float(kline[5]), int(kline[6]), float(kline[7]), int(kline[8]), float(kline[9]),
+            float(kline[10]),
+        )
+        minute = values[0]
+        for interval, step in self.steps.items():
+            key = (symbol, interval)
+            rollup = self._rollups.get(key)
+            if rollup is None or not rollup.open_time <= minute <= rollup.close_time:
+                if rollup is not None and minute < rollup.open_time:
+                    continue  # Verspätete Aktualisierung einer älteren Kerze
+                rollup = self._rollups[key] = self._start(symbol, bucket_start(minute, step), step, minute)
+            elif minute != rollup.minute:
+                if minute < rollup.minute:
+                    continue
+                # Die vorherige Minute ist geschlossen
+                rollup.close_minute()
+            rollup.minute = minute
+            rollup.forming = values
+            if rollup.complete:
+                self.kline_store.buffer(symbol, interval).append(rollup.row())
+
+    def _start(self, symbol: str, open_time: int, step: int, minute: int) -> _RollUp:
+        """Beginnt eine Kerze und fasst bereits vorhandene Minuten des Buckets aus dem 1m-Puffer zusammen."""
+        closed = None
+        complete = minute == open_time
+        buf = self.kline_store.get(symbol, BASE_INTERVAL)
+        if not complete and buf is not None and len(buf):
+            times = buf.column("open_time")
+            lo, hi = np.searchsorted(times, (open_time, minute))
+            # Vollständig, wenn alle Minuten vom Beginn des Buckets bis vor die laufende vorliegen
+            complete = hi - lo == (minute - open_time) // BASE_MS and lo < len(times) and times[lo] == open_time
+            if complete:
+                column = {name: buf.column(name)[lo:hi] for name in COLUMN_NAMES}
+                closed = [float(column["open"][0]), float(column["high"].max()), float(column["low"].min()),
+                          float(column["close"][-1]), *(float(column[name].sum()) for name in _SUM_COLUMNS)]
+        return _RollUp(open_time, step, closed, complete)
+
+    def rebuild(self, symbol: str) -> None:
+        """
+        Leitet alle Intervalle eines Symbols vektorisiert aus dem gesamten 1m-Puffer neu ab.
+
+        Nach dem Auffüllen über REST oder einem Reconnect aufrufen. Liegt zwischen dem bisherigen
+        Puffer eines Intervalls und den neu abgeleiteten Kerzen eine Lücke, wird der Puffer ersetzt.
+        """
+        symbol = symbol.upper()
+        buf = self.kline_store.get(symbol, BASE_INTERVAL)
+        for interval, step in self.steps.items():
+            # Die laufende Kerze beginnt mit der nächsten Aktualisierung neu aus dem Puffer
+            self._rollups.pop((symbol, interval), None)
+            if buf is None or not len(buf):
+                continue
+            derived = resample(buf.window(), interval)
+            if not len(derived["open_time"]):
+                continue
+            target = self.kline_store.buffer(symbol, interval)
+            if target.last_open_time is not None and derived["open_time"][0] > target.last_open_time + step:
+                target = self.kline_store.replace(symbol, interval)
+            target.extend(_rows(derived))
+        if buf is not None and len(buf):
+            last = buf.window(1)
+            self.on_kline(symbol, tuple(last[name][0] for name in COLUMN_NAMES))
+
+    def get_klines(self, symbol: str, interval: str, limit: int) -> list | None:
+        """
+        Gibt die letzten Candlesticks eines abgeleiteten Intervalls zurück.
+
+        Args:
+            symbol (str): Das Handelspaar.
+            interval (str): Das abgeleitete Intervall.
+            limit (int): Die gewünschte Anzahl der Candlesticks.
+
+        Returns:
+            list | None: Candlesticks im Format von BinanceAPIClient.get_klines oder None, wenn die
+                         laufende Kerze unvollständig ist, der Puffer zu wenig Historie hat oder
+                         die letzten limit Kerzen nicht lückenlos aufeinander folgen.
+        """
+        rollup = self._rollups.get((symbol.upper(), interval))
+        buf = self.kline_store.get(symbol, interval)
+        if (rollup is None or not rollup.complete or buf is None or len(buf) < limit
+                or buf.last_open_time != rollup.open_time):
+            self.misses += 1
+            return None
+        if limit > 1:
+            times = buf.column("open_time", limit)
+            if times[-1] - times[0] != (limit - 1) * self.steps[interval]:
+                self.misses += 1
+                return None
+        self.local_hits += 1
+        return buf.to_rows(limit)
+
+
+def benchmark(minutes: int = 1000, intervals=DEFAULT_INTERVALS, limit: int = 50, updates: int = 100_000) -> None:
+    """Misst das vektorisierte Ableiten, die inkrementelle Aktualisierung und die lokale Antwort."""
+    rng = np.random.default_rng(1)
+    store = KlineStore(capacity=minutes)
+    start = bucket_start(int(time.time() * 1000), interval_to_ms("4h")) - minutes * BASE_MS
+    close = 100.0 + np.cumsum(rng.normal(0.0, 0.1, minutes))
+    store.ingest("BTCUSDT", BASE_INTERVAL, [
+        [start + i * BASE_MS, c, c + 0.05, c - 0.05, c, 1.0, start + (i + 1) * BASE_MS - 1, c, 3, 0.5, c / 2, "0"]
+        for i, c in enumerate(close)
+    ])
+    resampler = Resampler(store, intervals)
+    window = store.get("BTCUSDT", BASE_INTERVAL).window()
+
+    started = time.perf_counter()
+    for interval in intervals:
+        resample(window, interval)
+    vectorized = (time.perf_counter() - started) / len(intervals)
+    resampler.rebuild("BTCUSDT")
+
+    # Aktualisierungen im Stream-Takt: mehrere pro Minute, danach die nächste Minute
+    buf = store.get("BTCUSDT", BASE_INTERVAL)
+    minute = buf.last_open_time
+    price = float(close[-1])
+    started = time.perf_counter()
+    for i in range(updates):
+        if i % 30 == 0:
+            minute += BASE_MS
+        price += float(rng.normal(0.0, 0.1)) if i % 1000 == 0 else 0.01
+        kline = (minute, price, price + 0.05, price - 0.05, price, 1.0, minute + BASE_MS - 1, price, 3, 0.5, price / 2)
+        buf.append(kline)
+        resampler.on_kline("BTCUSDT", kline)
+    incremental = (time.perf_counter() - started) / updates
+
+    # Höhere Intervalle haben weniger Kerzen im Puffer
+    limits = {interval: min(limit, len(store.get("BTCUSDT", interval))) for interval in intervals}
+    started = time.perf_counter()
+    for _ in range(1000):
+        for interval in intervals:
+            assert resampler.get_klines("BTCUSDT", interval, limits[interval]) is not None
+    lookup = (time.perf_counter() - started) / (1000 * len(intervals))
+
+    print(f"{minutes} Minuten, Intervalle {', '.join(intervals)}")
+    print(f"Vektorisiert: {vectorized * 1e6:.0f} µs pro Intervall über das ganze Fenster")
+    print(f"Inkrementell: {incremental * 1e6:.1f} µs pro 1m-Aktualisierung (alle Intervalle)")
+    print(f"Lokale Antwort get_klines(limit={limit}): {lookup * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,256 @@
+"""
+Signal Scanner - Bewertet alle USDT-Paare nach der Qualität ihres Scalping-Setups
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import indicators
+from binance_api_client import BinanceAPIClient
+from kline_store import KlineStore
+
+# Reihenfolge der Spalten im Shared-Memory-Block
+_SCAN_COLUMNS = ("close", "high", "low", "volume")
+
+# Gewichtung der Teilsignale im Gesamtscore
+SCORE_WEIGHTS = {"rsi": 0.4, "breakout": 0.35, "volume": 0.25}
+
+# Mindestanzahl an Candlesticks für einen aussagekräftigen Score: das Volumenmittel braucht
+# 20 Vorgänger plus den aktuellen Candlestick, die Bollinger-Bänder 20 Schlusskurse.
+MIN_SCAN_CANDLES = 21
+
+
+def score_candles(close: np.ndarray, high: np.ndarray, low: np.ndarray, volume: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Berechnet die Teilsignale und den Gesamtscore für viele Symbole gleichzeitig.
+
+    Zeilen mit kürzerer Historie (führende NaN-Werte) werden ab ihrem ersten gültigen
+    Candlestick bewertet; sie müssen mindestens MIN_SCAN_CANDLES gültige Werte enthalten.
+
+    Args:
+        close, high, low, volume (np.ndarray): Arrays der Form (Symbole, Candlesticks).
+
+    Returns:
+        dict[str, np.ndarray]: Pro Kennzahl ein Array der Form (Symbole,).
+    """
+    rsi = indicators.rsi(close, 14)[:, -1]
+    _, upper, lower = indicators.bollinger_bands(close, 20, 2.0)
+    atr = indicators.atr(high, low, close, 14)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Abstand des Schlusskurses außerhalb der Bänder, gemessen in ATR
+        outside = np.maximum(close[:, -1] - upper[:, -1], lower[:, -1] - close[:, -1])
+        breakout = np.clip(outside / atr[:, -1], 0.0, 1.0)
+        # Volumen des letzten Candlesticks relativ zum Mittel der 20 davor
+        volume_ratio = volume[:, -1] / np.nanmean(volume[:, -21:-1], axis=1)
+
+    rsi_extreme = np.clip((np.abs(rsi - 50.0) - 20.0) / 30.0, 0.0, 1.0)
+    volume_spike = np.clip((volume_ratio - 1.0) / 3.0, 0.0, 1.0)
+    score = (
+        SCORE_WEIGHTS["rsi"] * np.nan_to_num(rsi_extreme)
+        + SCORE_WEIGHTS["breakout"] * np.nan_to_num(breakout)
+        + SCORE_WEIGHTS["volume"] * np.nan_to_num(volume_spike)
+    )
+    return {"score": score, "rsi": rsi, "breakout": np.nan_to_num(breakout), "volume_ratio": volume_ratio}
+
+
+def _score_shard(shm_name: str, shape: tuple, start: int, stop: int) -> dict[str, np.ndarray]:
+    """Bewertet die Zeilen [start, stop) eines Shared-Memory-Blocks in einem Worker-Prozess."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        result = score_candles(*(data[i, start:stop] for i in range(len(_SCAN_COLUMNS))))
+        del data
+        return result
+    finally:
+        shm.close()
+
+
+class SignalScanner:
+    """Verteilt die Bewertung des Symboluniversums auf einen ProcessPoolExecutor."""
+
+    def __init__(self, binance_client: BinanceAPIClient, interval: str = "1m", window: int = 100,
+                 max_workers: int | None = None, max_concurrent_fetches: int = 10):
+        """
+        Initialisiert den SignalScanner.
+
+        Args:
+            binance_client (BinanceAPIClient): Quelle der Candlesticks. Hat der Client noch keinen
+                                               KlineStore, wird einer angelegt.
+            interval (str): Das Zeitintervall der bewerteten Candlesticks.
+            window (int): Die Anzahl der Candlesticks pro Symbol.
+            max_workers (int | None): Anzahl der Worker-Prozesse (Standard: Anzahl der CPUs).
+            max_concurrent_fetches (int): Maximale Anzahl paralleler Kline-Abrufe.
+        """
+        self.binance_client = binance_client
+        if binance_client.kline_store is None:
+            binance_client.kline_store = KlineStore(capacity=max(window, 500))
+        self.interval = interval
+        self.window = window
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._fetch_semaphore = asyncio.Semaphore(max_concurrent_fetches)
+        self._executor: ProcessPoolExecutor | None = None
+        # Symbol -> (Fingerabdruck des letzten Candlesticks, Ergebnis der letzten Bewertung)
+        self._results: dict[str, tuple[tuple, dict]] = {}
+        self.last_scan_stats: dict = {}
+
+    @property
+    def kline_store(self) -> KlineStore:
+        return self.binance_client.kline_store
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def close(self) -> None:
+        """Beendet die Worker-Prozesse."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _fetch(self, symbol: str) -> None:
+        async with self._fetch_semaphore:
+            await self.binance_client.get_klines(symbol, self.interval, self.window)
+
+    def _fingerprint(self, symbol: str) -> tuple | None:
+        """Identifiziert den Stand des jüngsten Candlesticks, um unveränderte Symbole zu überspringen."""
+        buf = self.kline_store.get(symbol, self.interval)
+        if buf is None or len(buf) == 0:
+            return None
+        return (
+            buf.last_open_time,
+            float(buf.column("close", 1)[0]),
+            float(buf.column("volume", 1)[0]),
+        )
+
+    async def scan(self, symbols: list[str] | None = None, top: int = 10, fetch: bool = True) -> list[dict]:
+        """
+        Bewertet alle Symbole und gibt die besten Setups zurück.
+
+        Args:
+            symbols (list[str] | None): Die zu bewertenden Handelspaare. None scannt alle
+                                        handelbaren USDT-Paare.
+            top (int): Die Anzahl der zurückgegebenen Ergebnisse.
+            fetch (bool): Ob vorher aktuelle Klines abgerufen werden sollen.
+
+        Returns:
+            list[dict]: Die Ergebnisse absteigend nach 'score' sortiert. Symbole mit weniger als
+                        MIN_SCAN_CANDLES Candlesticks werden nicht bewertet und in
+                        last_scan_stats unter 'skipped' aufgeführt.
+        """
+        started = time.perf_counter()
+        if symbols is None:
+            symbols = await self.binance_client.get_usdt_symbols()
+        if fetch:
+            await asyncio.gather(*(self._fetch(symbol) for symbol in symbols))
+
+        changed = []
+        fingerprints = {}
+        skipped = []
+        for symbol in symbols:
+            buf = self.kline_store.get(symbol, self.interval)
+            if buf is None or len(buf) < MIN_SCAN_CANDLES:
+                skipped.append(symbol)
+                continue
+            fingerprint = self._fingerprint(symbol)
+            fingerprints[symbol] = fingerprint
+            cached = self._results.get(symbol)
+            if cached is None or cached[0] != fingerprint:
+                changed.append(symbol)
+
+        if changed:
+            scores = await self._score(changed)
+            for i, symbol in enumerate(changed):
+                result = {"symbol": symbol}
+                result.update({name: float(values[i]) for name, values in scores.items()})
+                self._results[symbol] = (fingerprints[symbol], result)
+
+        results = [self._results[symbol][1] for symbol in fingerprints]
+        results.sort(key=lambda r: r["score"], reverse=True)
+        self.last_scan_stats = {
+            "symbols": len(fingerprints),
+            "rescored": len(changed),
+            "skipped": skipped,
+            "seconds": time.perf_counter() - started,
+        }
+        return results[:top]
+
+    async def _score(self, symbols: list[str]) -> dict[str, np.ndarray]:
+        """Legt die Candlesticks in Shared Memory ab und bewertet sie verteilt auf die Worker."""
+        shape = (len(_SCAN_COLUMNS), len(symbols), self.window)
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+        try:
+            data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            for i, column in enumerate(_SCAN_COLUMNS):
+                data[i] = self.kline_store.matrix(symbols, self.interval, column, self.window)
+            del data
+
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            shard_size = -(-len(symbols) // self.max_workers)
+            shards = await asyncio.gather(*(
+                loop.run_in_executor(executor, _score_shard, shm.name, shape, start,
+                                     min(start + shard_size, len(symbols)))
+                for start in range(0, len(symbols), shard_size)
+            ))
+        finally:
+            shm.close()
+            shm.unlink()
+        return {name: np.concatenate([shard[name] for shard in shards]) for name in shards[0]}
+
+
+def _synthetic_kline_store(num_symbols: int, window: int, interval: str) -> tuple[KlineStore, list[str]]:
+    """Erzeugt einen KlineStore mit zufälligen Candlesticks für den Benchmark."""
+    rng = np.random.default_rng(42)
+    store = KlineStore(capacity=window)
+    symbols = [f"SYM{i}USDT" for i in range(num_symbols)]
+    for symbol in symbols:
+        close = 100.0 + np.cumsum(rng.normal(0.0, 0.5, window))
+        volume = rng.uniform(10.0, 100.0, window)
+        store.ingest(symbol, interval, [
+            [t * 60_000, c, c + 0.5, c - 0.5, c, v, t * 60_000 + 59_999, v * c, 10, v / 2, v * c / 2, "0"]
+            for t, (c, v) in enumerate(zip(close, volume))
+        ])
+    return store, symbols
+
+
+class _OfflineClient:
+    """Minimaler Ersatz für BinanceAPIClient, der nur einen vorbefüllten KlineStore bereitstellt."""
+
+    def __init__(self, kline_store: KlineStore):
+        self.kline_store = kline_store
+
+
+def benchmark(symbol_counts=(50, 100, 200, 400), window: int = 100, interval: str = "1m") -> None:
+    """
+    Misst die Scan-Latenz in Abhängigkeit von der Anzahl der Symbole.
+
+    Gemessen werden ein vollständiger Scan (alle Symbole neu bewertet) und ein inkrementeller
+    Scan ohne neue Candlesticks. Es werden keine Binance-Aufrufe durchgeführt.
+    """
+    async def run():
+        print(f"{'Symbole':>8} {'voll (ms)':>10} {'inkrementell (ms)':>18}")
+        for count in symbol_counts:
+            store, symbols = _synthetic_kline_store(count, window, interval)
+            scanner = SignalScanner(_OfflineClient(store), interval=interval, window=window)
+            try:
+                await scanner.scan(symbols[:1], fetch=False)  # Worker-Prozesse vorwärmen
+                scanner._results.clear()
+                await scanner.scan(symbols, fetch=False)
+                full = scanner.last_scan_stats["seconds"]
+                await scanner.scan(symbols, fetch=False)
+                incremental = scanner.last_scan_stats["seconds"]
+            finally:
+                scanner.close()
+            print(f"{count:>8} {full * 1000:>10.1f} {incremental * 1000:>18.2f}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,69 @@
+"""
+Startup - Zeitmessung des Kaltstarts pro Subsystem
+
+Importe und Initialisierungsschritte werden beim Start als Phasen erfasst und nach post_init
+als Bericht ausgegeben. Ein Import kostet nur beim ersten Mal Zeit; gemeinsame Abhängigkeiten
+(z.B. telegram) werden der Phase zugerechnet, die sie zuerst lädt. Das Modul verwendet nur die
+Standardbibliothek, damit es vor allen anderen geladen werden kann.
+"""
+
+import contextlib
+import importlib
+import sys
+import time
+
+# Zeitpunkt, ab dem gemessen wird (der Interpreterstart selbst ist nicht enthalten)
+_STARTED = time.perf_counter()
+
+
+class StartupReport:
+    """Sammelt die Dauer der Start-Phasen eines Prozesses."""
+
+    def __init__(self):
+        self.started = _STARTED
+        self.phases: list[tuple[str, float]] = []
+        self.ready_at: float | None = None
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Misst die Dauer des umschlossenen Blocks als Phase name."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def import_module(self, name: str, phase: str | None = None):
+        """
+        Importiert ein Modul und erfasst die Dauer, sofern es noch nicht geladen war.
+
+        Args:
+            name (str): Der Modulname, z.B. 'telegram.ext'.
+            phase (str | None): Name der Phase (Standard: 'import <name>').
+
+        Returns:
+            Das Modul.
+        """
+        if name in sys.modules:
+            return sys.modules[name]
+        with self.phase(phase or f"import {name}"):
+            return importlib.import_module(name)
+
+    def mark_ready(self) -> float:
+        """Markiert den Prozess als bereit und gibt die Zeit seit dem Start in Sekunden zurück."""
+        self.ready_at = time.perf_counter()
+        return self.ready_at - self.started
+
+    def format(self) -> str:
+        """Gibt den Bericht als Tabelle zurück, die teuersten Phasen zuerst."""
+        total = (self.ready_at or time.perf_counter()) - self.started
+        measured = sum(seconds for _, seconds in self.phases)
+        lines = [f"{'Phase':<40}{'ms':>10}{'Anteil':>9}"]
+        for name, seconds in sorted(self.phases, key=lambda phase: phase[1], reverse=True):
+            lines.append(f"{name:<40}{seconds * 1000:>10.1f}{seconds / total:>9.0%}")
+        lines.append(f"{'Sonstiges':<40}{(total - measured) * 1000:>10.1f}{(total - measured) / total:>9.0%}")
+        lines.append(f"{'Gesamt bis bereit':<40}{total * 1000:>10.1f}")
+        return "\n".join(lines)
+
+
+STARTUP = StartupReport()
@@ -0,0 +1,78 @@
+"""Tests für ClaudeAPI.analyze gegen die lokale Messages API aus load_test.py."""
+
+import asyncio
+import time
+
+import pytest
+
+from claude_api import ClaudeAPI
+from load_test import StubServer, fake_anthropic
+
+PROMPT = "Analysiere:\n{snapshot}"
+CHUNKS = 8
+
+
+@pytest.fixture
+def anthropic_url():
+    server = StubServer(fake_anthropic(latency=0.2, chunks=CHUNKS))
+    yield server.start()
+    server.stop()
+
+
+def run(anthropic_url: str, scenario):
+    async def main():
+        claude = ClaudeAPI("test-key", base_url=anthropic_url)
+        try:
+            await scenario(claude)
+        finally:
+            await claude.close()
+
+    asyncio.run(main())
+
+
+def test_concurrent_calls_share_one_completion_and_reuse_it_until_expiry(anthropic_url):
+    async def scenario(claude: ClaudeAPI):
+        texts = []
+
+        async def on_text(text: str) -> None:
+            texts.append(text)
+
+        expires_at = time.time() + 1.0
+        results = await asyncio.gather(
+            claude.analyze(PROMPT, "BTCUSDT", expires_at, on_text=on_text),
+            *(claude.analyze(PROMPT, "BTCUSDT", expires_at) for _ in range(4)),
+        )
+        assert claude.calls == 1
+        assert len(set(results)) == 1 and results[0].startswith("Wort0")
+        # Zwischenstände wachsen mit jedem gestreamten Teil bis zur vollständigen Antwort
+        assert len(texts) == CHUNKS
+        assert all(b.startswith(a) and len(b) > len(a) for a, b in zip(texts, texts[1:]))
+        assert texts[-1] == results[0]
+
+        assert await claude.analyze(PROMPT, "BTCUSDT", expires_at) == results[0]
+        assert claude.calls == 1
+        await claude.analyze(PROMPT, "ETHUSDT", expires_at)
+        assert claude.calls == 2
+
+        await asyncio.sleep(expires_at - time.time() + 0.05)
+        assert await claude.analyze(PROMPT, "BTCUSDT", time.time() + 1.0) == results[0]
+        assert claude.calls == 3
+
+    run(anthropic_url, scenario)
+
+
+def test_failing_on_text_does_not_abort_the_shared_completion(anthropic_url):
+    async def scenario(claude: ClaudeAPI):
+        async def on_text(text: str) -> None:
+            raise RuntimeError("Bearbeiten fehlgeschlagen")
+
+        expires_at = time.time() + 10.0
+        leader, follower = await asyncio.gather(
+            claude.analyze(PROMPT, "BTCUSDT", expires_at, on_text=on_text),
+            claude.analyze(PROMPT, "BTCUSDT", expires_at),
+        )
+        assert claude.calls == 1
+        assert leader == follower
+        assert leader.split() == [f"Wort{i}" for i in range(CHUNKS)]
+
+    run(anthropic_url, scenario)
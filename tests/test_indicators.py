@@ -0,0 +1,42 @@
+"""Tests für die Indikatoren auf Matrizen mit unterschiedlich langen Historien."""
+
+import numpy as np
+
+import indicators
+from kline_store import KlineStore
+
+
+def fill(store: KlineStore, symbol: str, closes: np.ndarray) -> None:
+    store.ingest(symbol, "1m", [
+        [t * 60_000, c, c + 0.5, c - 0.5, c, 10.0 + t % 7, t * 60_000 + 59_999, 0, 1, 0, 0, "0"]
+        for t, c in enumerate(closes)
+    ])
+
+
+def test_short_history_rows_match_their_valid_suffix():
+    rng = np.random.default_rng(1)
+    store = KlineStore(capacity=100)
+    fill(store, "LONGUSDT", 100 + np.cumsum(rng.normal(0, 1, 80)))
+    fill(store, "SHORTUSDT", 50 + np.cumsum(rng.normal(0, 1, 30)))
+    symbols = ["LONGUSDT", "SHORTUSDT", "EMPTYUSDT"]
+    close = store.matrix(symbols, "1m", "close", 50)
+    high = store.matrix(symbols, "1m", "high", 50)
+    low = store.matrix(symbols, "1m", "low", 50)
+    assert np.isnan(close[1, :20]).all() and np.isnan(close[2]).all()
+
+    short = store.get("SHORTUSDT", "1m")
+    suffix = short.column("close", 30), short.column("high", 30), short.column("low", 30)
+    for name, matrix_values, suffix_values in [
+        ("sma", indicators.sma(close, 20), indicators.sma(suffix[0], 20)),
+        ("ema", indicators.ema(close, 9), indicators.ema(suffix[0], 9)),
+        ("rsi", indicators.rsi(close, 14), indicators.rsi(suffix[0], 14)),
+        ("macd", indicators.macd(close)[0], indicators.macd(suffix[0])[0]),
+        ("atr", indicators.atr(high, low, close, 14), indicators.atr(suffix[1], suffix[2], suffix[0], 14)),
+    ]:
+        assert np.isfinite(matrix_values[1, -1]), name
+        assert np.isnan(matrix_values[1, :20]).all(), name
+        np.testing.assert_allclose(matrix_values[1, 20:], suffix_values, err_msg=name)
+        assert np.isnan(matrix_values[2]).all(), name
+
+    # Vollständige Zeilen sind unverändert
+    np.testing.assert_allclose(indicators.rsi(close, 14)[0], indicators.rsi(close[0], 14))
@@ -0,0 +1,153 @@
+"""Tests für MarketDataStream gegen einen lokalen WebSocket-Server statt Binance."""
+
+import asyncio
+import time
+
+from aiohttp import web
+
+from kline_store import KlineStore
+from market_stream import MarketDataStream
+
+MINUTE_MS = 60_000
+
+
+def kline_row(open_time: int, close: float) -> list:
+    """Ein Candlestick im Format der Binance REST API."""
+    return [open_time, "100", str(close + 1), "99", str(close), "2", open_time + MINUTE_MS - 1,
+            "200", 10, "1", "100", "0"]
+
+
+def kline_message(symbol: str, open_time: int, close: float) -> dict:
+    """Eine Nachricht des kombinierten Kline-Streams."""
+    return {"stream": f"{symbol.lower()}@kline_1m", "data": {"e": "kline", "s": symbol, "k": {
+        "t": open_time, "T": open_time + MINUTE_MS - 1, "s": symbol, "i": "1m", "o": "100",
+        "h": str(close + 1), "l": "99", "c": str(close), "v": "2", "q": "200", "n": 10, "V": "1", "Q": "100",
+    }}}
+
+
+class FakeRestClient:
+    """Liefert für das Auffüllen die Candlesticks bis zur vorherigen Minute."""
+
+    def __init__(self, now_ms: int):
+        self.now_ms = now_ms
+        self.calls: list[tuple[str, str, int]] = []
+
+    async def fetch_klines(self, symbol: str, interval: str, limit: int = 500) -> list:
+        self.calls.append((symbol, interval, limit))
+        last = self.now_ms - MINUTE_MS
+        return [kline_row(last - (limit - 1 - i) * MINUTE_MS, 1000 + i) for i in range(limit)]
+
+
+class StreamServer:
+    """Lokaler Stand-in für den kombinierten Binance-Stream; trennt die erste Verbindung nach dem Senden."""
+
+    def __init__(self, symbol: str, now_ms: int):
+        self.symbol = symbol
+        self.now_ms = now_ms
+        self.connections = 0
+        self.paths: list[str] = []
+        self._runner: web.AppRunner | None = None
+        self.port = 0
+
+    async def handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        self.paths.append(request.path_qs)
+        if self.connections == 1:
+            await ws.send_json({"stream": "btcusdt@miniTicker",
+                                "data": {"e": "24hrMiniTicker", "s": self.symbol, "c": "1234.5"}})
+            await ws.send_json(kline_message(self.symbol, self.now_ms, 2000))
+            await ws.close()
+        else:
+            # Nach dem Reconnect: der laufende Candlestick aktualisiert, danach der nächste
+            await ws.send_json(kline_message(self.symbol, self.now_ms, 2001))
+            await ws.send_json(kline_message(self.symbol, self.now_ms + MINUTE_MS, 2002))
+            async for _ in ws:  # bis der Client die Verbindung schließt
+                pass
+        return ws
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/stream", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Bedingung nicht rechtzeitig erfüllt"
+        await asyncio.sleep(0.01)
+
+
+def test_backfill_stream_and_reconnect():
+    async def scenario():
+        now_ms = int(time.time() * 1000) // MINUTE_MS * MINUTE_MS
+        server = StreamServer("BTCUSDT", now_ms)
+        await server.start()
+        rest = FakeRestClient(now_ms)
+        stream = MarketDataStream(["BTCUSDT"], ["1m"], rest_client=rest,
+                                  base_url=f"ws://127.0.0.1:{server.port}", reconnect_delay=0.01)
+        await stream.start()
+        try:
+            buf = stream.kline_store.buffer("BTCUSDT", "1m")
+            await wait_for(lambda: server.connections >= 2 and buf.last_open_time == now_ms + MINUTE_MS)
+        finally:
+            await stream.stop()
+            await server.stop()
+
+        assert server.paths[0] == "/stream?streams=btcusdt@miniTicker/btcusdt@kline_1m"
+        # Erstes Auffüllen mit voller Kapazität, nach dem Reconnect nur die Lücke
+        assert rest.calls[0] == ("BTCUSDT", "1m", stream.kline_store.capacity)
+        assert len(rest.calls) == 2 and rest.calls[1][2] <= 3
+
+        closes = buf.column("close")
+        open_times = buf.column("open_time")
+        assert len(buf) == stream.kline_store.capacity
+        assert list(open_times[-3:]) == [now_ms - MINUTE_MS, now_ms, now_ms + MINUTE_MS]
+        # Die Aktualisierung des laufenden Candlesticks ersetzt ihn, statt ihn anzuhängen
+        assert list(closes[-2:]) == [2001, 2002]
+        assert stream.prices["BTCUSDT"] == 2002
+        assert not stream.connected.is_set()
+
+    asyncio.run(scenario())
+
+
+def test_get_klines_only_while_connected():
+    stream = MarketDataStream(["BTCUSDT"], ["1m"], resample_intervals=())
+    now_ms = int(time.time() * 1000) // MINUTE_MS * MINUTE_MS
+    for i in range(5):
+        stream._handle_message(kline_message("BTCUSDT", now_ms + i * MINUTE_MS, 100 + i))
+
+    assert stream.get_klines("BTCUSDT", "1m", 5) is None
+    stream.connected.set()
+    rows = stream.get_klines("BTCUSDT", "1m", 5)
+    assert [row[0] for row in rows] == [now_ms + i * MINUTE_MS for i in range(5)]
+    assert stream.get_klines("BTCUSDT", "1m", 6) is None
+    assert stream.get_klines("ETHUSDT", "1m", 1) is None
+
+
+def test_backfill_gap_larger_than_one_page_replaces_the_buffer():
+    now_ms = int(time.time() * 1000) // MINUTE_MS * MINUTE_MS
+    rest = FakeRestClient(now_ms)
+    # Mehr Kapazität als eine REST-Seite (1000): die alten Candlesticks würden nicht verdrängt
+    stream = MarketDataStream(["BTCUSDT"], ["1m"], kline_store=KlineStore(capacity=1500), rest_client=rest,
+                              resample_intervals=())
+    stale = now_ms - 2000 * MINUTE_MS
+    for i in range(3):
+        stream._handle_message(kline_message("BTCUSDT", stale + i * MINUTE_MS, 100 + i))
+
+    asyncio.run(stream._backfill())
+
+    open_times = stream.kline_store.buffer("BTCUSDT", "1m").column("open_time")
+    assert rest.calls == [("BTCUSDT", "1m", 1000)]
+    assert len(open_times) == 1000
+    assert open_times[0] == now_ms - 1000 * MINUTE_MS
+    assert (open_times[1:] - open_times[:-1] == MINUTE_MS).all()
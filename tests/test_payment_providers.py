@@ -0,0 +1,86 @@
+"""End-to-End-Test der Krypto-Rechnungen gegen den lokalen FakeCryptoGateway."""
+
+import asyncio
+import json
+import os
+import tempfile
+
+import aiohttp
+
+from payment_handler import PaymentHandler
+from payment_providers import SIGNATURE_HEADER, CryptoInvoiceProvider, FakeCryptoGateway, sign
+from user_database import UserDatabase
+from webhook_server import WebhookServer
+
+WEBHOOK_PATH = "/payments/crypto"
+
+
+def test_crypto_invoice_webhook_redelivery_and_expiry():
+    async def scenario():
+        db = UserDatabase(os.path.join(tempfile.mkdtemp(), "payments.db"))
+        await db.connect()
+        gateway = FakeCryptoGateway(api_key="key", webhook_secret="secret")
+        await gateway.start()
+        provider = CryptoInvoiceProvider(gateway.url, "key", "secret", callback_url="http://127.0.0.1",
+                                         webhook_path=WEBHOOK_PATH)
+        handler = PaymentHandler(db, providers=[provider])
+        activated = []
+
+        async def on_activated(invoice, expires):
+            activated.append(invoice.invoice_id)
+
+        handler.on_activated = on_activated
+        server = WebhookServer(None, path=None, listen="127.0.0.1", port=0, routes=handler.routes())
+        await server.start()
+        provider.callback_url = f"http://127.0.0.1:{server.port}{WEBHOOK_PATH}"
+        try:
+            # Rechnung anlegen: gespeichert als offen, beim Anbieter mit Betrag und Callback angelegt
+            invoice, pay_url = await handler.create_invoice(42, 42, "basic", "crypto")
+            assert invoice.status == "pending" and invoice.amount_cents == 1000
+            (gateway_id, remote), = gateway.invoices.items()
+            assert pay_url == f"{gateway.url}/pay/{gateway_id}"
+            assert remote["order_id"] == invoice.invoice_id and remote["amount"] == "10.00"
+            assert not handler.entitlements.is_active(42)
+
+            # Ein gefälschter Webhook wird abgewiesen und nichts wird gebucht
+            body = json.dumps({"id": gateway_id, "order_id": invoice.invoice_id, "status": "paid",
+                               "amount": "10.00", "currency": "USD"}).encode()
+            async with aiohttp.ClientSession() as session:
+                async with session.post(provider.callback_url, data=body,
+                                        headers={SIGNATURE_HEADER: sign("falsch", body)}) as response:
+                    assert response.status == 403
+            assert await db.get_payments(42) == []
+
+            # Schlägt das Verbuchen fehl, antwortet der Webhook mit 500, damit der Anbieter wiederholt
+            apply_payment = db.apply_payment
+
+            async def failing_apply_payment(**kwargs):
+                raise RuntimeError("database is locked")
+
+            db.apply_payment = failing_apply_payment
+            assert await gateway.pay(gateway_id) == 500
+            db.apply_payment = apply_payment
+            assert await db.get_payments(42) == []
+
+            # Signierte Zustellung und Wiederholung: nur einmal gebucht und angerechnet
+            assert await gateway.pay(gateway_id, deliveries=3) == 200
+            assert len(await db.get_payments(42)) == 1
+            assert activated == [invoice.invoice_id]
+            assert handler.entitlements.is_active(42)
+            assert (await handler.get_invoice(invoice.invoice_id)).status == "paid"
+
+            # Ablauf-Sweep: nur die unbezahlte Rechnung wird geschlossen
+            unpaid, _ = await handler.create_invoice(7, 7, "premium", "crypto")
+            assert await handler.is_payable(unpaid.invoice_id)
+            assert await handler.sweep_expired(now=unpaid.expires_at + 1) == 1
+            assert (await handler.get_invoice(unpaid.invoice_id)).status == "expired"
+            assert not await handler.is_payable(unpaid.invoice_id)
+            assert (await handler.get_invoice(invoice.invoice_id)).status == "paid"
+            assert not handler.entitlements.is_active(7)
+        finally:
+            await server.stop()
+            await gateway.stop()
+            await handler.stop()
+            await db.close()
+
+    asyncio.run(scenario())
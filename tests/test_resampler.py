@@ -0,0 +1,41 @@
+"""Tests für das Ableiten höherer Intervalle aus 1m-Reihen mit Lücken."""
+
+from kline_store import KlineStore
+from resampler import BASE_INTERVAL, BASE_MS, Resampler, resample
+
+
+def kline(minute: int) -> tuple:
+    open_time = minute * BASE_MS
+    return (open_time, 1.0, 2.0, 0.5, 1.5, 1.0, open_time + BASE_MS - 1, 1.5, 1, 0.5, 0.75)
+
+
+def store_with(minutes) -> KlineStore:
+    store = KlineStore(capacity=1000)
+    store.ingest("XUSDT", BASE_INTERVAL, [list(kline(m)) + ["0"] for m in minutes])
+    return store
+
+
+def test_bucket_with_missing_minutes_is_not_derived_or_served():
+    store = store_with(m for m in range(45) if m not in (20, 21, 22))
+    derived = resample(store.get("XUSDT", BASE_INTERVAL).window(), "15m")
+    assert derived["open_time"].tolist() == [30 * BASE_MS]
+    assert derived["volume"].tolist() == [15.0]
+
+    resampler = Resampler(store, ("15m",))
+    resampler.rebuild("XUSDT")
+    assert resampler.get_klines("XUSDT", "15m", 3) is None
+    assert [row[5] for row in resampler.get_klines("XUSDT", "15m", 1)] == [15.0]
+
+
+def test_stream_gap_is_not_served_across():
+    store = store_with(range(45))
+    resampler = Resampler(store, ("15m",))
+    resampler.rebuild("XUSDT")
+    assert [row[5] for row in resampler.get_klines("XUSDT", "15m", 3)] == [15.0, 15.0, 15.0]
+
+    buf = store.get("XUSDT", BASE_INTERVAL)
+    for minute in range(60, 63):
+        buf.append(kline(minute))
+        resampler.on_kline("XUSDT", kline(minute))
+    assert resampler.get_klines("XUSDT", "15m", 2) is None
+    assert resampler.get_klines("XUSDT", "15m", 1)[0][0] == 60 * BASE_MS
@@ -0,0 +1,35 @@
+"""Tests für die Bewertung von Symbolen mit unterschiedlich langen Historien."""
+
+import asyncio
+
+import numpy as np
+
+from kline_store import KlineStore
+from signal_scanner import MIN_SCAN_CANDLES, SignalScanner, _OfflineClient
+
+
+def fill(store: KlineStore, symbol: str, count: int, spike: bool = False) -> None:
+    volumes = np.full(count, 10.0)
+    if spike:
+        volumes[-1] = 40.0
+    store.ingest(symbol, "1m", [
+        [t * 60_000, 100.0, 100.5, 99.5, 100.0 + t % 3, v, t * 60_000 + 59_999, 0, 1, 0, 0, "0"]
+        for t, v in enumerate(volumes)
+    ])
+
+
+def test_short_history_is_scored_on_its_suffix_or_reported_as_skipped():
+    store = KlineStore(capacity=100)
+    fill(store, "LONGUSDT", 100)
+    fill(store, "SHORTUSDT", 30, spike=True)
+    fill(store, "TINYUSDT", MIN_SCAN_CANDLES - 1, spike=True)
+    scanner = SignalScanner(_OfflineClient(store), window=100, max_workers=1)
+    try:
+        results = asyncio.run(scanner.scan(["LONGUSDT", "SHORTUSDT", "TINYUSDT", "NONEUSDT"], fetch=False))
+    finally:
+        scanner.close()
+
+    assert [r["symbol"] for r in results] == ["SHORTUSDT", "LONGUSDT"]
+    assert results[0]["volume_ratio"] == 4.0
+    assert results[0]["score"] > 0.2
+    assert scanner.last_scan_stats["skipped"] == ["TINYUSDT", "NONEUSDT"]
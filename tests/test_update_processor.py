@@ -0,0 +1,45 @@
+"""Tests für UserOrderedUpdateProcessor."""
+
+import asyncio
+
+from telegram import Update
+
+from update_processor import UserOrderedUpdateProcessor
+
+
+def make_update(update_id: int, user_id: int) -> Update:
+    return Update.de_json({"update_id": update_id, "message": {
+        "message_id": update_id, "date": 1_700_000_000, "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "Test"}, "text": "/start",
+    }}, None)
+
+
+def test_one_busy_user_does_not_take_every_slot():
+    async def scenario():
+        processor = UserOrderedUpdateProcessor(2)
+        order = []
+        release = asyncio.Event()
+
+        async def slow(update_id: int) -> None:
+            order.append(("start", update_id))
+            await release.wait()
+            order.append(("end", update_id))
+
+        async def fast(update_id: int) -> None:
+            order.append(("start", update_id))
+
+        # Benutzer 1 hat mehr wartende Updates, als es Plätze gibt
+        spam = [asyncio.create_task(processor.process_update(make_update(i, 1), slow(i))) for i in range(5)]
+        await asyncio.sleep(0.01)
+        other = asyncio.create_task(processor.process_update(make_update(10, 2), fast(10)))
+        await asyncio.wait_for(other, 1.0)
+        assert ("start", 10) in order
+        # Von Benutzer 1 läuft nur das erste Update, die übrigen warten in Reihenfolge
+        assert [u for kind, u in order if kind == "start" and u < 10] == [0]
+
+        release.set()
+        await asyncio.gather(*spam)
+        assert [u for kind, u in order if kind == "end"] == [0, 1, 2, 3, 4]
+        assert not processor._locks
+
+    asyncio.run(scenario())
@@ -0,0 +1,104 @@
+"""Tests für WebhookServer mit synthetischen Updates an einen lokalen Server."""
+
+import asyncio
+
+import aiohttp
+import pytest
+from telegram import Update
+from telegram.ext import Application
+
+from webhook_server import SECRET_TOKEN_HEADER, WebhookServer, resolve_secret_token
+
+SECRET = "geheim"
+
+
+def synthetic_update(update_id: int, user_id: int = 42, text: str = "/start") -> dict:
+    """Ein Update im JSON-Format der Bot API, wie Telegram es per Webhook zustellt."""
+    user = {"id": user_id, "is_bot": False, "first_name": "Test"}
+    return {"update_id": update_id, "message": {
+        "message_id": update_id, "date": 1_700_000_000, "chat": {"id": user_id, "type": "private"},
+        "from": user, "text": text,
+    }}
+
+
+async def post(server: WebhookServer, body, secret: str | None = SECRET) -> int:
+    headers = {SECRET_TOKEN_HEADER: secret} if secret is not None else {}
+    async with aiohttp.ClientSession() as session:
+        kwargs = {"json": body} if not isinstance(body, str) else {"data": body}
+        async with session.post(f"http://127.0.0.1:{server.port}{server.path}", headers=headers, **kwargs) as response:
+            return response.status
+
+
+def test_secret_token_and_update_queue():
+    async def scenario():
+        application = Application.builder().token("123456:TEST").updater(None).build()
+        server = WebhookServer(application, path="/telegram", secret_token=SECRET, listen="127.0.0.1", port=0)
+        await server.start()
+        try:
+            assert await post(server, synthetic_update(1), secret="falsch") == 403
+            assert await post(server, synthetic_update(2), secret=None) == 403
+            assert application.update_queue.empty()
+
+            assert await post(server, synthetic_update(3, text="/analyze BTCUSDT")) == 200
+            assert await post(server, "kein json") == 400
+            assert await post(server, {"message": {}}) == 400
+        finally:
+            await server.stop()
+
+        assert server.received == 1 and server.rejected == 4
+        assert application.update_queue.qsize() == 1
+        update = application.update_queue.get_nowait()
+        assert isinstance(update, Update)
+        assert update.update_id == 3
+        assert update.effective_user.id == 42
+        assert update.message.text == "/analyze BTCUSDT"
+
+    asyncio.run(scenario())
+
+
+def test_sink_receives_raw_updates():
+    async def scenario():
+        received = []
+
+        async def sink(data: dict) -> None:
+            received.append(data)
+
+        server = WebhookServer(None, path="/telegram", secret_token=SECRET, listen="127.0.0.1", port=0, sink=sink)
+        await server.start()
+        try:
+            for update_id in range(5):
+                assert await post(server, synthetic_update(update_id, user_id=update_id)) == 200
+            assert await post(server, synthetic_update(99), secret="falsch") == 403
+        finally:
+            await server.stop()
+        return received
+
+    received = asyncio.run(scenario())
+    assert [data["update_id"] for data in received] == list(range(5))
+    assert received[0] == synthetic_update(0, user_id=0)
+
+
+def test_failed_sink_asks_telegram_to_redeliver():
+    async def scenario():
+        async def sink(data: dict) -> None:
+            raise ConnectionError("Worker nicht erreichbar")
+
+        server = WebhookServer(None, path="/telegram", secret_token=SECRET, listen="127.0.0.1", port=0, sink=sink)
+        await server.start()
+        try:
+            return await post(server, synthetic_update(1))
+        finally:
+            await server.stop()
+
+    assert asyncio.run(scenario()) == 503
+
+
+def test_update_endpoint_requires_secret_token():
+    with pytest.raises(ValueError):
+        WebhookServer(None, path="/telegram", secret_token=None)
+    # Reine Zusatz-Endpunkte (z.B. Zahlungs-Webhooks) prüfen ihre Signatur selbst
+    WebhookServer(None, path=None, secret_token=None)
+
+    generated = resolve_secret_token(None)
+    assert len(generated) >= 32 and generated != resolve_secret_token(None)
+    assert resolve_secret_token(SECRET) == SECRET
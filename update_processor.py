@@ -0,0 +1,68 @@
+"""
+Update Processor - Parallele Update-Verarbeitung mit Reihenfolge pro Benutzer
+"""
+
+import asyncio
+from typing import Any, Awaitable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+def update_user_id(update: object) -> int | None:
+    """Gibt die ID des auslösenden Benutzers (bzw. Chats) eines Updates zurück."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return update.effective_user.id
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+
+class UserOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Verarbeitet Updates verschiedener Benutzer parallel, die eines Benutzers nacheinander.
+
+    Pro Benutzer mit laufendem Update existiert ein Lock; asyncio.Lock bedient Wartende in
+    Ankunftsreihenfolge, sodass z.B. ein Callback nie vor dem vorausgehenden Befehl läuft.
+    Ein Update belegt erst einen der max_concurrent_updates Plätze, wenn es an der Reihe ist:
+    die wartenden Updates eines Benutzers blockieren so keine Plätze der anderen Benutzer.
+    """
+
+    __slots__ = ("_locks",)
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks: dict[int, tuple[asyncio.Lock, int]] = {}
+
+    # BaseUpdateProcessor.process_update hält den globalen Platz schon während do_process_update;
+    # die Reihenfolge pro Benutzer muss deshalb vor dem Platz hergestellt werden
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:  # type: ignore[misc]
+        user_id = update_user_id(update)
+        if user_id is None:
+            await super().process_update(update, coroutine)
+            return
+
+        lock, waiters = self._locks.get(user_id, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[user_id] = (lock, waiters + 1)
+        try:
+            async with lock:
+                await super().process_update(update, coroutine)
+        finally:
+            lock, waiters = self._locks[user_id]
+            if waiters <= 1:
+                del self._locks[user_id]
+            else:
+                self._locks[user_id] = (lock, waiters - 1)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        """Keine Ressourcen notwendig."""
+
+    async def shutdown(self) -> None:
+        """Keine Ressourcen notwendig."""
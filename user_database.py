@@ -1,34 +1,324 @@
+import asyncio
+
 import aiosqlite
 
+from entitlement_cache import Tier
+from migrations import migrate
+
+# Häufig ausgeführte Abfragen als feste Strings, damit der Statement-Cache von sqlite3
+# pro Verbindung die vorbereiteten Statements wiederverwendet
+SQL_GET_USER = "SELECT user_id, username, tier, subscription_start, subscription_expires FROM users WHERE user_id = ?"
+# Bereichs-Scan über den Covering-Index (subscription_expires, tier)
+SQL_ACTIVE_SUBSCRIPTIONS = """
+    SELECT user_id, tier, subscription_expires FROM users
+    WHERE subscription_expires > ? AND tier > 0
+"""
+# Keyset-Paginierung entlang des Index (tier, subscription_expires, user_id):
+# jede Seite ist ein Bereichs-Scan über den Covering-Index ohne Sortierung
+SQL_SUBSCRIBERS_PAGE = """
+    SELECT user_id, subscription_expires FROM users
+    WHERE tier = ? AND subscription_expires > ?
+      AND (subscription_expires, user_id) > (?, ?)
+    ORDER BY subscription_expires, user_id
+    LIMIT ?
+"""
+# Loose Index Scan: nächste belegte Stufe nach ?, O(log n) pro Stufe
+SQL_NEXT_TIER = "SELECT MIN(tier) FROM users WHERE tier > ?"
+SQL_ADD_USER = "INSERT OR IGNORE INTO users (user_id, username) VALUES (?, ?)"
+# Verlängerung in einem Statement: ein laufendes Abonnement wird ab seinem Ablauf verlängert,
+# sonst gilt es ab heute einschließlich des letzten Tages (Tagesgrenzen in lokaler Zeit).
+# Bereits gebuchte Zahlungen (gleiche external_id) ändern nichts.
+SQL_APPLY_PAYMENT = """
+    UPDATE users
+    SET tier = :tier,
+        subscription_start = CASE WHEN subscription_expires > :now THEN subscription_start ELSE :now END,
+        subscription_expires = CAST(CASE WHEN subscription_expires > :now
+            THEN strftime('%s', subscription_expires, 'unixepoch', 'localtime', :days, 'utc')
+            ELSE strftime('%s', :now, 'unixepoch', 'localtime', 'start of day', :fresh_days, 'utc')
+        END AS INTEGER)
+    WHERE user_id = :user_id
+      AND NOT EXISTS (SELECT 1 FROM payments WHERE external_id = :external_id)
+    RETURNING tier, subscription_expires
+"""
+SQL_RECORD_PAYMENT = """
+    INSERT OR IGNORE INTO payments
+        (user_id, tier, duration_days, amount_cents, currency, provider, external_id, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_USER_PAYMENTS = """
+    SELECT payment_id, tier, duration_days, amount_cents, currency, provider, external_id, created_at
+    FROM payments WHERE user_id = ? ORDER BY created_at, payment_id
+"""
+SQL_ADD_INVOICE = """
+    INSERT INTO invoices (invoice_id, user_id, chat_id, tier, duration_days, amount_cents, currency, provider,
+                          created_at, expires_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_GET_INVOICE = """
+    SELECT invoice_id, user_id, chat_id, tier, duration_days, amount_cents, currency, provider, status, expires_at
+    FROM invoices WHERE invoice_id = ?
+"""
+SQL_SET_INVOICE_STATUS = "UPDATE invoices SET status = ? WHERE invoice_id = ?"
+SQL_MARK_INVOICE_PAID = "UPDATE invoices SET status = 'paid' WHERE invoice_id = ?"
+SQL_EXPIRE_INVOICES = "UPDATE invoices SET status = 'expired' WHERE status = 'pending' AND expires_at <= ?"
+SQL_ADD_PRICE_ALERT = "INSERT INTO price_alerts (user_id, symbol, direction, threshold, created_at) VALUES (?, ?, ?, ?, ?)"
+SQL_DELETE_PRICE_ALERT = "DELETE FROM price_alerts WHERE alert_id = ? AND user_id = ?"
+SQL_DELETE_PRICE_ALERT_BY_ID = "DELETE FROM price_alerts WHERE alert_id = ?"
+SQL_USER_PRICE_ALERTS = """
+    SELECT alert_id, user_id, symbol, direction, threshold, created_at FROM price_alerts
+    WHERE user_id = ? ORDER BY alert_id
+"""
+SQL_ALL_PRICE_ALERTS = "SELECT alert_id, user_id, symbol, direction, threshold, created_at FROM price_alerts"
+
+# Pragmas für alle Verbindungen: WAL erlaubt Lesen parallel zum Schreiben,
+# synchronous=NORMAL spart im WAL-Modus den fsync pro Commit (nur beim Checkpoint)
+_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
 class UserDatabase:
-    def __init__(self, db_path: str = 'user_data.db'):
+    def __init__(self, db_path: str = 'user_data.db', read_pool_size: int = 4,
+                 batch_window: float = 0.005, max_batch_size: int = 128):
         """
         Initialisiert die UserDatabase.
         Args:
             db_path (str): Der Pfad zur SQLite-Datenbankdatei.
+            read_pool_size (int): Anzahl der Lese-Verbindungen, die nie hinter einem Schreibvorgang warten.
+            batch_window (float): Zeitfenster in Sekunden, in dem Schreibvorgänge zu einem Commit
+                                  zusammengefasst werden.
+            max_batch_size (int): Maximale Anzahl der Schreibvorgänge pro Commit.
         """
         self.db_path = db_path
         self.conn = None # Initialisiert self.conn hier, um die PyCharm-Warnung zu beheben
+        self.read_pool_size = read_pool_size if db_path != ':memory:' else 0
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+
+        self._read_pool: asyncio.Queue | None = None
+        self._read_conns: list = []
+        self._write_queue: asyncio.Queue | None = None
+        self._writer_task: asyncio.Task | None = None
+
+        # Schema-Version vor und nach den Migrationen beim Verbinden
+        self.schema_version: tuple[int, int] | None = None
+
+        # Zähler für die Dimensionierung von Batch-Fenster und Pool
+        self.commits = 0
+        self.writes = 0
+
+    async def _open(self, read_only: bool = False):
+        conn = await aiosqlite.connect(self.db_path, cached_statements=256)
+        for pragma in _PRAGMAS:
+            await conn.execute(pragma)
+        if read_only:
+            await conn.execute("PRAGMA query_only = ON")
+        return conn
 
     async def connect(self):
         """Stellt eine asynchrone Verbindung zur Datenbank her."""
-        self.conn = await aiosqlite.connect(self.db_path)
-        await self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                subscription_type TEXT,
-                subscription_start_date TEXT,
-                subscription_end_date TEXT
-            )
-        """)
-        await self.conn.commit()
+        self.conn = await self._open()
+        await self.conn.execute("PRAGMA journal_mode = WAL")
+        self.schema_version = await migrate(self.conn)
+
+        # Lese-Verbindungen; bei ':memory:' sieht nur die Schreib-Verbindung die Daten
+        self._read_pool = asyncio.Queue()
+        self._read_conns = [await self._open(read_only=True) for _ in range(self.read_pool_size)]
+        for conn in self._read_conns or [self.conn]:
+            self._read_pool.put_nowait(conn)
+
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer_loop())
 
     async def close(self):
-        """Schließt die Datenbankverbindung."""
+        """Schreibt ausstehende Änderungen und schließt alle Datenbankverbindungen."""
+        if self._writer_task is not None:
+            self._write_queue.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
+        for conn in self._read_conns:
+            await conn.close()
+        self._read_conns = []
         if self.conn:
             await self.conn.close()
 
+    async def _writer_loop(self):
+        """Fasst Schreibvorgänge zu kleinen Batches zusammen und committet jeden Batch einmal."""
+        stopping = False
+        while not stopping:
+            item = await self._write_queue.get()
+            if item is None:
+                break
+            batch = [item]
+            stopping = self._drain_writes(batch)
+            if not stopping and len(batch) < self.max_batch_size:
+                await asyncio.sleep(self.batch_window)
+                stopping = self._drain_writes(batch)
+            await self._commit_batch(batch)
+
+    def _drain_writes(self, batch: list) -> bool:
+        """Übernimmt wartende Schreibvorgänge in den Batch. Gibt True zurück, wenn close() angefordert wurde."""
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._write_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return False
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    async def _execute(self, sql: str, params) -> tuple[int, int, list]:
+        """Führt ein Statement auf der Schreib-Verbindung aus. Gibt (rowcount, lastrowid, Zeilen) zurück."""
+        cursor = await self.conn.execute(sql, params)
+        # Zeilen nur bei Statements mit Ergebnis (SELECT, RETURNING) abholen
+        rows = await cursor.fetchall() if cursor.description is not None else []
+        return cursor.rowcount, cursor.lastrowid, rows
+
+    async def _commit_batch(self, batch: list):
+        """Führt alle Schreibvorgänge eines Batches in einer Transaktion aus und löst die Futures beim Commit auf."""
+        results = []
+        try:
+            # Explizites BEGIN: sonst öffnet ein Savepoint am Anfang des Batches die Transaktion
+            # selbst, und sein RELEASE committet sie vor dem Rest des Batches
+            await self.conn.execute("BEGIN")
+        except Exception as e:
+            results = [(future, None, e) for _, future in batch]
+        else:
+            for statements, future in batch:
+                try:
+                    if len(statements) == 1:
+                        results.append((future, [await self._execute(*statements[0])], None))
+                        continue
+                    # Mehrere Statements eines Aufrufers bilden über einen Savepoint eine atomare Einheit
+                    await self.conn.execute("SAVEPOINT unit")
+                    try:
+                        outcomes = [await self._execute(sql, params) for sql, params in statements]
+                    except Exception:
+                        await self.conn.execute("ROLLBACK TO unit")
+                        raise
+                    finally:
+                        await self.conn.execute("RELEASE unit")
+                    results.append((future, outcomes, None))
+                except Exception as e:
+                    results.append((future, None, e))
+
+            try:
+                await self.conn.commit()
+            except Exception as e:
+                results = [(future, None, e) for future, _, _ in results]
+                # Die Transaktion bleibt nach einem fehlgeschlagenen COMMIT offen; ohne Rollback
+                # würde der nächste Batch die als fehlgeschlagen gemeldeten Schreibvorgänge mitcommitten
+                try:
+                    await self.conn.rollback()
+                except Exception as rollback_error:
+                    print(f"Fehler beim Zurückrollen des Batches: {rollback_error}")
+        self.commits += 1
+        self.writes += len(batch)
+
+        for future, outcomes, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(outcomes)
+
+    async def _submit(self, statements: list[tuple[str, tuple]]) -> list[tuple[int, int, list]]:
+        """Reiht Statements zum gemeinsamen Commit ein und gibt (rowcount, lastrowid, Zeilen) pro Statement zurück."""
+        future = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((statements, future))
+        return await future
+
+    async def _write_many(self, statements: list[tuple[str, tuple]]) -> list[int]:
+        """
+        Reiht Statements zum gemeinsamen Commit ein und wartet, bis dieser erfolgt ist.
+        Args:
+            statements (list[tuple[str, tuple]]): (SQL, Parameter)-Paare, die atomar ausgeführt werden.
+        Returns:
+            list[int]: Die Anzahl der betroffenen Zeilen pro Statement.
+        """
+        return [rowcount for rowcount, _, _ in await self._submit(statements)]
+
+    async def _write(self, sql: str, params: tuple = ()) -> int:
+        """Wie _write_many für ein einzelnes Statement. Gibt die Anzahl der betroffenen Zeilen zurück."""
+        return (await self._write_many([(sql, params)]))[0]
+
+    async def _insert(self, sql: str, params: tuple = ()) -> int:
+        """Wie _write, gibt aber die rowid der eingefügten Zeile zurück."""
+        return (await self._submit([(sql, params)]))[0][1]
+
+    async def _fetchone(self, sql: str, params: tuple = ()):
+        """Führt eine Leseabfrage auf einer Verbindung aus dem Lese-Pool aus."""
+        conn = await self._read_pool.get()
+        try:
+            async with conn.execute(sql, params) as cursor:
+                return await cursor.fetchone()
+        finally:
+            self._read_pool.put_nowait(conn)
+
+    async def _fetchall(self, sql: str, params: tuple = ()) -> list:
+        """Wie _fetchone, gibt aber alle Zeilen zurück."""
+        conn = await self._read_pool.get()
+        try:
+            async with conn.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+        finally:
+            self._read_pool.put_nowait(conn)
+
+    async def get_active_subscriptions(self, now: int) -> list[tuple]:
+        """
+        Ruft alle Benutzer ab, deren Abonnement zum Zeitpunkt now noch gültig ist.
+        Args:
+            now (int): Der Zeitpunkt als Unix-Zeit in Sekunden.
+        Returns:
+            list[tuple]: (user_id, tier, subscription_expires) pro Benutzer.
+        """
+        return await self._fetchall(SQL_ACTIVE_SUBSCRIPTIONS, (now,))
+
+    async def iter_active_subscribers(self, now: int, tiers: list[int] | None = None, chunk_size: int = 500):
+        """
+        Liefert alle Benutzer mit gültigem Abonnement seitenweise, ohne die Gesamtliste zu laden.
+
+        Jede Seite ist eine eigene kurze Abfrage über den Index (tier, subscription_expires);
+        zwischen den Seiten wird die Lese-Verbindung freigegeben, sodass auch ein langsam
+        konsumierender Broadcast keinen Lese-Snapshot offen hält.
+
+        Args:
+            now (int): Der Zeitpunkt als Unix-Zeit in Sekunden.
+            tiers (list[int] | None): Nur diese Abonnementstufen. Standard: alle.
+            chunk_size (int): Anzahl der Zeilen pro Abfrage.
+
+        Yields:
+            tuple[int, int]: (user_id, tier) pro Benutzer.
+        """
+        if tiers is None:
+            tiers = []
+            row = await self._fetchone(SQL_NEXT_TIER, (Tier.NONE,))
+            while row is not None and row[0] is not None:
+                tiers.append(row[0])
+                row = await self._fetchone(SQL_NEXT_TIER, (row[0],))
+
+        for tier in tiers:
+            last_expires, last_user_id = now, 0
+            while True:
+                conn = await self._read_pool.get()
+                try:
+                    async with conn.execute(SQL_SUBSCRIBERS_PAGE, (tier, now, last_expires, last_user_id,
+                                                                   chunk_size)) as cursor:
+                        rows = await cursor.fetchmany(chunk_size)
+                finally:
+                    self._read_pool.put_nowait(conn)
+                for user_id, _ in rows:
+                    yield user_id, tier
+                if len(rows) < chunk_size:
+                    break
+                last_user_id, last_expires = rows[-1]
+
     async def get_user(self, user_id: int) -> dict | None:
         """
         Ruft Benutzerdaten anhand der user_id ab.
@@ -37,18 +327,18 @@ class UserDatabase:
         Returns:
             dict | None: Ein Wörterbuch mit Benutzerdaten oder None, wenn der Benutzer nicht gefunden wird.
         """
-        async with self.conn.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                # Annahme der Spaltenreihenfolge
-                return {
-                    "user_id": row[0],
-                    "username": row[1],
-                    "subscription_type": row[2],
-                    "subscription_start_date": row[3],
-                    "subscription_end_date": row[4]
-                }
-            return None
+        row = await self._fetchone(SQL_GET_USER, (user_id,))
+        if row:
+            tier = Tier(row[2])
+            return {
+                "user_id": row[0],
+                "username": row[1],
+                "tier": tier,
+                "subscription_type": tier.name.lower() if tier != Tier.NONE else None,
+                "subscription_start": row[3],
+                "subscription_expires": row[4]
+            }
+        return None
 
     async def add_user(self, user_id: int, username: str):
         """
@@ -57,27 +347,154 @@ class UserDatabase:
             user_id (int): Die ID des Benutzers.
             username (str): Der Benutzername.
         """
-        await self.conn.execute(
-            "INSERT OR IGNORE INTO users (user_id, username) VALUES (?, ?)",
-            (user_id, username)
-        )
-        await self.conn.commit()
+        await self._write(SQL_ADD_USER, (user_id, username))
+
+    async def apply_payment(self, user_id: int, username: str | None, tier: int, duration_days: int,
+                            amount_cents: int, currency: str, provider: str, external_id: str,
+                            now: int, invoice_id: str | None = None) -> tuple[int, int] | None:
+        """
+        Bucht eine Zahlung und verlängert das Abonnement in einer atomaren Einheit.
+
+        Die neue Ablaufzeit wird in SQL aus dem gespeicherten Wert berechnet, sodass parallele
+        Zahlungen desselben Benutzers sich nicht gegenseitig überschreiben. external_id ist der
+        Idempotenzschlüssel: eine wiederholt zugestellte Zahlung wird weder erneut gebucht noch
+        erneut angerechnet.
+
+        Args:
+            user_id (int): Die ID des Benutzers (wird bei Bedarf angelegt).
+            username (str | None): Der Benutzername für neu angelegte Benutzer.
+            tier (int): Die gekaufte Abonnementstufe (Tier).
+            duration_days (int): Die Laufzeit in Tagen.
+            amount_cents (int): Der gezahlte Betrag in Cent.
+            currency (str): Die Währung, z.B. 'USD'.
+            provider (str): Der Zahlungsanbieter.
+            external_id (str): Eindeutiger Schlüssel der Zahlung.
+            now (int): Zeitpunkt der Zahlung als Unix-Zeit in Sekunden.
+            invoice_id (str | None): Die bezahlte Rechnung; wird in derselben Transaktion als bezahlt markiert.
+
+        Returns:
+            tuple[int, int] | None: (tier, subscription_expires) nach der Buchung oder None,
+                                    wenn die Zahlung bereits gebucht war.
+        """
+        statements = [
+            (SQL_ADD_USER, (user_id, username)),
+            (SQL_APPLY_PAYMENT, {
+                "tier": int(tier), "now": now, "days": f"+{duration_days} days",
+                "fresh_days": f"+{duration_days + 1} days", "user_id": user_id, "external_id": external_id,
+            }),
+            (SQL_RECORD_PAYMENT, (user_id, int(tier), duration_days, amount_cents, currency, provider,
+                                  external_id, now)),
+        ]
+        if invoice_id is not None:
+            statements.append((SQL_MARK_INVOICE_PAID, (invoice_id,)))
+        outcomes = await self._submit(statements)
+        rows = outcomes[1][2]
+        return tuple(rows[0]) if rows else None
+
+    async def get_payments(self, user_id: int) -> list[tuple]:
+        """
+        Ruft alle gebuchten Zahlungen eines Benutzers ab.
+        Args:
+            user_id (int): Die ID des Benutzers.
+        Returns:
+            list[tuple]: (payment_id, tier, duration_days, amount_cents, currency, provider,
+                          external_id, created_at) in zeitlicher Reihenfolge.
+        """
+        return await self._fetchall(SQL_USER_PAYMENTS, (user_id,))
 
-    async def update_user_subscription(self, user_id: int, subscription_type: str, subscription_end_date: str):
+    async def add_invoice(self, invoice_id: str, user_id: int, chat_id: int, tier: int, duration_days: int,
+                          amount_cents: int, currency: str, provider: str, created_at: int, expires_at: int):
         """
-        Aktualisiert das Abonnement eines Benutzers in der Datenbank.
+        Speichert eine offene Rechnung.
         Args:
+            invoice_id (str): Die ID der Rechnung.
             user_id (int): Die ID des Benutzers.
-            subscription_type (str): Der Typ des Abonnements.
-            subscription_end_date (str): Das Enddatum des Abonnements im Format 'YYYY-MM-DD'.
-        """
-        await self.conn.execute(
-            """
-            UPDATE users
-            SET subscription_type = ?, subscription_end_date = ?
-            WHERE user_id = ?
-            """,
-            (subscription_type, subscription_end_date, user_id)
-        )
-        await self.conn.commit()
+            chat_id (int): Der Chat, in dem die Rechnung angefordert wurde.
+            tier (int): Die gekaufte Abonnementstufe (Tier).
+            duration_days (int): Die Laufzeit in Tagen.
+            amount_cents (int): Der Betrag in Cent.
+            currency (str): Die Währung, z.B. 'USD'.
+            provider (str): Der Zahlungsanbieter.
+            created_at (int): Zeitpunkt der Erstellung als Unix-Zeit in Sekunden.
+            expires_at (int): Zeitpunkt, ab dem die Rechnung nicht mehr bezahlt werden kann.
+        """
+        await self._write(SQL_ADD_INVOICE, (invoice_id, user_id, chat_id, int(tier), duration_days, amount_cents,
+                                            currency, provider, created_at, expires_at))
 
+    async def get_invoice(self, invoice_id: str) -> tuple | None:
+        """
+        Ruft eine Rechnung ab.
+        Args:
+            invoice_id (str): Die ID der Rechnung.
+        Returns:
+            tuple | None: (invoice_id, user_id, chat_id, tier, duration_days, amount_cents, currency,
+                           provider, status, expires_at) oder None.
+        """
+        return await self._fetchone(SQL_GET_INVOICE, (invoice_id,))
+
+    async def set_invoice_status(self, invoice_id: str, status: str):
+        """
+        Setzt den Status einer Rechnung.
+        Args:
+            invoice_id (str): Die ID der Rechnung.
+            status (str): 'pending', 'paid', 'expired' oder 'failed'.
+        """
+        await self._write(SQL_SET_INVOICE_STATUS, (status, invoice_id))
+
+    async def expire_invoices(self, now: int) -> int:
+        """
+        Markiert alle offenen Rechnungen als abgelaufen, deren Frist verstrichen ist.
+        Args:
+            now (int): Der Zeitpunkt als Unix-Zeit in Sekunden.
+        Returns:
+            int: Die Anzahl der abgelaufenen Rechnungen.
+        """
+        return await self._write(SQL_EXPIRE_INVOICES, (now,))
+
+    async def add_price_alert(self, user_id: int, symbol: str, direction: str, threshold: float,
+                              created_at: int) -> int:
+        """
+        Speichert einen Preisalarm.
+        Args:
+            user_id (int): Die ID des Benutzers.
+            symbol (str): Das Handelspaar, z.B. 'BTCUSDT'.
+            direction (str): 'above' (Preis steigt auf threshold) oder 'below' (Preis fällt auf threshold).
+            threshold (float): Die Preisschwelle.
+            created_at (int): Zeitpunkt der Erstellung als Unix-Zeit in Sekunden.
+        Returns:
+            int: Die ID des Alarms.
+        """
+        return await self._insert(SQL_ADD_PRICE_ALERT, (user_id, symbol, direction, threshold, created_at))
+
+    async def delete_price_alert(self, alert_id: int, user_id: int) -> bool:
+        """
+        Löscht einen Preisalarm eines Benutzers.
+        Returns:
+            bool: True, wenn der Alarm existierte und dem Benutzer gehörte.
+        """
+        return await self._write(SQL_DELETE_PRICE_ALERT, (alert_id, user_id)) > 0
+
+    async def delete_price_alerts(self, alert_ids: list[int]):
+        """
+        Löscht mehrere Preisalarme (z.B. ausgelöste) in einem Commit.
+        Args:
+            alert_ids (list[int]): Die IDs der Alarme.
+        """
+        if alert_ids:
+            await self._write_many([(SQL_DELETE_PRICE_ALERT_BY_ID, (alert_id,)) for alert_id in alert_ids])
+
+    async def get_price_alerts(self, user_id: int) -> list[tuple]:
+        """
+        Ruft die Preisalarme eines Benutzers ab.
+        Returns:
+            list[tuple]: (alert_id, user_id, symbol, direction, threshold, created_at) pro Alarm.
+        """
+        return await self._fetchall(SQL_USER_PRICE_ALERTS, (user_id,))
+
+    async def get_all_price_alerts(self) -> list[tuple]:
+        """
+        Ruft alle gespeicherten Preisalarme ab (zum Aufbau des Alarm-Index beim Start).
+        Returns:
+            list[tuple]: (alert_id, user_id, symbol, direction, threshold, created_at) pro Alarm.
+        """
+        return await self._fetchall(SQL_ALL_PRICE_ALERTS)
@@ -0,0 +1,136 @@
+"""
+Webhook Server - Eingebetteter HTTP-Endpunkt für Telegram-Updates
+
+Telegram stellt Updates per HTTPS-POST zu. Der Server prüft das geheime Token, wandelt
+den JSON-Body in ein Update um und legt es in die update_queue der Application. Die
+Verarbeitung übernehmen die Update-Worker der Application; der Endpunkt antwortet sofort,
+damit Telegram weitere Updates parallel senden kann.
+"""
+
+import hmac
+import json
+import secrets
+from typing import Awaitable, Callable
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+# Header, mit dem Telegram das bei setWebhook angegebene secret_token mitsendet
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# Nur die Update-Typen, für die Handler registriert sind; alles andere stellt Telegram gar nicht erst zu
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY, Update.PRE_CHECKOUT_QUERY]
+
+
+def resolve_secret_token(secret_token: str | None) -> str:
+    """
+    Gibt das konfigurierte Secret Token zurück oder erzeugt eines für diesen Prozess.
+
+    Ein erzeugtes Token ist nur gültig, wenn es anschließend mit setWebhook registriert wird.
+    """
+    if secret_token:
+        return secret_token
+    print("Webhook: TELEGRAM_WEBHOOK_SECRET nicht gesetzt, es wird ein zufälliges Secret Token verwendet.")
+    # Telegram erlaubt 1-256 Zeichen aus A-Z, a-z, 0-9, '_' und '-'
+    return secrets.token_urlsafe(32)
+
+
+class WebhookServer:
+    """aiohttp-Server, der Telegram-Updates in die update_queue einer Application einspeist."""
+
+    def __init__(self, application: Application | None, path: str | None = "/telegram",
+                 secret_token: str | None = None, listen: str = "0.0.0.0", port: int = 8443,
+                 sink: Callable[[dict], Awaitable[None]] | None = None, routes: list[web.RouteDef] | None = None):
+        """
+        Initialisiert den WebhookServer.
+
+        Args:
+            application (Application | None): Die initialisierte Application des Bots.
+            path (str | None): Der URL-Pfad, unter dem Telegram die Updates zustellt. None stellt keinen
+                               Update-Endpunkt bereit (nur routes, z.B. Zahlungs-Webhooks beim Polling).
+            secret_token (str | None): Erwarteter Wert des Secret-Token-Headers. Pflicht, sobald ein
+                                       Update-Endpunkt bereitgestellt wird (path nicht None); sonst könnte
+                                       jeder, der den Port erreicht, Updates (z.B. successful_payment) fälschen.
+            listen (str): Die Adresse, auf der der Server lauscht.
+            port (int): Der Port, auf dem der Server lauscht.
+            sink (Callable[[dict], Awaitable[None]] | None): Erhält statt der Application die rohen
+                                                            Updates (z.B. zur Weiterleitung an Worker-Prozesse).
+            routes (list[web.RouteDef] | None): Weitere Endpunkte, z.B. Bestätigungen der Zahlungsanbieter.
+        """
+        if path is not None and not secret_token:
+            raise ValueError("Der Webhook-Server benötigt ein secret_token für den Update-Endpunkt.")
+        self.application = application
+        self.path = path if path is None or path.startswith("/") else "/" + path
+        self.secret_token = secret_token
+        self.listen = listen
+        self.port = port
+        self.sink = sink
+        self.routes = routes or []
+
+        self._runner: web.AppRunner | None = None
+
+        # Zähler für die Überwachung des Endpunkts
+        self.received = 0
+        self.rejected = 0
+
+    def create_app(self) -> web.Application:
+        """Erstellt die aiohttp-Anwendung mit dem Update-Endpunkt, weiteren Routen und einem Health-Check."""
+        app = web.Application()
+        if self.path is not None:
+            app.router.add_post(self.path, self._handle_update)
+        app.router.add_routes(self.routes)
+        app.router.add_get("/health", self._handle_health)
+        return app
+
+    async def start(self) -> None:
+        """Startet den Server."""
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.listen, self.port)
+        await site.start()
+        # Bei port=0 den tatsächlich gewählten Port übernehmen
+        sockets = getattr(site._server, "sockets", None)
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stoppt den Server. Bereits angenommene Updates bleiben in der update_queue."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_update(self, request: web.Request) -> web.Response:
+        received_token = request.headers.get(SECRET_TOKEN_HEADER, "").encode()
+        if not hmac.compare_digest(received_token, self.secret_token.encode()):
+            self.rejected += 1
+            return web.Response(status=403)
+        try:
+            data = await request.json(loads=json.loads)
+            if not isinstance(data, dict) or "update_id" not in data:
+                raise ValueError("update_id fehlt")
+            update = Update.de_json(data, self.application.bot) if self.sink is None else None
+        except Exception as e:
+            self.rejected += 1
+            print(f"Webhook: Ungültiges Update empfangen: {e}")
+            return web.Response(status=400)
+
+        self.received += 1
+        if self.sink is not None:
+            try:
+                await self.sink(data)
+            except Exception as e:
+                # 5xx: Telegram stellt das Update erneut zu, statt es als zugestellt zu verwerfen
+                print(f"Webhook: Update {data['update_id']} konnte nicht weitergeleitet werden: {e}")
+                return web.Response(status=503)
+        else:
+            await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def _handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "running": self.application.running if self.application is not None else self._runner is not None,
+            "received": self.received,
+            "rejected": self.rejected,
+            "queued": self.application.update_queue.qsize() if self.application is not None else 0,
+        })
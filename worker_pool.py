@@ -0,0 +1,448 @@
+"""
+Worker Pool - Mehrere Bot-Prozesse hinter einem gemeinsamen Update-Empfang
+
+Ein Ingress-Prozess empfängt die Telegram-Updates (Webhook oder Polling) und verteilt sie
+anhand der user_id über Unix-Sockets auf N Worker-Prozesse. Jeder Worker betreibt einen
+eigenen CryptoScalpingBot mit eigener Datenbankverbindung und eigenem Marktdaten-Cache.
+Alle Updates eines Benutzers landen immer beim selben Worker und bleiben in Reihenfolge;
+rechenintensive Analysen eines Benutzers blockieren nur dessen Shard.
+
+Protokoll: pro Update ein Frame aus 4 Byte Länge (big-endian) und dem JSON des Updates.
+Bestätigungen von Zahlungsanbietern nimmt ebenfalls der Ingress an und leitet sie als Frame
+{"user_id": ..., "payment": {...}} über eine eigene Verbindung an den Worker des Benutzers
+weiter, dessen Berechtigungs-Cache das Abonnement dann sofort kennt. Der Worker antwortet
+nach dem Verbuchen mit {"booked": bool} oder {"error": "..."}; erst dann bestätigt der
+Ingress den Webhook des Anbieters.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import struct
+import tempfile
+from typing import TYPE_CHECKING, Callable
+from urllib.parse import urlparse
+
+from telegram import Bot, Update
+from telegram.error import TelegramError
+
+from payment_providers import Confirmation, ConfirmationFailed, PaymentProvider, invoice_user_id
+from webhook_server import ALLOWED_UPDATES, WebhookServer, resolve_secret_token
+
+if TYPE_CHECKING:
+    # Der Ingress erzeugt keinen Bot und lädt die Bot-Subsysteme (Claude, Binance, SQLite) nicht
+    from crypto_scalping_bot import CryptoScalpingBot
+
+FRAME_HEADER = struct.Struct(">I")
+
+# Long-Polling-Timeout des Ingress in Sekunden
+POLL_TIMEOUT = 30
+
+# Maximale Wartezeit des Ingress auf das Verbuchen einer Zahlung im Worker in Sekunden
+CONFIRMATION_TIMEOUT = 30
+
+
+async def write_frame(writer: asyncio.StreamWriter, data: dict) -> None:
+    """Schreibt ein Update als Frame und wartet, bis der Puffer abgeflossen ist (Backpressure)."""
+    payload = json.dumps(data, separators=(",", ":")).encode()
+    writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+    await writer.drain()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict | None:
+    """Liest ein Frame. Gibt None zurück, wenn die Gegenseite die Verbindung geschlossen hat."""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+        payload = await reader.readexactly(FRAME_HEADER.unpack(header)[0])
+    except asyncio.IncompleteReadError:
+        return None
+    return json.loads(payload)
+
+
+def shard_for(data: dict, workers: int) -> int:
+    """
+    Bestimmt den Worker eines Updates anhand der user_id.
+
+    Args:
+        data (dict): Das Update im JSON-Format der Bot API.
+        workers (int): Die Anzahl der Worker.
+
+    Returns:
+        int: Der Index des Workers.
+    """
+    if "user_id" in data:
+        return data["user_id"] % workers
+    for value in data.values():
+        if isinstance(value, dict):
+            sender = value.get("from") or value.get("chat")
+            if isinstance(sender, dict) and "id" in sender:
+                return sender["id"] % workers
+    return data.get("update_id", 0) % workers
+
+
+class WorkerChannel:
+    """Verbindung des Ingress zu einem Worker-Socket mit Wiederverbindung nach Neustarts."""
+
+    def __init__(self, socket_path: str, connect_timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.connect_timeout = connect_timeout
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+        self.sent = 0
+
+    async def connect(self) -> None:
+        """Verbindet mit dem Worker und wartet, bis dessen Socket bereit ist."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.connect_timeout
+        while True:
+            try:
+                _, self._writer = await asyncio.open_unix_connection(self.socket_path)
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                if loop.time() >= deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+    async def send(self, data: dict) -> None:
+        """
+        Sendet ein Update; nach einem Verbindungsabbruch wird einmal neu verbunden.
+
+        Raises:
+            ConnectionError, OSError: Wenn das Update auch nach dem Neuverbinden nicht zugestellt werden
+                                      konnte. Der Aufrufer darf es dann nicht bei Telegram bestätigen.
+        """
+        async with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._writer is None or self._writer.is_closing():
+                        await self.connect()
+                    await write_frame(self._writer, data)
+                    self.sent += 1
+                    return
+                except (ConnectionError, OSError) as e:
+                    self._writer = None
+                    if attempt:
+                        print(f"Ingress: Update {data.get('update_id')} konnte nicht zugestellt werden: {e}")
+                        raise
+
+    async def request(self, data: dict, timeout: float = CONFIRMATION_TIMEOUT) -> dict:
+        """
+        Sendet ein Frame über eine eigene Verbindung und wartet auf die Antwort des Workers.
+
+        Raises:
+            ConnectionError, OSError: Wenn der Worker nicht erreichbar ist oder ohne Antwort schließt.
+            asyncio.TimeoutError: Wenn die Antwort nicht innerhalb von timeout Sekunden eintrifft.
+        """
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        try:
+            await write_frame(writer, data)
+            reply = await asyncio.wait_for(read_frame(reader), timeout)
+        finally:
+            writer.close()
+        if reply is None:
+            raise ConnectionError("Worker hat die Verbindung ohne Antwort geschlossen")
+        return reply
+
+    async def close(self) -> None:
+        """Schließt die Verbindung, nachdem alle gepufferten Frames geschrieben wurden."""
+        async with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                try:
+                    await self._writer.wait_closed()
+                except (ConnectionError, OSError):
+                    pass
+                self._writer = None
+
+
+async def serve_worker(bot: "CryptoScalpingBot", socket_path: str, stop_event: asyncio.Event | None = None) -> None:
+    """
+    Betreibt einen Worker: empfängt Updates vom Ingress und verarbeitet sie mit dem Bot.
+
+    Bei SIGTERM (oder gesetztem stop_event) nimmt der Worker keine neuen Verbindungen mehr an,
+    liest die bestehenden bis zum EOF des Ingress (WorkerChannel.close), verarbeitet die bereits
+    empfangenen Updates und fährt über _post_shutdown geordnet herunter. Frames, die noch im
+    Socket-Puffer liegen, gehen so nicht verloren; im Polling-Modus hat der Ingress sie bei
+    Telegram bereits bestätigt.
+
+    Args:
+        bot (CryptoScalpingBot): Der Bot des Workers.
+        socket_path (str): Pfad des Unix-Sockets, auf dem der Worker lauscht.
+        stop_event (asyncio.Event | None): Beendet den Worker, sobald es gesetzt ist.
+    """
+    stop_event = stop_event or asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop_event.set)
+    except (NotImplementedError, RuntimeError):
+        pass
+
+    async with bot.lifecycle() as application:
+        handlers: set[asyncio.Task] = set()
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                while (data := await read_frame(reader)) is not None:
+                    if "payment" in data:
+                        # Der Ingress wartet auf das Ergebnis und bestätigt erst danach den Webhook
+                        try:
+                            reply = {"booked": await bot.payment_handler.confirm(Confirmation(**data["payment"]))}
+                        except Exception as e:
+                            print(f"Worker {os.getpid()}: Zahlung {data['payment'].get('invoice_id')} "
+                                  f"nicht verbucht: {e}")
+                            reply = {"error": str(e) or type(e).__name__}
+                        await write_frame(writer, reply)
+                        continue
+                    await application.update_queue.put(Update.de_json(data, application.bot))
+            finally:
+                writer.close()
+
+        def accept(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            # Synchron registriert, damit auch eine gerade angenommene Verbindung abgewartet wird
+            task = asyncio.create_task(handle(reader, writer))
+            handlers.add(task)
+            task.add_done_callback(handlers.discard)
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(accept, path=socket_path)
+        try:
+            await stop_event.wait()
+        finally:
+            server.close()
+            # Bestehende Verbindungen enden erst mit dem EOF des Ingress; danach stoppt lifecycle()
+            # den Bot, nachdem die update_queue abgearbeitet ist
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await server.wait_closed()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+def _worker_main(socket_path: str, bot_factory: Callable[[dict], "CryptoScalpingBot"], config: dict) -> None:
+    """Einstiegspunkt eines Worker-Prozesses. config enthält zusätzlich 'shard': (index, workers)."""
+    # Strg+C trifft die ganze Prozessgruppe; Worker stoppen erst auf SIGTERM des Ingress,
+    # nachdem dieser keine Updates mehr weiterleitet
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    bot = bot_factory(config)
+    asyncio.run(serve_worker(bot, socket_path))
+    print(f"Worker {os.getpid()}: beendet.")
+
+
+class WorkerPool:
+    """Ingress-Prozess, der Worker-Prozesse startet, überwacht und mit Updates versorgt."""
+
+    def __init__(self, bot_factory: Callable[[dict], "CryptoScalpingBot"], config: dict, token: str,
+                 workers: int = 2, socket_dir: str | None = None, base_url: str | None = None,
+                 drain_timeout: float = 30.0, payment_providers: list[PaymentProvider] | None = None,
+                 payment_port: int | None = None):
+        """
+        Initialisiert den WorkerPool.
+
+        Args:
+            bot_factory (Callable[[dict], CryptoScalpingBot]): Modulweite Funktion, die im Worker aus config
+                                                               einen Bot erzeugt (muss importierbar sein).
+            config (dict): Konfiguration für bot_factory (nur picklebare Werte).
+            token (str): Telegram Bot Token für den Update-Empfang des Ingress.
+            workers (int): Anzahl der Worker-Prozesse.
+            socket_dir (str | None): Verzeichnis der Unix-Sockets. Standard: ein neues temporäres Verzeichnis.
+            base_url (str | None): Optionale Basis-URL der Bot API (z.B. für einen lokalen Testserver).
+            drain_timeout (float): Maximale Zeit in Sekunden, die ein Worker zum Herunterfahren erhält.
+            payment_providers (list[PaymentProvider] | None): Anbieter, deren Bestätigungs-Webhooks der
+                                                              Ingress annimmt und weiterleitet.
+            payment_port (int | None): Port der Bestätigungs-Webhooks im Polling-Modus.
+        """
+        self.bot_factory = bot_factory
+        self.config = config
+        self.token = token
+        self.workers = workers
+        self.socket_dir = socket_dir or tempfile.mkdtemp(prefix="ca3003bot-")
+        self.base_url = base_url
+        self.drain_timeout = drain_timeout
+        self.payment_providers = payment_providers or []
+        self.payment_port = payment_port
+        for provider in self.payment_providers:
+            provider.on_confirmed = self.dispatch_confirmation
+
+        self.socket_paths = [os.path.join(self.socket_dir, f"worker-{i}.sock") for i in range(workers)]
+        self.processes: list[multiprocessing.Process | None] = [None] * workers
+        self.channels = [WorkerChannel(path) for path in self.socket_paths]
+        self._context = multiprocessing.get_context("spawn")
+        self._stopping = False
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self.socket_paths[index], self.bot_factory, dict(self.config, shard=(index, self.workers))),
+            name=f"ca3003bot-worker-{index}"
+        )
+        process.start()
+        self.processes[index] = process
+
+    async def _supervise(self) -> None:
+        """Startet abgestürzte Worker neu. Deren Kanal verbindet sich beim nächsten Update neu."""
+        while not self._stopping:
+            await asyncio.sleep(1.0)
+            for index, process in enumerate(self.processes):
+                if not self._stopping and process is not None and not process.is_alive():
+                    print(f"Ingress: Worker {index} beendet (Exit-Code {process.exitcode}), Neustart...")
+                    self._spawn(index)
+
+    async def dispatch(self, data: dict) -> None:
+        """Leitet ein Update an den Worker seines Benutzers weiter."""
+        await self.channels[shard_for(data, self.workers)].send(data)
+
+    async def dispatch_confirmation(self, confirmation: Confirmation) -> bool:
+        """
+        Leitet die Bestätigung einer Zahlung an den Worker des zahlenden Benutzers weiter und
+        wartet, bis dieser sie verbucht hat.
+
+        Returns:
+            bool: Das Ergebnis von PaymentHandler.confirm im Worker.
+
+        Raises:
+            ConfirmationFailed: Wenn der Worker nicht erreichbar ist oder beim Verbuchen ein Fehler auftrat.
+        """
+        user_id = invoice_user_id(confirmation.invoice_id)
+        if user_id is None:
+            print(f"Ingress: Bestätigung für unbekannte Rechnung {confirmation.invoice_id} verworfen.")
+            return False
+        frame = {"user_id": user_id, "payment": confirmation._asdict()}
+        try:
+            reply = await self.channels[shard_for(frame, self.workers)].request(frame)
+        except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+            raise ConfirmationFailed(f"Worker für Benutzer {user_id} nicht erreichbar: {e}") from e
+        if "error" in reply:
+            raise ConfirmationFailed(reply["error"])
+        return reply["booked"]
+
+    def _payment_routes(self) -> list:
+        return [route for provider in self.payment_providers for route in provider.routes()]
+
+    async def serve(self, webhook_url: str | None = None, listen: str = "0.0.0.0", port: int = 8443,
+                    secret_token: str | None = None, stop_event: asyncio.Event | None = None) -> None:
+        """
+        Startet die Worker und empfängt Updates, bis stop_event gesetzt wird.
+
+        Args:
+            webhook_url (str | None): Öffentliche HTTPS-URL für den Webhook-Modus; None pollt.
+            listen (str): Die Adresse des Webhook-Servers.
+            port (int): Der Port des Webhook-Servers.
+            secret_token (str | None): Geheimes Token, das Telegram bei jedem Update mitsendet. Ohne Token
+                                       wird im Webhook-Modus eines erzeugt und mit setWebhook registriert.
+            stop_event (asyncio.Event | None): Beendet den Betrieb, sobald es gesetzt ist.
+        """
+        stop_event = stop_event or asyncio.Event()
+        self._stopping = False
+        for index in range(self.workers):
+            self._spawn(index)
+        supervisor = asyncio.create_task(self._supervise())
+        try:
+            await asyncio.gather(*(channel.connect() for channel in self.channels))
+            print(f"Ingress: {self.workers} Worker bereit ({self.socket_dir}).")
+            async with Bot(self.token, base_url=self.base_url or "https://api.telegram.org/bot") as bot:
+                if webhook_url:
+                    await self._serve_webhook(bot, webhook_url, listen, port, secret_token, stop_event)
+                else:
+                    payment_server = None
+                    if self._payment_routes() and self.payment_port:
+                        payment_server = WebhookServer(None, path=None, listen=listen, port=self.payment_port,
+                                                       routes=self._payment_routes())
+                        await payment_server.start()
+                    try:
+                        await self._poll(bot, stop_event)
+                    finally:
+                        if payment_server is not None:
+                            await payment_server.stop()
+        finally:
+            self._stopping = True
+            supervisor.cancel()
+            for provider in self.payment_providers:
+                await provider.close()
+            await self.drain()
+
+    async def _serve_webhook(self, bot: Bot, webhook_url: str, listen: str, port: int,
+                             secret_token: str | None, stop_event: asyncio.Event) -> None:
+        secret_token = resolve_secret_token(secret_token)
+        server = WebhookServer(None, path=urlparse(webhook_url).path or "/telegram", secret_token=secret_token,
+                               listen=listen, port=port, sink=self.dispatch, routes=self._payment_routes())
+        await server.start()
+        try:
+            await bot.set_webhook(webhook_url, allowed_updates=ALLOWED_UPDATES, secret_token=secret_token)
+            print(f"Ingress: Webhook-Server lauscht auf {listen}:{server.port}{server.path}")
+            await stop_event.wait()
+        finally:
+            await server.stop()
+
+    async def _poll(self, bot: Bot, stop_event: asyncio.Event) -> None:
+        await bot.delete_webhook()
+        print("Ingress: Polling wird gestartet...")
+        offset = None
+        stop_waiter = asyncio.create_task(stop_event.wait())
+        try:
+            while not stop_event.is_set():
+                fetch = asyncio.create_task(bot.get_updates(
+                    offset=offset, timeout=POLL_TIMEOUT, allowed_updates=ALLOWED_UPDATES))
+                await asyncio.wait({fetch, stop_waiter}, return_when=asyncio.FIRST_COMPLETED)
+                if not fetch.done():
+                    fetch.cancel()
+                    break
+                try:
+                    updates = fetch.result()
+                except TelegramError as e:
+                    print(f"Ingress: Fehler beim Abrufen der Updates: {e}")
+                    await asyncio.sleep(1.0)
+                    continue
+                for update in updates:
+                    try:
+                        await self.dispatch(update.to_dict())
+                    except (ConnectionError, OSError):
+                        # Offset nicht weiterschieben: Telegram stellt das Update beim nächsten Abruf erneut zu
+                        await asyncio.sleep(1.0)
+                        break
+                    offset = update.update_id + 1
+        finally:
+            stop_waiter.cancel()
+            if offset is not None:
+                # Bestätigt die weitergeleiteten Updates, damit Telegram sie nicht erneut zustellt
+                try:
+                    await bot.get_updates(offset=offset, timeout=0, limit=1)
+                except TelegramError:
+                    pass
+
+    async def drain(self) -> None:
+        """
+        Schließt die Kanäle und fährt alle Worker über SIGTERM geordnet herunter.
+
+        Das Schließen eines Kanals ist für den Worker das EOF, bis zu dem er weiterliest; Worker,
+        die nach drain_timeout noch laufen, werden beendet.
+        """
+        for channel in self.channels:
+            await channel.close()
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            await asyncio.to_thread(process.join, self.drain_timeout)
+            if process.is_alive():
+                print(f"Ingress: Worker {index} reagiert nicht, wird beendet.")
+                process.kill()
+                await asyncio.to_thread(process.join)
+
+    def run(self, webhook_url: str | None = None, listen: str = "0.0.0.0", port: int = 8443,
+            secret_token: str | None = None) -> None:
+        """Blockierende Variante von serve(); beendet sich bei SIGINT/SIGTERM."""
+
+        async def serve():
+            stop_event = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, stop_event.set)
+                except NotImplementedError:
+                    pass  # z.B. unter Windows
+            await self.serve(webhook_url, listen, port, secret_token, stop_event)
+
+        asyncio.run(serve())